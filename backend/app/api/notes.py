@@ -1,88 +1,537 @@
 # Importaciones necesarias para la API de notas
-from fastapi import APIRouter, Depends, Query, HTTPException
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+
 from app import schemas
-from app.database import get_db
-from app.services.note_service import NoteService
+from app.core.config import settings
+from app.core.etag import (
+    collection_etag,
+    etag_matches,
+    not_modified,
+    note_etag,
+    set_etag,
+)
+from app.core.events import note_events, stream_events
+from app.core.export import EXPORT_FORMATS
+from app.core.responses import fast_json_response
+from app.database import get_db, get_read_db
+from app.exceptions.handlers import ValidationError
+from app.pagination import Cursor, decode_cursor, encode_cursor
+from app.search_terms import term_index
+from app.services.note_import import import_ndjson
+from app.services.note_service import LIST_FIELDS, NoteService
+from app.services.write_coalescer import write_coalescer
 
 # Crear router para agrupar todas las rutas de notas
 router = APIRouter()
 
+
+# Dependencia vacía: con el agrupador de escrituras
+# la nota se escribe con la sesión del hilo escritor
+def _no_session() -> None:
+    """No abrir sesión en la ruta"""
+    return None
+
+
+# Sesión de las rutas que escriben notas (también las
+# async): ninguna si escriben a través del agrupador
+def write_session(dependency):
+    """Depends de la sesión de escritura según settings.write_coalescing"""
+    return Depends(_no_session) if settings.write_coalescing else Depends(dependency)
+
+
+# Parámetros de consulta del listado (compartidos por las rutas síncronas y asíncronas)
+class NoteListParams:
+    """Query parameters of GET /notes/ resolved into NoteService.get_notes arguments"""
+
+    def __init__(
+        self,
+        page: int = Query(1, ge=1, description="Page number (minimum 1)"),
+        per_page: int = Query(10, ge=1, le=100, description="Items per page (1-100)"),
+        search: str = Query("", description="Search in title and content"),
+        fuzzy: bool = Query(
+            False,
+            description="Tolerate typos: words with no match also match the most "
+            "similar indexed terms",
+        ),
+        archived: bool = Query(None, description="Filter by archive status"),
+        highlight: bool = Query(
+            False, description="Include a highlighted snippet of the search match"
+        ),
+        sort: Literal["updated_at", "created_at"] = Query(
+            "updated_at", description="Sort key (newest first)"
+        ),
+        cursor: Optional[str] = Query(
+            None,
+            description="Opaque cursor from X-Next-Cursor (empty string for the first "
+            "page); page is ignored",
+        ),
+        tags: Optional[List[str]] = Query(
+            None,
+            description="Filter by tags (repeat the parameter or separate with commas)",
+        ),
+        tags_mode: Literal["any", "all"] = Query(
+            "any", description="Match notes with any or all of the tags"
+        ),
+        fields: Optional[List[str]] = Query(
+            None,
+            description="Only return these fields (comma-separated; id is always "
+            f"included). One of: {', '.join(LIST_FIELDS)}",
+        ),
+        preview_length: int = Query(
+            settings.preview_length,
+            ge=1,
+            le=settings.preview_max_length,
+            description="Characters of content returned in the preview field",
+        ),
+    ):
+        self.page = page
+        self.per_page = per_page
+        self.search = search
+        self.fuzzy = fuzzy
+        self.archived = archived
+        self.highlight = highlight
+        self.sort = sort
+        # Decodificar cursor si se usa paginación keyset (cadena vacía = primera página)
+        self.keyset = cursor is not None
+        self.cursor = decode_cursor(cursor, sort) if cursor else None
+        # Aceptar tags repetidos (?tags=a&tags=b) o separados por comas (?tags=a,b)
+        self.tags = [tag for value in tags or [] for tag in value.split(",")]
+        self.tags_mode = tags_mode
+        # Subconjunto de campos (repetidos o separados
+        # por comas), validado contra LIST_FIELDS
+        self.fields = [
+            field.strip()
+            for value in fields or []
+            for field in value.split(",")
+            if field.strip()
+        ] or None
+        unknown = sorted(set(self.fields or []) - set(LIST_FIELDS))
+        if unknown:
+            raise ValidationError(f"Unknown fields: {', '.join(unknown)}")
+        self.preview_length = preview_length
+
+    def service_kwargs(self) -> dict:
+        """Argumentos para NoteService.get_notes"""
+        return dict(
+            # Calcular cuántos registros saltar para la paginación por número de página
+            skip=(self.page - 1) * self.per_page,
+            limit=self.per_page,
+            search=self.search,
+            archived=self.archived,
+            highlight=self.highlight,
+            sort=self.sort,
+            cursor=self.cursor,
+            keyset=self.keyset,
+            tags=self.tags,
+            tags_mode=self.tags_mode,
+            # Ruta rápida: diccionarios serializados con orjson
+            raw=settings.fast_json,
+            # La columna de orden se lee siempre para poder construir el cursor
+            fields=self.fields + [self.sort] if self.fields else None,
+            preview_length=self.preview_length,
+            fuzzy=self.fuzzy,
+        )
+
+    def count_kwargs(self) -> dict:
+        """Argumentos para NoteService.count_notes
+        (los mismos filtros sin paginación)"""
+        return dict(
+            search=self.search,
+            archived=self.archived,
+            tags=self.tags,
+            tags_mode=self.tags_mode,
+            fuzzy=self.fuzzy,
+        )
+
+    def collection_etag(self, changes: Optional[int]) -> Optional[str]:
+        """ETag del listado (ninguno si el motor no mantiene el contador de cambios)
+
+        Con fuzzy los resultados dependen también del vocabulario en memoria,
+        que sigue cargándose después de las primeras respuestas.
+        """
+        if changes is None:
+            return None
+        vocabulary = term_index.generation if self.fuzzy and self.search else None
+        return collection_etag(changes, vocabulary)
+
+    def project(self, notes: list) -> list:
+        """Quitar la columna de orden si solo se leyó para el cursor"""
+        if self.fields and self.sort not in self.fields:
+            for note in notes:
+                note.pop(self.sort, None)
+        return notes
+
+    @staticmethod
+    def set_total_count(response: Response, count) -> None:
+        """Devolver el total del listado y si es
+        exacto o un mínimo (limitado a count_cap)"""
+        response.headers["X-Total-Count"] = str(count.total)
+        response.headers["X-Total-Count-Exact"] = "true" if count.exact else "false"
+
+    def set_next_cursor(self, response: Response, notes: list) -> None:
+        """Devolver cursor de la página siguiente
+        si está completa y el orden es por clave"""
+        if len(notes) == self.per_page and (self.keyset or not self.search):
+            last = notes[-1]
+            if isinstance(last, dict):
+                value, note_id = last[self.sort], last["id"]
+            else:
+                value, note_id = getattr(last, self.sort), last.id
+            response.headers["X-Next-Cursor"] = encode_cursor(
+                Cursor(self.sort, value, note_id)
+            )
+
+
 # Endpoint para crear una nueva nota
-@router.post("/", response_model=schemas.NoteOut, status_code=201,
-            summary="Create a new note",
-            description="Create a new note with title, content, tags and archive status",
-            responses={
-                201: {"description": "Note created successfully"},
-                422: {"description": "Validation error", "model": schemas.ErrorResponse}
-            })
-def create_note(note: schemas.NoteCreate, db: Session = Depends(get_db)):
+@router.post(
+    "/",
+    response_model=schemas.NoteOut,
+    status_code=201,
+    summary="Create a new note",
+    description="Create a new note with title, content, tags and archive status",
+    responses={
+        201: {"description": "Note created successfully"},
+        422: {"description": "Validation error", "model": schemas.ErrorResponse},
+    },
+)
+def create_note(
+    note: schemas.NoteCreate, db: Optional[Session] = write_session(get_db)
+):
     """Crear una nueva nota en la base de datos"""
+    if settings.write_coalescing:
+        # Confirmar junto con otras escrituras concurrentes (un solo commit por lote)
+        return write_coalescer.create_note(note)
     # Crear instancia del servicio con la sesión de base de datos
     service = NoteService(db)
     # Llamar al servicio para crear la nota y retornar el resultado
     return service.create_note(note)
 
+
 # Endpoint para listar notas con paginación y búsqueda
-@router.get("/", response_model=List[schemas.NoteOut],
-           summary="List notes with pagination and search",
-           description="Get a paginated list of notes with optional search functionality",
-           responses={
-               200: {"description": "List of notes"},
-               422: {"description": "Invalid query parameters", "model": schemas.ErrorResponse}
-           })
+@router.get(
+    "/",
+    response_model=List[schemas.NoteListOut],
+    response_model_exclude_none=True,
+    summary="List notes with pagination and search",
+    description="Get a paginated list of notes with optional full-text search "
+    "(prefix matching, ranked by relevance). Supports page numbers and "
+    "keyset pagination: pass `cursor` (empty for the first page) and follow "
+    "the `X-Next-Cursor` response header. `X-Total-Count` carries the total "
+    "of matching notes (`X-Total-Count-Exact: false` when it is capped). "
+    "With `fields`, only the requested fields (plus `id`) are returned.",
+    responses={
+        200: {"description": "List of notes"},
+        304: {
+            "description": "Not modified (If-None-Match matches the collection ETag)"
+        },
+        422: {
+            "description": "Invalid query parameters",
+            "model": schemas.ErrorResponse,
+        },
+    },
+)
 def list_notes(
-    page: int = Query(1, ge=1, description="Page number (minimum 1)"),
-    per_page: int = Query(10, ge=1, le=100, description="Items per page (1-100)"),
+    request: Request,
+    response: Response,
+    params: NoteListParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    """Obtener lista de notas con paginación, búsqueda y filtros"""
+    service = NoteService(db)
+    # Responder 304 antes de consultar el listado si la colección no cambió
+    changes = service.get_collection_version()
+    etag = params.collection_etag(changes)
+    if etag and etag_matches(request, etag):
+        return not_modified(etag)
+    # Obtener notas con los parámetros especificados
+    notes = service.get_notes(**params.service_kwargs())
+    params.set_next_cursor(response, notes)
+    params.set_total_count(response, service.count_notes(**params.count_kwargs()))
+    if etag:
+        set_etag(response, etag)
+    # Con fields la respuesta es parcial: se serializa sin validar contra response_model
+    if params.fields or settings.fast_json:
+        return fast_json_response(params.project(notes), response)
+    return notes
+
+
+# Endpoint para crear varias notas en una sola transacción
+@router.post(
+    "/bulk",
+    response_model=schemas.BulkResult,
+    status_code=201,
+    summary="Create notes in bulk",
+    description="Create up to the configured maximum of notes in a single transaction",
+    responses={
+        201: {"description": "Notes created"},
+        422: {"description": "Validation error", "model": schemas.ErrorResponse},
+    },
+)
+def create_notes_bulk(
+    payload: schemas.NoteBulkCreate, db: Optional[Session] = write_session(get_db)
+):
+    """Crear un lote de notas validado por completo antes de escribir"""
+    if settings.write_coalescing:
+        return write_coalescer.create_notes(payload.items)
+    service = NoteService(db)
+    return service.create_notes(payload.items)
+
+
+# Endpoint para actualizar varias notas en una sola transacción
+@router.patch(
+    "/bulk",
+    response_model=schemas.BulkResult,
+    summary="Update notes in bulk",
+    description="Apply partial updates to several notes in a single transaction; "
+    "missing notes are reported per item with status 404",
+    responses={
+        200: {"description": "Per-item results"},
+        422: {"description": "Validation error", "model": schemas.ErrorResponse},
+    },
+)
+def update_notes_bulk(
+    payload: schemas.NoteBulkUpdate, db: Optional[Session] = write_session(get_db)
+):
+    """Actualizar un lote de notas y devolver el resultado de cada una"""
+    if settings.write_coalescing:
+        return write_coalescer.update_notes(payload.items)
+    service = NoteService(db)
+    return service.update_notes(payload.items)
+
+
+# Endpoint para eliminar varias notas en una sola transacción
+@router.delete(
+    "/bulk",
+    response_model=schemas.BulkResult,
+    summary="Delete notes in bulk",
+    description="Delete several notes in a single transaction; "
+    "missing notes are reported per item with status 404",
+    responses={
+        200: {"description": "Per-item results"},
+        422: {"description": "Validation error", "model": schemas.ErrorResponse},
+    },
+)
+def delete_notes_bulk(
+    payload: schemas.NoteBulkDelete, db: Optional[Session] = write_session(get_db)
+):
+    """Eliminar un lote de notas y devolver el resultado de cada una"""
+    if settings.write_coalescing:
+        return write_coalescer.delete_notes(payload.ids)
+    service = NoteService(db)
+    return service.delete_notes(payload.ids)
+
+
+# Endpoint para exportar todas las notas filtradas en streaming
+@router.get(
+    "/export",
+    summary="Export notes",
+    description="Stream every note matching the filters as NDJSON or CSV, in one pass "
+    "with constant server memory",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Streamed export",
+            "content": {"application/x-ndjson": {}, "text/csv": {}},
+        },
+        422: {
+            "description": "Invalid query parameters",
+            "model": schemas.ErrorResponse,
+        },
+    },
+)
+def export_notes(
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Export format"),
     search: str = Query("", description="Search in title and content"),
     archived: bool = Query(None, description="Filter by archive status"),
-    db: Session = Depends(get_db)
+    tags: Optional[List[str]] = Query(
+        None,
+        description="Filter by tags (repeat the parameter or separate with commas)",
+    ),
+    tags_mode: Literal["any", "all"] = Query(
+        "any", description="Match notes with any or all of the tags"
+    ),
+    db: Session = Depends(get_read_db),
 ):
-    """Obtener lista de notas con paginación, búsqueda y filtros"""
-    # Calcular cuántos registros saltar para la paginación
-    skip = (page - 1) * per_page
-    # Crear servicio y obtener notas con los parámetros especificados
+    """Exportar notas leyendo por lotes con un cursor del servidor"""
+    service = NoteService(db)
+    media_type, extension, encode = EXPORT_FORMATS[format]
+    tag_list = [tag for value in tags or [] for tag in value.split(",")]
+    batches = service.iter_note_batches(
+        search=search, archived=archived, tags=tag_list, tags_mode=tags_mode
+    )
+    return StreamingResponse(
+        encode(batches),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="notes.{extension}"'},
+    )
+
+
+# Endpoint de eventos del servidor (SSE) con los cambios de notas
+@router.get(
+    "/stream",
+    summary="Stream note changes",
+    description="Server-Sent Events feed of note changes (`created`, `updated`, "
+    "`deleted`, "
+    "with the note `id` and `version`). A `resync` event means events were "
+    "dropped because the client fell behind (or reconnected too late with "
+    "`Last-Event-ID`) and the list should be fetched again",
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "Event stream", "content": {"text/event-stream": {}}}
+    },
+)
+async def stream_note_changes(request: Request):
+    """Suscribirse a los cambios de notas hasta que el cliente se desconecte"""
+    last_event_id = request.headers.get("last-event-id", "")
+    return StreamingResponse(
+        stream_events(
+            note_events,
+            int(last_event_id) if last_event_id.isdigit() else None,
+            settings.sse_keepalive_seconds,
+        ),
+        media_type="text/event-stream",
+        # Sin caché ni buffering de proxies (nginx)
+        # para que cada evento llegue al momento
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Endpoint para importar notas desde un cuerpo NDJSON en streaming
+@router.post(
+    "/import",
+    response_model=schemas.ImportResult,
+    summary="Import notes from NDJSON",
+    description="Stream a newline-delimited JSON body (one NoteCreate object per "
+    "line). "
+    "Lines are parsed incrementally, validated one by one and inserted in "
+    "batches; invalid lines are reported with their line numbers",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {
+                    "schema": {"type": "string", "format": "binary"}
+                }
+            },
+        }
+    },
+    responses={
+        200: {"description": "Accepted and rejected counts"},
+        422: {
+            "description": "Invalid query parameters",
+            "model": schemas.ErrorResponse,
+        },
+        500: {
+            "description": "Stopped by a database error; earlier batches were "
+            "committed "
+            "(accepted) and lines from resume_from_line were not",
+            "model": schemas.ImportResult,
+        },
+        503: {
+            "description": "Stopped because the database was busy (same body as 500)",
+            "model": schemas.ImportResult,
+        },
+    },
+)
+async def import_notes(
+    request: Request,
+    batch_size: int = Query(
+        settings.import_batch_size,
+        ge=1,
+        le=settings.bulk_max_items,
+        description="Notes committed per transaction",
+    ),
+    db: Optional[Session] = write_session(get_db),
+):
+    """Importar notas línea a línea con commits por lotes y memoria constante"""
     service = NoteService(db)
-    return service.get_notes(skip=skip, limit=per_page, search=search, archived=archived)
+    result = await import_ndjson(request.stream(), service, batch_size=batch_size)
+    if result.error_code:
+        # Importación detenida por la base de datos:
+        # error con los conteos parciales para reanudar
+        status_code = 503 if result.error_code == "DATABASE_BUSY" else 500
+        headers = {"Retry-After": "1"} if status_code == 503 else None
+        return JSONResponse(
+            status_code=status_code, content=result.model_dump(), headers=headers
+        )
+    return result
+
 
 # Endpoint para obtener una nota específica por su ID
-@router.get("/{note_id}", response_model=schemas.NoteOut,
-           summary="Get note by ID",
-           description="Retrieve a specific note by its UUID",
-           responses={
-               200: {"description": "Note found"},
-               404: {"description": "Note not found", "model": schemas.ErrorResponse}
-           })
-def get_note(note_id: str, db: Session = Depends(get_db)):
+@router.get(
+    "/{note_id}",
+    response_model=schemas.NoteOut,
+    summary="Get note by ID",
+    description="Retrieve a specific note by its UUID",
+    responses={
+        200: {"description": "Note found"},
+        304: {"description": "Not modified (If-None-Match matches the note ETag)"},
+        404: {"description": "Note not found", "model": schemas.ErrorResponse},
+    },
+)
+def get_note(
+    note_id: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+):
     """Obtener una nota por su ID único"""
     service = NoteService(db)
-    return service.get_note_by_id(note_id)
+    entry = service.get_note_entry(note_id)
+    # Responder 304 sin serializar la nota si el cliente ya tiene esta versión
+    etag = note_etag(entry.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    if settings.fast_json:
+        return fast_json_response(entry.note.model_dump(), response)
+    return entry.note
+
 
 # Endpoint para actualizar una nota existente
-@router.put("/{note_id}", response_model=schemas.NoteOut,
-           summary="Update note",
-           description="Update an existing note by its UUID",
-           responses={
-               200: {"description": "Note updated successfully"},
-               404: {"description": "Note not found", "model": schemas.ErrorResponse},
-               422: {"description": "Validation error", "model": schemas.ErrorResponse}
-           })
-def update_note(note_id: str, note: schemas.NoteUpdate, db: Session = Depends(get_db)):
+@router.put(
+    "/{note_id}",
+    response_model=schemas.NoteOut,
+    summary="Update note",
+    description="Update an existing note by its UUID",
+    responses={
+        200: {"description": "Note updated successfully"},
+        404: {"description": "Note not found", "model": schemas.ErrorResponse},
+        422: {"description": "Validation error", "model": schemas.ErrorResponse},
+    },
+)
+def update_note(
+    note_id: str,
+    note: schemas.NoteUpdate,
+    db: Optional[Session] = write_session(get_db),
+):
     """Actualizar una nota existente con nuevos datos"""
+    if settings.write_coalescing:
+        return write_coalescer.update_note(note_id, note)
     service = NoteService(db)
     return service.update_note(note_id, note)
 
+
 # Endpoint para eliminar una nota
-@router.delete("/{note_id}", status_code=204,
-              summary="Delete note",
-              description="Delete a note by its UUID",
-              responses={
-                  204: {"description": "Note deleted successfully"},
-                  404: {"description": "Note not found", "model": schemas.ErrorResponse}
-              })
-def delete_note(note_id: str, db: Session = Depends(get_db)):
+@router.delete(
+    "/{note_id}",
+    status_code=204,
+    summary="Delete note",
+    description="Delete a note by its UUID",
+    responses={
+        204: {"description": "Note deleted successfully"},
+        404: {"description": "Note not found", "model": schemas.ErrorResponse},
+    },
+)
+def delete_note(note_id: str, db: Optional[Session] = write_session(get_db)):
     """Eliminar una nota de la base de datos"""
+    if settings.write_coalescing:
+        write_coalescer.delete_note(note_id)
+        return None
     service = NoteService(db)
     service.delete_note(note_id)
-    return None  # Retorna None para status 204 (No Content)
\ No newline at end of file
+    return None  # Retorna None para status 204 (No Content)
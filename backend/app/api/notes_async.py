@@ -0,0 +1,237 @@
+# Variantes asíncronas de las rutas CRUD y bulk de notas (settings.async_database).
+# Export, import, stream y tags siguen siendo síncronas a propósito: export e import
+# ya leen y escriben por lotes en el threadpool, stream no consulta la base de datos
+# y tags es una sola lectura indexada.
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import schemas
+from app.api.notes import NoteListParams, write_session
+from app.core.config import settings
+from app.core.etag import etag_matches, not_modified, note_etag, set_etag
+from app.core.responses import fast_json_response
+from app.database import get_async_db, get_async_read_db
+from app.services.async_note_service import AsyncNoteService
+from app.services.write_coalescer import write_coalescer
+
+# Router con las mismas rutas, metadatos y esquemas que app.api.notes
+router = APIRouter()
+
+
+# Endpoint para crear una nueva nota
+@router.post(
+    "/",
+    response_model=schemas.NoteOut,
+    status_code=201,
+    summary="Create a new note",
+    description="Create a new note with title, content, tags and archive status",
+    responses={
+        201: {"description": "Note created successfully"},
+        422: {"description": "Validation error", "model": schemas.ErrorResponse},
+    },
+)
+async def create_note(
+    note: schemas.NoteCreate, db: Optional[AsyncSession] = write_session(get_async_db)
+):
+    """Crear una nueva nota en la base de datos"""
+    if settings.write_coalescing:
+        # Mismo agrupador que las rutas síncronas; se espera el lote sin ocupar un hilo
+        return await write_coalescer.create_note_async(note)
+    service = AsyncNoteService(db)
+    return await service.create_note(note)
+
+
+# Endpoint para listar notas con paginación y búsqueda
+@router.get(
+    "/",
+    response_model=List[schemas.NoteListOut],
+    response_model_exclude_none=True,
+    summary="List notes with pagination and search",
+    description="Get a paginated list of notes with optional full-text search "
+    "(prefix matching, ranked by relevance). Supports page numbers and "
+    "keyset pagination: pass `cursor` (empty for the first page) and follow "
+    "the `X-Next-Cursor` response header. `X-Total-Count` carries the total "
+    "of matching notes (`X-Total-Count-Exact: false` when it is capped). "
+    "With `fields`, only the requested fields (plus `id`) are returned.",
+    responses={
+        200: {"description": "List of notes"},
+        304: {
+            "description": "Not modified (If-None-Match matches the collection ETag)"
+        },
+        422: {
+            "description": "Invalid query parameters",
+            "model": schemas.ErrorResponse,
+        },
+    },
+)
+async def list_notes(
+    request: Request,
+    response: Response,
+    params: NoteListParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Obtener lista de notas con paginación, búsqueda y filtros"""
+    service = AsyncNoteService(db)
+    # Responder 304 antes de consultar el listado si la colección no cambió
+    changes = await service.get_collection_version()
+    etag = params.collection_etag(changes)
+    if etag and etag_matches(request, etag):
+        return not_modified(etag)
+    notes = await service.get_notes(**params.service_kwargs())
+    params.set_next_cursor(response, notes)
+    params.set_total_count(response, await service.count_notes(**params.count_kwargs()))
+    if etag:
+        set_etag(response, etag)
+    # Con fields la respuesta es parcial: se serializa sin validar contra response_model
+    if params.fields or settings.fast_json:
+        return fast_json_response(params.project(notes), response)
+    return notes
+
+
+# Endpoint para crear varias notas en una sola transacción
+@router.post(
+    "/bulk",
+    response_model=schemas.BulkResult,
+    status_code=201,
+    summary="Create notes in bulk",
+    description="Create up to the configured maximum of notes in a single transaction",
+    responses={
+        201: {"description": "Notes created"},
+        422: {"description": "Validation error", "model": schemas.ErrorResponse},
+    },
+)
+async def create_notes_bulk(
+    payload: schemas.NoteBulkCreate,
+    db: Optional[AsyncSession] = write_session(get_async_db),
+):
+    """Crear un lote de notas validado por completo antes de escribir"""
+    if settings.write_coalescing:
+        return await write_coalescer.create_notes_async(payload.items)
+    service = AsyncNoteService(db)
+    return await service.create_notes(payload.items)
+
+
+# Endpoint para actualizar varias notas en una sola transacción
+@router.patch(
+    "/bulk",
+    response_model=schemas.BulkResult,
+    summary="Update notes in bulk",
+    description="Apply partial updates to several notes in a single transaction; "
+    "missing notes are reported per item with status 404",
+    responses={
+        200: {"description": "Per-item results"},
+        422: {"description": "Validation error", "model": schemas.ErrorResponse},
+    },
+)
+async def update_notes_bulk(
+    payload: schemas.NoteBulkUpdate,
+    db: Optional[AsyncSession] = write_session(get_async_db),
+):
+    """Actualizar un lote de notas y devolver el resultado de cada una"""
+    if settings.write_coalescing:
+        return await write_coalescer.update_notes_async(payload.items)
+    service = AsyncNoteService(db)
+    return await service.update_notes(payload.items)
+
+
+# Endpoint para eliminar varias notas en una sola transacción
+@router.delete(
+    "/bulk",
+    response_model=schemas.BulkResult,
+    summary="Delete notes in bulk",
+    description="Delete several notes in a single transaction; "
+    "missing notes are reported per item with status 404",
+    responses={
+        200: {"description": "Per-item results"},
+        422: {"description": "Validation error", "model": schemas.ErrorResponse},
+    },
+)
+async def delete_notes_bulk(
+    payload: schemas.NoteBulkDelete,
+    db: Optional[AsyncSession] = write_session(get_async_db),
+):
+    """Eliminar un lote de notas y devolver el resultado de cada una"""
+    if settings.write_coalescing:
+        return await write_coalescer.delete_notes_async(payload.ids)
+    service = AsyncNoteService(db)
+    return await service.delete_notes(payload.ids)
+
+
+# Endpoint para obtener una nota específica por su ID
+@router.get(
+    "/{note_id}",
+    response_model=schemas.NoteOut,
+    summary="Get note by ID",
+    description="Retrieve a specific note by its UUID",
+    responses={
+        200: {"description": "Note found"},
+        304: {"description": "Not modified (If-None-Match matches the note ETag)"},
+        404: {"description": "Note not found", "model": schemas.ErrorResponse},
+    },
+)
+async def get_note(
+    note_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Obtener una nota por su ID único"""
+    service = AsyncNoteService(db)
+    entry = await service.get_note_entry(note_id)
+    # Responder 304 sin serializar la nota si el cliente ya tiene esta versión
+    etag = note_etag(entry.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    if settings.fast_json:
+        return fast_json_response(entry.note.model_dump(), response)
+    return entry.note
+
+
+# Endpoint para actualizar una nota existente
+@router.put(
+    "/{note_id}",
+    response_model=schemas.NoteOut,
+    summary="Update note",
+    description="Update an existing note by its UUID",
+    responses={
+        200: {"description": "Note updated successfully"},
+        404: {"description": "Note not found", "model": schemas.ErrorResponse},
+        422: {"description": "Validation error", "model": schemas.ErrorResponse},
+    },
+)
+async def update_note(
+    note_id: str,
+    note: schemas.NoteUpdate,
+    db: Optional[AsyncSession] = write_session(get_async_db),
+):
+    """Actualizar una nota existente con nuevos datos"""
+    if settings.write_coalescing:
+        return await write_coalescer.update_note_async(note_id, note)
+    service = AsyncNoteService(db)
+    return await service.update_note(note_id, note)
+
+
+# Endpoint para eliminar una nota
+@router.delete(
+    "/{note_id}",
+    status_code=204,
+    summary="Delete note",
+    description="Delete a note by its UUID",
+    responses={
+        204: {"description": "Note deleted successfully"},
+        404: {"description": "Note not found", "model": schemas.ErrorResponse},
+    },
+)
+async def delete_note(
+    note_id: str, db: Optional[AsyncSession] = write_session(get_async_db)
+):
+    """Eliminar una nota de la base de datos"""
+    if settings.write_coalescing:
+        await write_coalescer.delete_note_async(note_id)
+        return None
+    service = AsyncNoteService(db)
+    await service.delete_note(note_id)
+    return None  # Retorna None para status 204 (No Content)
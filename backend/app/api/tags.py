@@ -0,0 +1,37 @@
+# Importaciones necesarias para la API de tags
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.database import get_read_db
+from app.services.note_service import NoteService
+
+# Crear router para agrupar todas las rutas de tags
+router = APIRouter()
+
+
+# Endpoint para listar los tags con su número de notas
+@router.get(
+    "/",
+    response_model=List[schemas.TagCount],
+    summary="List tags with usage counts",
+    description="Get tags ordered by the number of notes that use them",
+    responses={
+        200: {"description": "Tag usage counts"},
+        422: {
+            "description": "Invalid query parameters",
+            "model": schemas.ErrorResponse,
+        },
+    },
+)
+def list_tags(
+    limit: int = Query(
+        100, ge=1, le=1000, description="Maximum number of tags (1-1000)"
+    ),
+    db: Session = Depends(get_read_db),
+):
+    """Obtener los tags más usados con su conteo de notas"""
+    service = NoteService(db)
+    return service.get_tag_counts(limit=limit)
@@ -1,9 +1,46 @@
 # Importaciones para configurar el router principal de la API
 from fastapi import APIRouter
+
 from app.api.notes import router as notes_router
+from app.api.tags import router as tags_router
+from app.core.config import settings
+
+
+# Función para obtener las rutas de notas síncronas o asíncronas
+def get_notes_router(async_database: bool = False) -> APIRouter:
+    """Devolver el router de notas; en modo asíncrono
+    sus rutas CRUD se sustituyen por las async"""
+    if not async_database:
+        return notes_router
+    # Importación diferida: el modo síncrono no necesita el motor asíncrono
+    from app.api.notes_async import router as notes_async_router
+
+    replacements = {
+        (route.path, frozenset(route.methods)): route
+        for route in notes_async_router.routes
+    }
+    # Conservar el orden original de las rutas (p. ej. /bulk antes de /{note_id})
+    router = APIRouter()
+    router.routes.extend(
+        replacements.get((route.path, frozenset(route.methods)), route)
+        for route in notes_router.routes
+    )
+    return router
 
-# Crear router principal que agrupa todas las rutas de la API v1
-api_router = APIRouter()
 
-# Incluir router de notas con prefijo y etiquetas para documentación
-api_router.include_router(notes_router, prefix="/notes", tags=["notes"])
\ No newline at end of file
+# Función para construir el router principal de la API v1
+def build_api_router(async_database: bool = False) -> APIRouter:
+    """Agrupar todas las rutas de la API v1"""
+    router = APIRouter()
+
+    # Incluir router de notas con prefijo y etiquetas para documentación
+    router.include_router(
+        get_notes_router(async_database), prefix="/notes", tags=["notes"]
+    )
+    router.include_router(tags_router, prefix="/tags", tags=["tags"])
+
+    return router
+
+
+# Crear router principal que agrupa todas las rutas de la API v1
+api_router = build_api_router(settings.async_database)
@@ -0,0 +1,164 @@
+# Caché en proceso para lecturas de notas con invalidación en escrituras
+import importlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from app.core.config import settings
+from app.core.metrics import register_cache
+
+
+# Interfaz común de los backends de caché
+class CacheBackend(ABC):
+    """Backend de caché clave-valor usado por NoteService
+
+    Los backends incluidos (LRUCache, NullCache) viven en la memoria de cada
+    proceso: una escritura en un worker de uvicorn no invalida la copia de los
+    demás, que pueden servir datos obsoletos hasta que caduque el TTL. Por eso
+    la caché está desactivada salvo con NOTE_CACHE_ENABLED=true, pensado para
+    un único proceso. Un backend
+    compartido (memoria compartida, socket local) puede implementar esta
+    interfaz y activarse con settings.note_cache_backend (ruta "modulo.Clase");
+    el constructor recibe maxsize y ttl.
+
+    generation es un contador que avanza con cada invalidación: un lector lo toma
+    antes de consultar la base de datos y lo pasa a set(), que descarta el valor
+    si hubo una escritura entre medias (evita guardar datos ya obsoletos).
+    """
+
+    generation: int = 0
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Valor guardado para key (None si no está o caducó)"""
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """Guardar value salvo que generation ya no sea la actual"""
+
+    @abstractmethod
+    def delete(self, *keys: Hashable) -> None:
+        """Invalidar claves y avanzar generation"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Vaciar la caché y avanzar generation"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Contadores de uso (size, maxsize, hits, misses, evictions, expirations)"""
+
+
+# Backend sin almacenamiento (caché desactivada)
+class NullCache(CacheBackend):
+    """Backend que nunca guarda nada"""
+
+    def __init__(self, maxsize: int = 0, ttl: float = 0):
+        self.misses = 0
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value, generation=None):
+        pass
+
+    def delete(self, *keys):
+        self.generation += 1
+
+    def clear(self):
+        self.generation += 1
+
+    def stats(self):
+        return {
+            "size": 0,
+            "maxsize": 0,
+            "hits": 0,
+            "misses": self.misses,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+
+# Backend LRU acotado con caducidad (TTL) en memoria del proceso
+class LRUCache(CacheBackend):
+    """Caché LRU con tamaño máximo, TTL por entrada y contadores de uso"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            # Marcar como usada recientemente
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, generation=None):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            # Expulsar las entradas menos usadas al superar el tamaño máximo
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# Crear el backend configurado en settings
+def create_cache() -> CacheBackend:
+    """Instanciar el backend de caché de notas según la configuración"""
+    if not settings.note_cache_enabled:
+        return NullCache()
+    module_name, _, class_name = settings.note_cache_backend.rpartition(".")
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    return backend_class(maxsize=settings.note_cache_size, ttl=settings.note_cache_ttl)
+
+
+# Instancia global de la caché de notas individuales (clave: id de la nota)
+note_cache = create_cache()
+register_cache("note", note_cache)
@@ -1,30 +1,207 @@
 # Importaciones para configuración de la aplicación
+import json
 import os
-from typing import List
+from typing import Dict, List, Union
+
 
 # Clase que contiene toda la configuración de la aplicación
 class Settings:
     """Configuración centralizada de la aplicación"""
-    
+
     # Nombre del proyecto (usado en documentación OpenAPI)
     project_name: str = "Notes API"
-    
+
     # Modo debug (True para desarrollo, False para producción)
     debug: bool = True
-    
+
     # Prefijo para todas las rutas de la API
     api_v1_str: str = "/api/v1"
-    
-    # URL de conexión a la base de datos SQLite
-    database_url: str = "sqlite:///./notes.db"
-    
+
+    # URL de conexión a la base de datos: SQLite por
+    # defecto o PostgreSQL (postgresql+psycopg://...)
+    database_url: str = os.getenv("DATABASE_URL", "sqlite:///./notes.db")
+
+    # URL del motor de solo lectura (p. ej. una réplica
+    # de PostgreSQL; por defecto la misma base de datos)
+    read_database_url: str = os.getenv("READ_DATABASE_URL", database_url)
+
+    # Crear notas de ejemplo al arrancar si la base
+    # de datos está vacía (desactivado por defecto)
+    seed_sample_data: bool = os.getenv("SEED_SAMPLE_DATA", "false").lower() == "true"
+
+    # Servir las rutas CRUD de notas con el motor asíncrono (requiere aiosqlite)
+    async_database: bool = os.getenv("ASYNC_DATABASE", "false").lower() == "true"
+
+    # URL del motor asíncrono (misma base de datos con el
+    # driver aiosqlite; psycopg 3 sirve para ambos modos)
+    async_database_url: str = os.getenv(
+        "ASYNC_DATABASE_URL",
+        database_url.replace("sqlite://", "sqlite+aiosqlite://", 1),
+    )
+
+    # URL del motor asíncrono de solo lectura (por
+    # defecto la de lectura con el driver asíncrono)
+    async_read_database_url: str = os.getenv(
+        "ASYNC_READ_DATABASE_URL",
+        read_database_url.replace("sqlite://", "sqlite+aiosqlite://", 1),
+    )
+
+    # Perfil de ajuste de SQLite: PRAGMAs aplicados en cada conexión nueva
+    sqlite_pragmas: Dict[str, Union[str, int]] = {
+        "journal_mode": "WAL",  # Lectores concurrentes con un escritor
+        "synchronous": "NORMAL",  # fsync solo en checkpoints (seguro con WAL)
+        "cache_size": -64000,  # 64 MB de caché de páginas por conexión
+        "mmap_size": 268435456,  # 256 MB de lecturas mapeadas en memoria
+        "temp_store": "MEMORY",  # Tablas temporales y ordenaciones en memoria
+        # Esperar hasta 5 s por el bloqueo antes de SQLITE_BUSY
+        "busy_timeout": 5000,
+    }
+
+    # Conexiones del motor de escritura (un único escritor evita contención de bloqueos)
+    sqlite_write_pool_size: int = 1
+
+    # Conexiones del motor de solo lectura
+    sqlite_read_pool_size: int = 8
+
+    # Pool de conexiones para motores de servidor
+    # (PostgreSQL); SQLite usa los tamaños anteriores
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    # Espera máxima por una conexión libre
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    # Renovar conexiones cada 30 min
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Descartar conexiones caídas
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+    # Reintentos de escrituras que fallan con SQLITE_BUSY (o conflictos
+    # de serialización/deadlocks en PostgreSQL) y espera base entre ellos
+    db_busy_retries: int = 3
+    db_busy_backoff_ms: int = 50
+
+    # Caché de lecturas de notas individuales (LRU con TTL) y su backend.
+    # La caché es local a cada proceso y se activa explícitamente: con varios workers
+    # (--workers, gunicorn -w) una escritura no invalida la copia de los demás
+    note_cache_enabled: bool = (
+        os.getenv("NOTE_CACHE_ENABLED", "false").lower() == "true"
+    )
+    note_cache_size: int = 1024
+    note_cache_ttl: float = 30.0
+    note_cache_backend: str = "app.core.cache.LRUCache"
+
+    # Agrupar las escrituras concurrentes de notas (individuales, bulk e
+    # importación) en una sola transacción: latencia máxima añadida
+    # esperando a otras escrituras y tamaño máximo del lote
+    write_coalescing: bool = os.getenv("WRITE_COALESCING", "false").lower() == "true"
+    write_coalesce_max_delay_ms: float = float(
+        os.getenv("WRITE_COALESCE_MAX_DELAY_MS", "2")
+    )
+    write_coalesce_max_batch: int = int(os.getenv("WRITE_COALESCE_MAX_BATCH", "64"))
+    # Escrituras en cola como máximo (las siguientes reciben 503) y espera máxima de una
+    # escritura que aún no empezó a aplicarse (después se descarta y se responde 503)
+    write_coalesce_max_queue: int = int(os.getenv("WRITE_COALESCE_MAX_QUEUE", "1024"))
+    write_coalesce_timeout: float = float(os.getenv("WRITE_COALESCE_TIMEOUT", "2.0"))
+
+    # Máximo de elementos por petición en los endpoints bulk
+    bulk_max_items: int = 1000
+
+    # Máximo contado con COUNT(*) cuando el total no sale de los contadores (búsquedas)
+    count_cap: int = 10000
+
+    # Búsqueda fuzzy (?fuzzy=true): similitud mínima de trigramas, términos parecidos
+    # añadidos por palabra y longitud mínima de una palabra para ampliarla
+    fuzzy_similarity_threshold: float = float(
+        os.getenv("FUZZY_SIMILARITY_THRESHOLD", "0.3")
+    )
+    fuzzy_max_expansions: int = int(os.getenv("FUZZY_MAX_EXPANSIONS", "5"))
+    fuzzy_min_token_length: int = int(os.getenv("FUZZY_MIN_TOKEN_LENGTH", "3"))
+
+    # Importación NDJSON: notas por commit, tamaño máximo de línea y errores detallados
+    import_batch_size: int = 500
+    import_max_line_bytes: int = 1_048_576
+    import_max_errors: int = 100
+
+    # Formato de los logs: "text" (legible) o "json" (una línea JSON por registro)
+    log_format: str = os.getenv("LOG_FORMAT", "text").lower()
+
+    # Escribir los logs desde un hilo aparte
+    # (QueueHandler/QueueListener) para no bloquear el event loop
+    log_queue_enabled: bool = os.getenv("LOG_QUEUE", "true").lower() == "true"
+
+    # Fracción de peticiones correctas (< 400) que
+    # se registran; los errores se registran siempre
+    log_sample_rate: float = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+    # Fracción por plantilla de ruta, p. ej.
+    # {"/health": 0.01} (JSON en LOG_SAMPLE_RATES)
+    log_sample_rates: Dict[str, float] = json.loads(os.getenv("LOG_SAMPLE_RATES", "{}"))
+
+    # Longitud por defecto y máxima del campo
+    # preview (primeros caracteres del contenido)
+    preview_length: int = 200
+    preview_max_length: int = 1000
+
+    # Ruta rápida de lectura: serializar notas directamente desde las filas con orjson,
+    # sin construir modelos Pydantic ni revalidarlos contra response_model
+    fast_json: bool = os.getenv("FAST_JSON", "false").lower() == "true"
+
+    # Compresión de respuestas: codificaciones por orden de preferencia (zstd y br solo
+    # si zstandard/brotli están instalados) y tamaño mínimo del cuerpo para comprimir
+    compression_encodings: List[str] = ["zstd", "br", "gzip"]
+    compression_minimum_size: int = 1000
+
+    # Nivel por tipo de contenido y codificación; las exportaciones en streaming
+    # usan niveles más rápidos para no limitar el rendimiento del volcado
+    compression_levels: Dict[str, Dict[str, int]] = {
+        "default": {"zstd": 3, "br": 5, "gzip": 6},
+        "application/x-ndjson": {"zstd": 1, "br": 3, "gzip": 4},
+        "text/csv": {"zstd": 1, "br": 3, "gzip": 4},
+    }
+
+    # Feed SSE de cambios (GET /notes/stream): cola por suscriptor
+    # (al llenarse se envía resync), eventos recordados para Last-
+    # Event-ID, intervalo de keepalive y reintento del cliente
+    sse_queue_size: int = 100
+    sse_history_size: int = 1000
+    sse_keepalive_seconds: float = 15.0
+    sse_retry_ms: int = 3000
+
+    # Control de admisión: peticiones simultáneas por clase de ruta (read
+    # = GET/HEAD, write = resto), peticiones que pueden esperar turno y
+    # cuánto esperan antes de un 503 con Retry-After. Desactivado por
+    # defecto: activarlo cambia el comportamiento ante picos de carga
+    admission_enabled: bool = os.getenv("ADMISSION_CONTROL", "false").lower() == "true"
+    admission_limits: Dict[str, int] = {"read": 16, "write": 4}
+    admission_queue_sizes: Dict[str, int] = {"read": 64, "write": 32}
+    admission_queue_timeout: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+    admission_retry_after: int = 1
+
+    # Rutas fuera del control de admisión (conexiones largas o de monitorización)
+    admission_exempt_paths: List[str] = ["/health", "/metrics", "/api/v1/notes/stream"]
+
+    # Límite por IP de cliente (token bucket): peticiones por segundo y
+    # ráfaga máxima (0 = sin límite, por defecto). Detrás de un proxy hay
+    # que arrancar uvicorn con --proxy-headers y --forwarded-allow-ips; si
+    # no, todos los clientes comparten la IP del proxy y un solo bucket
+    rate_limit_per_second: float = float(os.getenv("RATE_LIMIT_PER_SECOND", "0"))
+    rate_limit_burst: int = int(os.getenv("RATE_LIMIT_BURST", "200"))
+    rate_limit_max_clients: int = 10000
+
+    # Intervalo mínimo entre avisos de peticiones rechazadas en los logs (segundos)
+    admission_log_interval: float = 10.0
+
+    # Exponer métricas de Prometheus en /metrics
+    # (peticiones, consultas SQL, pool y cachés)
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
     # Orígenes permitidos para CORS (frontend URLs)
     backend_cors_origins: List[str] = [
         "http://localhost:3000",  # React dev server
         "http://127.0.0.1:3000",  # Alternative localhost
         "http://localhost:5173",  # Vite dev server
-        "http://127.0.0.1:5173"   # Alternative Vite
+        "http://127.0.0.1:5173",  # Alternative Vite
     ]
 
+
 # Instancia global de configuración
-settings = Settings()
\ No newline at end of file
+settings = Settings()
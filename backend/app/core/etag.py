@@ -0,0 +1,55 @@
+# Utilidades para ETag y peticiones condicionales (If-None-Match -> 304)
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Las respuestas con ETag se revalidan siempre antes de reutilizarse
+CACHE_CONTROL = "no-cache"
+
+
+def note_etag(version: int) -> str:
+    """ETag fuerte de una nota a partir de su versión"""
+    return f'"v{version}"'
+
+
+def collection_etag(changes: int, vocabulary: Optional[int] = None) -> str:
+    """ETag fuerte de un listado a partir del contador de cambios de la colección
+
+    La URL (con sus parámetros) identifica el listado, así que basta con el
+    contador: cualquier escritura sobre notes lo incrementa. Las búsquedas
+    fuzzy dependen además del vocabulario en memoria (vocabulary es su
+    generación), que se carga en segundo plano sin tocar el contador.
+    """
+    if vocabulary is not None:
+        return f'"c{changes}t{vocabulary}"'
+    return f'"c{changes}"'
+
+
+def _opaque_tag(value: str) -> str:
+    """Quitar el prefijo W/ de un ETag débil (str.removeprefix requiere Python 3.9)"""
+    return value[2:] if value.startswith("W/") else value
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Comprobar If-None-Match con comparación débil (RFC 9110, sección 13.1.2)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Ignorar el prefijo W/ (los middlewares de compresión pueden debilitar el ETag)
+    candidates = {_opaque_tag(value.strip()) for value in header.split(",")}
+    return _opaque_tag(etag) in candidates
+
+
+def not_modified(etag: str) -> Response:
+    """Respuesta 304 sin cuerpo (no se serializa nada)"""
+    return Response(
+        status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Añadir el ETag y la política de revalidación a una respuesta"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
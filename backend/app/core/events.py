@@ -0,0 +1,194 @@
+# Difusión en proceso de los cambios de notas para el endpoint SSE (GET /notes/stream)
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Set
+
+from app.core.config import settings
+
+# Mensaje que indica al cliente que perdió eventos y debe volver a leer el listado
+RESYNC_MESSAGE = b"event: resync\ndata: {}\n\n"
+
+# Comentario SSE enviado a clientes inactivos para
+# que proxies y navegadores no cierren la conexión
+KEEPALIVE_MESSAGE = b": keepalive\n\n"
+
+
+# Evento de cambio con su identificador creciente y el mensaje SSE ya codificado
+class NoteEvent(NamedTuple):
+    """Cambio de una nota (created, updated o deleted)"""
+
+    id: int
+    type: str
+    message: bytes
+
+
+def encode_event(event_id: int, event_type: str, data: dict) -> bytes:
+    """Codificar un evento en formato text/event-
+    stream (una sola vez para todos los suscriptores)"""
+    payload = json.dumps(data, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n".encode()
+
+
+# Suscripción de un cliente: cola acotada en el event loop del servidor
+class Subscription:
+    """Cola de eventos de un suscriptor
+
+    Si el cliente no consume a tiempo y la cola se llena, se descartan los
+    eventos pendientes y se deja un único RESYNC_MESSAGE: el cliente vuelve a
+    leer el listado en lugar de recibir un historial que ya no puede alcanzar.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, message: bytes) -> None:
+        """Encolar un mensaje (solo desde el event loop de la suscripción)"""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_MESSAGE)
+
+
+# Publicador/suscriptor en memoria del proceso
+class NoteBroadcaster:
+    """Reparte los eventos de cambio de notas entre los suscriptores SSE
+
+    publish() se llama desde NoteService después de cada commit, normalmente en
+    un hilo del threadpool: los eventos se entregan en el event loop de cada
+    suscriptor con una sola llamada call_soon_threadsafe por loop. Un suscriptor
+    inactivo solo cuesta su cola vacía y una corrutina suspendida.
+
+    Los últimos history_size eventos se conservan para que un cliente que se
+    reconecta con Last-Event-ID reciba lo que se perdió (o un resync si ya no
+    están). Los eventos son locales al proceso: con varios workers cada uno
+    difunde solo sus propias escrituras.
+    """
+
+    def __init__(self, queue_size: int = 100, history_size: int = 1000):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscription] = set()
+        self._history: deque = deque(maxlen=history_size)
+        self._last_id = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, data: dict) -> NoteEvent:
+        """Registrar un evento y entregarlo a todos los suscriptores"""
+        with self._lock:
+            self._last_id += 1
+            event = NoteEvent(
+                self._last_id, event_type, encode_event(self._last_id, event_type, data)
+            )
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        if subscribers:
+            self._dispatch([event], subscribers)
+        return event
+
+    def publish_many(self, event_type: str, items: List[dict]) -> None:
+        """Publicar un evento por elemento con una
+        sola entrega por event loop (operaciones bulk)"""
+        if not items:
+            return
+        with self._lock:
+            events = []
+            for data in items:
+                self._last_id += 1
+                events.append(
+                    NoteEvent(
+                        self._last_id,
+                        event_type,
+                        encode_event(self._last_id, event_type, data),
+                    )
+                )
+            self._history.extend(events)
+            subscribers = list(self._subscribers)
+        if subscribers:
+            self._dispatch(events, subscribers)
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """Crear una suscripción en el event loop actual
+
+        Con last_event_id se encolan los eventos posteriores del historial, o un
+        resync si alguno ya se descartó o el id es de otro proceso (p. ej. antes
+        de un reinicio).
+        """
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            if last_event_id is not None and last_event_id != self._last_id:
+                missed = [event for event in self._history if event.id > last_event_id]
+                if (
+                    last_event_id > self._last_id
+                    or not missed
+                    or missed[0].id != last_event_id + 1
+                ):
+                    subscription.put(RESYNC_MESSAGE)
+                else:
+                    for event in missed:
+                        subscription.put(event.message)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _dispatch(
+        self, events: List[NoteEvent], subscribers: List[Subscription]
+    ) -> None:
+        by_loop: Dict[asyncio.AbstractEventLoop, List[Subscription]] = {}
+        for subscription in subscribers:
+            by_loop.setdefault(subscription.loop, []).append(subscription)
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for loop, group in by_loop.items():
+            if loop is current:
+                _deliver(events, group)
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(_deliver, events, group)
+
+
+def _deliver(events: List[NoteEvent], subscriptions: List[Subscription]) -> None:
+    for subscription in subscriptions:
+        for event in events:
+            subscription.put(event.message)
+
+
+async def stream_events(
+    broadcaster: NoteBroadcaster, last_event_id: Optional[int], keepalive: float
+) -> AsyncIterator[bytes]:
+    """Mensajes SSE de una suscripción hasta que el cliente se desconecta
+
+    La suscripción se crea al empezar a enviar la respuesta y se elimina al
+    cerrarse el generador (desconexión del cliente o apagado del servidor).
+    """
+    subscription = broadcaster.subscribe(last_event_id)
+    try:
+        # Intervalo de reconexión del EventSource;
+        # también envía las cabeceras de inmediato
+        yield f"retry: {settings.sse_retry_ms}\n\n".encode()
+        while True:
+            try:
+                yield await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE_MESSAGE
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+# Instancia global usada por NoteService y por el endpoint /notes/stream
+note_events = NoteBroadcaster(
+    queue_size=settings.sse_queue_size, history_size=settings.sse_history_size
+)
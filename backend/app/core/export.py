@@ -0,0 +1,67 @@
+# Codificadores de exportación de notas (NDJSON y CSV) para respuestas en streaming
+import csv
+import io
+import json
+from typing import Iterable, Iterator, List
+
+# Columnas exportadas, en el mismo orden que NoteOut
+EXPORT_FIELDS = [
+    "id",
+    "title",
+    "content",
+    "tags",
+    "archived",
+    "created_at",
+    "updated_at",
+]
+
+
+def ndjson_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """Codificar cada lote de notas como líneas JSON (un trozo por lote)"""
+    for batch in batches:
+        lines = [
+            json.dumps(
+                {
+                    **note,
+                    "created_at": note["created_at"].isoformat(),
+                    "updated_at": note["updated_at"].isoformat(),
+                },
+                ensure_ascii=False,
+            )
+            for note in batch
+        ]
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def csv_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """Codificar las notas como CSV con cabecera
+    (tags separados por comas en una celda)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batches:
+        for note in batch:
+            writer.writerow(
+                [
+                    note["id"],
+                    note["title"],
+                    note["content"],
+                    ",".join(note["tags"]),
+                    "true" if note["archived"] else "false",
+                    note["created_at"].isoformat(),
+                    note["updated_at"].isoformat(),
+                ]
+            )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Cabecera sola si no hubo ningún lote
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+# Formatos disponibles: tipo MIME, extensión del fichero y codificador
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson", ndjson_chunks),
+    "csv": ("text/csv; charset=utf-8", "csv", csv_chunks),
+}
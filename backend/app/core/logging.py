@@ -1,65 +1,161 @@
 # Importaciones para configuración de logging personalizado
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
 import sys
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Optional, TextIO
+
+from app.core.config import settings
+
+# Campos adicionales (extra=...) que se copian a la salida si están presentes
+EXTRA_FIELDS = (
+    "user_id",
+    "request_id",
+    "endpoint",
+    "route",
+    "status_code",
+    "duration",
+    "client_ip",
+    "error",
+)
+
 
 # Formateador personalizado para logs estructurados
 class CustomFormatter(logging.Formatter):
-    """Custom formatter for structured logging"""
-    
+    """Custom formatter for structured logging
+
+    With ``json_output`` each record is written as one JSON object per line;
+    otherwise a readable line for development.
+    """
+
+    def __init__(self, json_output: bool = False):
+        super().__init__()
+        self.json_output = json_output
+
     def format(self, record: logging.LogRecord) -> str:
         # Crear entrada de log estructurada con metadatos
-        log_entry = {
+        log_entry: Dict[str, Any] = {
             "timestamp": datetime.utcnow().isoformat(),  # Timestamp UTC
-            "level": record.levelname,                   # Nivel de log (INFO, ERROR, etc.)
-            "logger": record.name,                       # Nombre del logger
-            "message": record.getMessage(),              # Mensaje del log
-            "module": record.module,                     # Módulo donde se generó
-            "function": record.funcName,                 # Función donde se generó
-            "line": record.lineno                        # Línea de código
+            # Nivel de log (INFO, ERROR, etc.)
+            "level": record.levelname,
+            "logger": record.name,  # Nombre del logger
+            "message": record.getMessage(),  # Mensaje del log
+            "module": record.module,  # Módulo donde se generó
+            "function": record.funcName,  # Función donde se generó
+            "line": record.lineno,  # Línea de código
         }
-        
+
         # Agregar campos adicionales si están presentes
-        if hasattr(record, 'user_id'):
-            log_entry['user_id'] = record.user_id
-        if hasattr(record, 'request_id'):
-            log_entry['request_id'] = record.request_id
-        if hasattr(record, 'endpoint'):
-            log_entry['endpoint'] = record.endpoint
-            
+        for field in EXTRA_FIELDS:
+            if hasattr(record, field):
+                log_entry[field] = getattr(record, field)
+        if record.exc_info:
+            log_entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Traza ya formateada al encolar el registro (StructuredQueueHandler)
+            log_entry["exception"] = record.exc_text
+
+        # Formatear como JSON para agregadores de logs
+        if self.json_output:
+            return json.dumps(log_entry, default=str, ensure_ascii=False)
+
         # Formatear como string legible para desarrollo
-        formatted = f"[{log_entry['timestamp']}] {log_entry['level']} - {log_entry['message']}"
-        if 'endpoint' in log_entry:
+        formatted = (
+            f"[{log_entry['timestamp']}] {log_entry['level']} - {log_entry['message']}"
+        )
+        if "endpoint" in log_entry:
             formatted += f" | {log_entry['endpoint']}"
-            
+        if "exception" in log_entry:
+            formatted += f"\n{log_entry['exception']}"
+
         return formatted
 
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback apart from the message
+
+    The stock ``prepare()`` merges the formatted traceback into ``msg`` and
+    clears ``exc_info``, so the JSON output would lose its ``exception`` field.
+    Here the traceback is formatted into ``exc_text`` (releasing the frames
+    before the record crosses threads) and ``msg`` keeps only the message.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+# Listener que escribe los registros encolados (uno por proceso)
+_listener: Optional[logging.handlers.QueueListener] = None
+_atexit_registered = False
+
+
+def _stop_listener() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 # Función para configurar el sistema de logging de la aplicación
-def setup_logging():
-    """Setup application logging configuration"""
-    
+def setup_logging(stream: TextIO = None):
+    """Setup application logging configuration
+
+    Records are formatted and written by a QueueListener thread; the logging
+    call itself only enqueues the record, so a slow stdout pipe never blocks
+    the event loop.
+    """
+
     # Crear logger principal de la aplicación
     logger = logging.getLogger("notes_api")
     logger.setLevel(logging.INFO)
-    
-    # Remover handlers existentes para evitar duplicados
+
+    # Remover handlers existentes (y el listener anterior) para evitar duplicados
+    _stop_listener()
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
-    
+
     # Configurar handler para consola con formateador personalizado
-    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler = logging.StreamHandler(stream or sys.stdout)
     console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(CustomFormatter())
-    
-    # Agregar handler al logger
-    logger.addHandler(console_handler)
-    
+    console_handler.setFormatter(
+        CustomFormatter(json_output=settings.log_format == "json")
+    )
+
+    if settings.log_queue_enabled:
+        # Encolar en el hilo que registra y escribir desde el hilo del listener
+        global _listener, _atexit_registered
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(StructuredQueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(
+            log_queue, console_handler, respect_handler_level=True
+        )
+        _listener.start()
+        # Un solo registro en atexit aunque setup_logging se llame varias veces
+        if not _atexit_registered:
+            atexit.register(_stop_listener)
+            _atexit_registered = True
+    else:
+        # Agregar handler al logger
+        logger.addHandler(console_handler)
+
     # Configurar loggers de terceros para reducir ruido
-    logging.getLogger("uvicorn").setLevel(logging.WARNING)     # Servidor web
+    logging.getLogger("uvicorn").setLevel(logging.WARNING)  # Servidor web
     logging.getLogger("sqlalchemy").setLevel(logging.WARNING)  # ORM
-    
+
     return logger
 
+
 # Instancia global del logger para usar en toda la aplicación
-logger = setup_logging()
\ No newline at end of file
+logger = setup_logging()
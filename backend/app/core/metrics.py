@@ -0,0 +1,320 @@
+# Métricas en formato de texto de Prometheus
+# (peticiones HTTP, consultas SQL, pool y cachés)
+import bisect
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Tipo MIME del formato de exposición de texto de Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Límites de los histogramas (segundos)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Etiqueta de ruta para peticiones que no coinciden
+# con ninguna ruta (evita una serie por URL)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+# Almacenamiento por hilo: cada hilo escribe solo en su diccionario, sin bloqueos
+class _Shards:
+    """Diccionarios por hilo que se suman al exportar
+
+    Registrar una muestra solo toca el diccionario del hilo actual (bucle de
+    eventos o hilo del threadpool), así que no hay contención. El bloqueo solo se
+    toma la primera vez que un hilo registra algo y al exportar.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[dict] = []
+
+    def get(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            shards = list(self._shards)
+        # dict.copy() es atómico con el GIL aunque otro hilo esté escribiendo
+        return [shard.copy() for shard in shards]
+
+
+def _escape(value) -> str:
+    """Escapar barra invertida, comillas y
+    saltos de línea en el valor de una etiqueta"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence, **extra) -> str:
+    """Etiquetas {name="value",...} del formato de texto"""
+    pairs = [
+        f'{name}="{_escape(value)}"'
+        for name, value in list(zip(names, values)) + list(extra.items())
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# Métrica base con nombre, ayuda y etiquetas
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = _Shards()
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+
+class Counter(_Metric):
+    """Contador monótono por combinación de etiquetas"""
+
+    type_name = "counter"
+
+    def inc(self, labels: Tuple = (), amount: float = 1) -> None:
+        shard = self._shards.get()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> Dict[Tuple, float]:
+        totals: Dict[Tuple, float] = {}
+        for shard in self._shards.snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def expose(self) -> List[str]:
+        lines = self.header()
+        for labels, value in sorted(self.values().items()):
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}"
+            )
+        return lines
+
+
+class Gauge(Counter):
+    """Valor que sube y baja (peticiones en curso)"""
+
+    type_name = "gauge"
+
+    def dec(self, labels: Tuple = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    """Histograma con límites fijos; cada serie es [cuenta por cubo..., suma, total]"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = HTTP_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels: Tuple, value: float) -> None:
+        shard = self._shards.get()
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = [0] * (len(self.buckets) + 3)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def values(self) -> Dict[Tuple, List[float]]:
+        totals: Dict[Tuple, List[float]] = {}
+        for shard in self._shards.snapshot():
+            for labels, series in shard.items():
+                merged = totals.setdefault(labels, [0] * len(series))
+                for index, value in enumerate(list(series)):
+                    merged[index] += value
+        return totals
+
+    def expose(self) -> List[str]:
+        lines = self.header()
+        for labels, series in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = _format_labels(self.labelnames, labels, le=le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative:g}")
+            lines.append(
+                f"{self.name}_sum{_format_labels(self.labelnames, labels)} "
+                f"{series[-2]:g}"
+            )
+            lines.append(
+                f"{self.name}_count{_format_labels(self.labelnames, labels)} "
+                f"{series[-1]:g}"
+            )
+        return lines
+
+
+# Métricas HTTP (registradas por MetricsMiddleware)
+http_requests_total = Counter(
+    "http_requests_total", "Total HTTP requests", ("method", "route", "status")
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served", ("method",)
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency in seconds",
+    ("method", "route", "status"),
+)
+
+# Métricas de base de datos (registradas por eventos del motor)
+db_queries_total = Counter("db_queries_total", "SQL statements executed", ("engine",))
+db_query_duration_seconds = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement latency in seconds",
+    ("engine",),
+    DB_BUCKETS,
+)
+
+# Operaciones confirmadas por transacción del
+# agrupador de escrituras (settings.write_coalescing)
+db_write_batch_size = Histogram(
+    "db_write_batch_size",
+    "Note writes committed per coalesced transaction",
+    (),
+    (1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+_METRICS = [
+    http_requests_total,
+    http_requests_in_progress,
+    http_request_duration_seconds,
+    db_queries_total,
+    db_query_duration_seconds,
+    db_write_batch_size,
+]
+
+# Motores y cachés cuyos tamaños se leen al exportar
+_engines: Dict[str, Engine] = {}
+_caches: Dict[str, object] = {}
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Medir las consultas de un motor y exponer el estado de su pool"""
+    _engines[name] = engine
+    labels = (name,)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_query_start"].pop()
+        db_queries_total.inc(labels)
+        db_query_duration_seconds.observe(labels, time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # La consulta falló: descartar su instante de inicio
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("metrics_query_start"):
+            connection.info["metrics_query_start"].pop()
+
+
+def register_cache(name: str, cache) -> None:
+    """Exponer los contadores de una caché (objeto con stats())"""
+    _caches[name] = cache
+
+
+def _pool_lines() -> List[str]:
+    """Estado del pool de conexiones de cada motor instrumentado"""
+    lines = [
+        "# HELP db_pool_connections Connections in the engine pool by state",
+        "# TYPE db_pool_connections gauge",
+    ]
+    for name, engine in sorted(_engines.items()):
+        pool = engine.pool
+        states = {
+            "size": getattr(pool, "size", lambda: 0)(),
+            "checked_out": getattr(pool, "checkedout", lambda: 0)(),
+            "checked_in": getattr(pool, "checkedin", lambda: 0)(),
+            "overflow": max(getattr(pool, "overflow", lambda: 0)(), 0),
+        }
+        for state, value in states.items():
+            labels = _format_labels(("engine", "state"), (name, state))
+            lines.append(f"db_pool_connections{labels} {value:g}")
+    return lines
+
+
+def _cache_lines() -> List[str]:
+    """Tamaño y contadores de cada caché registrada"""
+    stats = {name: cache.stats() for name, cache in sorted(_caches.items())}
+    lines = []
+    for key, type_name, documentation in (
+        ("size", "gauge", "Entries currently cached"),
+        ("maxsize", "gauge", "Maximum number of cached entries"),
+        ("hits", "counter", "Cache hits"),
+        ("misses", "counter", "Cache misses"),
+        ("evictions", "counter", "Entries evicted to respect maxsize"),
+        ("expirations", "counter", "Entries dropped after their TTL"),
+    ):
+        name = f"cache_{key}" if type_name == "gauge" else f"cache_{key}_total"
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {type_name}"]
+        for cache_name, values in stats.items():
+            lines.append(
+                f"{name}{_format_labels(('cache',), (cache_name,))} "
+                f"{values.get(key, 0):g}"
+            )
+    return lines
+
+
+def render() -> str:
+    """Todas las métricas en el formato de exposición de texto de Prometheus"""
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines += metric.expose()
+    lines += _pool_lines()
+    lines += _cache_lines()
+    return "\n".join(lines) + "\n"
+
+
+def route_template(scope) -> str:
+    """Plantilla de la ruta que atendió la petición (p. ej. /api/v1/notes/{note_id})
+
+    Solo usa lo que Starlette documenta: la ruta elegida en scope["route"] (su
+    path_format y path_regex), scope["path"] y scope["root_path"]. Según la
+    versión de FastAPI, path_format de una ruta de un router incluido es la
+    ruta completa o solo la relativa al router; en el segundo caso el prefijo
+    es la parte de la URL que precede a lo que encaja con path_regex (los
+    prefijos de los routers de la aplicación son fijos, sin parámetros).
+    """
+    route = scope.get("route")
+    path_format: Optional[str] = getattr(route, "path_format", None)
+    path_regex = getattr(route, "path_regex", None)
+    if path_format is None or path_regex is None:
+        return UNMATCHED_ROUTE
+    root_path = scope.get("root_path", "")
+    path = scope.get("path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path) :]
+    # Primer sufijo (desde una barra) que encaja con la ruta: lo anterior es el prefijo
+    start = 0
+    while start != -1 and not path_regex.match(path[start:]):
+        start = path.find("/", start + 1)
+    prefix = path[:start] if start > 0 else ""
+    return root_path + prefix + path_format
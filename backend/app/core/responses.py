@@ -0,0 +1,49 @@
+# Respuestas JSON rápidas: serialización directa con orjson (si está instalado)
+import json
+from datetime import date, datetime
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la biblioteca estándar
+    orjson = None
+
+
+def _default(value):
+    """Serializar fechas igual que Pydantic (ISO 8601)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """Codificar a JSON compacto en UTF-8, con la
+    misma salida que la serialización de FastAPI"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que codifica diccionarios y listas ya construidos con orjson"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def fast_json_response(content, response: Response) -> FastJSONResponse:
+    """Respuesta ya serializada con las cabeceras
+    fijadas en el parámetro response de la ruta
+
+    Al devolver una Response, FastAPI no vuelve a validar el contenido contra
+    response_model (que se mantiene para el esquema OpenAPI).
+    """
+    return FastJSONResponse(content, headers=response.headers)
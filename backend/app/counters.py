@@ -0,0 +1,170 @@
+# Contadores de notas mantenidos por triggers de SQLite (ETag de colección y totales)
+from typing import List, Optional
+
+from sqlalchemy import String, cast, event, func, literal, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import Note, NoteCounter, NoteTag
+
+# Contador que aumenta con cada inserción, actualización o borrado de notas
+CHANGES = "changes"
+
+# Prefijos de los contadores de totales: notas por estado de archivado y por tag
+ARCHIVED_PREFIX = "archived:"
+TAG_PREFIX = "tag:"
+
+
+def archived_key(archived: bool) -> str:
+    """Clave del total de notas archivadas (archived:1) o activas (archived:0)"""
+    return f"{ARCHIVED_PREFIX}{int(bool(archived))}"
+
+
+def tag_key(tag: str) -> str:
+    """Clave del total de notas con un tag"""
+    return f"{TAG_PREFIX}{tag}"
+
+
+def _add(key_expression: str, delta: int) -> str:
+    """Sumar delta a un contador cuya clave es
+    una expresión SQL (creándolo si no existe)"""
+    return f"""
+    INSERT INTO note_counters(key, value) VALUES ({key_expression}, {delta})
+    ON CONFLICT(key) DO UPDATE SET value = value + ({delta});
+"""
+
+
+# Incrementar un contador (creándolo si no existe)
+_BUMP_CHANGES = f"""
+    INSERT INTO note_counters(key, value) VALUES ('{CHANGES}', 1)
+    ON CONFLICT(key) DO UPDATE SET value = value + 1;
+"""
+
+# Triggers idempotentes sobre notes: cambios y totales por estado de archivado
+_NOTE_STATEMENTS = [
+    f"""CREATE TRIGGER IF NOT EXISTS note_counters_ai AFTER INSERT ON notes BEGIN
+        {_BUMP_CHANGES}
+        {_add(f"'{ARCHIVED_PREFIX}' || new.archived", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS note_counters_au AFTER UPDATE ON notes BEGIN
+        {_BUMP_CHANGES}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS note_counters_au_archived
+    AFTER UPDATE OF archived ON notes
+    WHEN old.archived IS NOT new.archived BEGIN
+        {_add(f"'{ARCHIVED_PREFIX}' || old.archived", -1)}
+        {_add(f"'{ARCHIVED_PREFIX}' || new.archived", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS note_counters_ad AFTER DELETE ON notes BEGIN
+        {_BUMP_CHANGES}
+        {_add(f"'{ARCHIVED_PREFIX}' || old.archived", -1)}
+    END""",
+]
+
+# Triggers idempotentes sobre note_tags: total de notas por tag
+_TAG_STATEMENTS = [
+    f"""CREATE TRIGGER IF NOT EXISTS note_tag_counters_ai
+    AFTER INSERT ON note_tags BEGIN
+        {_add(f"'{TAG_PREFIX}' || new.tag", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS note_tag_counters_ad
+    AFTER DELETE ON note_tags BEGIN
+        {_add(f"'{TAG_PREFIX}' || old.tag", -1)}
+    END""",
+]
+
+_TRIGGER_NAMES = (
+    "note_counters_ai",
+    "note_counters_au",
+    "note_counters_au_archived",
+    "note_counters_ad",
+    "note_tag_counters_ai",
+    "note_tag_counters_ad",
+)
+
+
+def _key_range(prefix: str):
+    """Condición sobre la clave primaria para las claves que empiezan por prefix"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return (NoteCounter.key >= prefix) & (NoteCounter.key < upper)
+
+
+def is_supported(connection) -> bool:
+    """Indicar si la conexión usa un motor con los triggers de contadores"""
+    return connection.dialect.name == "sqlite"
+
+
+def create_counter_triggers(connection: Connection) -> None:
+    """Crear los triggers que mantienen los contadores"""
+    for statement in _NOTE_STATEMENTS + _TAG_STATEMENTS:
+        connection.execute(text(statement))
+
+
+def drop_counter_triggers(connection: Connection) -> None:
+    """Eliminar los triggers de contadores (para recrearlos con otra definición)"""
+    for name in _TRIGGER_NAMES:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def recount_totals(connection: Connection) -> None:
+    """Recalcular desde cero los totales por estado de archivado y por tag"""
+    for prefix in (ARCHIVED_PREFIX, TAG_PREFIX):
+        connection.execute(NoteCounter.__table__.delete().where(_key_range(prefix)))
+    archived_totals = select(
+        literal(ARCHIVED_PREFIX) + cast(Note.archived, String), func.count()
+    ).group_by(Note.archived)
+    tag_totals = select(literal(TAG_PREFIX) + NoteTag.tag, func.count()).group_by(
+        NoteTag.tag
+    )
+    for totals in (archived_totals, tag_totals):
+        connection.execute(
+            NoteCounter.__table__.insert().from_select(["key", "value"], totals)
+        )
+
+
+def get_counter(db: Session, key: str) -> Optional[int]:
+    """Leer un contador (None si el motor no mantiene contadores)"""
+    if not is_supported(db.get_bind()):
+        return None
+    return (
+        db.execute(select(NoteCounter.value).where(NoteCounter.key == key)).scalar()
+        or 0
+    )
+
+
+def sum_counters(db: Session, keys: List[str]) -> Optional[int]:
+    """Sumar varios contadores con una consulta (None si el motor no los mantiene)"""
+    if not is_supported(db.get_bind()):
+        return None
+    return (
+        db.execute(
+            select(func.sum(NoteCounter.value)).where(NoteCounter.key.in_(keys))
+        ).scalar()
+        or 0
+    )
+
+
+def get_tag_totals(db: Session, limit: int):
+    """Tags con más notas según los contadores, como filas (tag, total)"""
+    tag = func.substr(NoteCounter.key, len(TAG_PREFIX) + 1)
+    return db.execute(
+        select(tag, NoteCounter.value)
+        .where(_key_range(TAG_PREFIX), NoteCounter.value > 0)
+        .order_by(NoteCounter.value.desc(), tag)
+        .limit(limit)
+    )
+
+
+# Crear los triggers junto con las tablas notes y note_tags (create_all)
+@event.listens_for(Note.__table__, "after_create")
+def _create_triggers_with_table(target, connection, **kw):
+    if is_supported(connection):
+        for statement in _NOTE_STATEMENTS:
+            connection.execute(text(statement))
+
+
+@event.listens_for(NoteTag.__table__, "after_create")
+def _create_tag_triggers_with_table(target, connection, **kw):
+    if is_supported(connection):
+        for statement in _TAG_STATEMENTS:
+            connection.execute(text(statement))
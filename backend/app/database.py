@@ -1,25 +1,243 @@
 # Importaciones para configuración de base de datos SQLAlchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import functools
+import random
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import declarative_base, sessionmaker
+
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+
+# Códigos de error de SQLite que indican bloqueo temporal de la base de datos
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+# SQLSTATE de PostgreSQL que se resuelven reintentando la transacción
+# (serialization_failure, deadlock_detected, lock_not_available)
+POSTGRES_RETRYABLE_STATES = {"40001", "40P01", "55P03"}
+
+
+# Aplicar el perfil de PRAGMAs de SQLite a una conexión nueva
+def _apply_sqlite_pragmas(dbapi_connection, read_only: bool = False):
+    cursor = dbapi_connection.cursor()
+    # Activar claves foráneas (desactivadas por defecto en SQLite)
+    cursor.execute("PRAGMA foreign_keys=ON")
+    for name, value in settings.sqlite_pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    if read_only:
+        # Impedir escrituras accidentales desde el pool de lectura
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+# Configurar un motor SQLite: PRAGMAs en cada
+# conexión y, para el escritor, BEGIN IMMEDIATE
+def configure_sqlite_engine(engine, read_only: bool = False, immediate: bool = False):
+    """Registrar los eventos de conexión del perfil de ajuste en un motor SQLite"""
+    if engine.dialect.name != "sqlite":
+        return engine
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        if immediate:
+            # Desactivar el BEGIN implícito de pysqlite para emitir el nuestro
+            dbapi_connection.isolation_level = None
+        _apply_sqlite_pragmas(dbapi_connection, read_only=read_only)
+
+    if immediate:
+        # Tomar el bloqueo de escritura al empezar la transacción: evita que una
+        # lectura que luego escribe falle con SQLITE_BUSY al intentar promocionarse
+        @event.listens_for(engine, "begin")
+        def _on_begin(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
 
-# Crear motor de base de datos SQLite con configuración para threading
-engine = create_engine(
-    settings.database_url, 
-    connect_args={"check_same_thread": False}  # Permitir acceso desde múltiples threads
+
+# Opciones del pool según el motor: SQLite usa su perfil
+# de escritor único, PostgreSQL un QueuePool ajustable
+def engine_options(url: str, read_only: bool = False) -> dict:
+    """Argumentos de create_engine para el motor de escritura o de lectura"""
+    if url.startswith("sqlite"):
+        return {
+            # Permitir acceso desde múltiples threads
+            "connect_args": {"check_same_thread": False},
+            "pool_size": (
+                settings.sqlite_read_pool_size
+                if read_only
+                else settings.sqlite_write_pool_size
+            ),
+            "max_overflow": settings.sqlite_read_pool_size if read_only else 0,
+        }
+    options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if read_only and url.startswith("postgresql"):
+        # Equivalente a PRAGMA query_only: transacciones
+        # de solo lectura en el pool de lectura
+        options["connect_args"] = {"options": "-c default_transaction_read_only=on"}
+    return options
+
+
+# Crear motor de escritura con configuración para threading
+engine = configure_sqlite_engine(
+    create_engine(settings.database_url, **engine_options(settings.database_url)),
+    immediate=True,
 )
 
-# Configurar fábrica de sesiones de base de datos
+# Crear motor de solo lectura con su propio pool:
+# con WAL los lectores no esperan al escritor
+read_engine = configure_sqlite_engine(
+    create_engine(
+        settings.read_database_url,
+        **engine_options(settings.read_database_url, read_only=True),
+    ),
+    read_only=True,
+)
+
+# Medir consultas y estado del pool de ambos motores (/metrics)
+if settings.metrics_enabled:
+    instrument_engine(engine, "write")
+    instrument_engine(read_engine, "read")
+
+# Configurar fábricas de sesiones de base de datos (escritura y lectura)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
 
 # Clase base para todos los modelos de SQLAlchemy
 Base = declarative_base()
 
+
 # Función generadora para obtener sesiones de base de datos
 def get_db():
     """Crear y gestionar sesión de base de datos con cleanup automático"""
     db = SessionLocal()  # Crear nueva sesión
     try:
-        yield db         # Proporcionar sesión al endpoint
+        yield db  # Proporcionar sesión al endpoint
+    finally:
+        db.close()  # Cerrar sesión al finalizar
+
+
+# Función generadora para obtener sesiones del motor de solo lectura
+def get_read_db():
+    """Crear y gestionar sesión de solo lectura para endpoints GET"""
+    db = ReadSessionLocal()
+    try:
+        yield db
     finally:
-        db.close()       # Cerrar sesión al finalizar
\ No newline at end of file
+        db.close()
+
+
+# Detectar errores de bloqueo (SQLITE_BUSY / SQLITE_LOCKED,
+# o conflictos de PostgreSQL) que merece la pena reintentar
+def is_busy_error(exc: Exception) -> bool:
+    """Indicar si un error de base de datos se debe a un bloqueo temporal"""
+    if not isinstance(exc, OperationalError):
+        return False
+    # psycopg 3 expone el SQLSTATE como sqlstate (psycopg2 como pgcode)
+    state = getattr(exc.orig, "sqlstate", None) or getattr(exc.orig, "pgcode", None)
+    if state is not None:
+        return state in POSTGRES_RETRYABLE_STATES
+    code = getattr(exc.orig, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (SQLITE_BUSY, SQLITE_LOCKED)
+    message = str(exc.orig).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+# Esperas entre reintentos: backoff exponencial con jitter
+def busy_retry_delays():
+    """Generar los segundos de espera antes de cada reintento"""
+    for attempt in range(settings.db_busy_retries):
+        base = settings.db_busy_backoff_ms / 1000 * (2**attempt)
+        yield base * (1 + random.random())
+
+
+# Decorador para métodos de servicio que escriben en la base de datos
+def retry_on_busy(method):
+    """Reintentar la operación completa (tras rollback) si SQLite está bloqueado"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not getattr(self, "retry_on_busy", True):
+            return method(self, *args, **kwargs)
+        for delay in busy_retry_delays():
+            try:
+                return method(self, *args, **kwargs)
+            except OperationalError as exc:
+                if not is_busy_error(exc):
+                    raise
+                self.db.rollback()
+                time.sleep(delay)
+        # Último intento: si vuelve a fallar el error llega al manejador global
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+# Crear un motor asíncrono con el mismo perfil que los síncronos
+def create_async_database_engine(url: str, read_only: bool = False):
+    """Motor asíncrono (aiosqlite o psycopg) de escritura o de solo lectura
+
+    Mismas opciones de pool y, en SQLite, los mismos PRAGMAs: el de escritura
+    abre sus transacciones con BEGIN IMMEDIATE y el de lectura usa query_only.
+    """
+    # Importación diferida: el modo síncrono no necesita aiosqlite
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_engine = create_async_engine(url, **engine_options(url, read_only=read_only))
+    configure_sqlite_engine(
+        async_engine.sync_engine, read_only=read_only, immediate=not read_only
+    )
+    return async_engine
+
+
+# Motores y fábricas de sesiones asíncronas,
+# creados solo si se usan (settings.async_database)
+_async_engine = None
+_async_session_factory = None
+_async_read_session_factory = None
+
+
+def get_async_engine():
+    """Crear (una sola vez) los motores asíncronos de escritura y de lectura"""
+    global _async_engine, _async_session_factory, _async_read_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_engine = create_async_database_engine(settings.async_database_url)
+        async_read_engine = create_async_database_engine(
+            settings.async_read_database_url, read_only=True
+        )
+        if settings.metrics_enabled:
+            instrument_engine(_async_engine.sync_engine, "async")
+            instrument_engine(async_read_engine.sync_engine, "async_read")
+        _async_session_factory = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+        _async_read_session_factory = async_sessionmaker(
+            async_read_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+# Función generadora asíncrona para obtener sesiones del motor asíncrono
+async def get_async_db():
+    """Crear y gestionar una sesión asíncrona con cleanup automático"""
+    get_async_engine()
+    async with _async_session_factory() as db:
+        yield db
+
+
+# Función generadora asíncrona para obtener sesiones del motor asíncrono de solo lectura
+async def get_async_read_db():
+    """Crear y gestionar una sesión asíncrona de solo lectura para endpoints GET"""
+    get_async_engine()
+    async with _async_read_session_factory() as db:
+        yield db
@@ -1,26 +1,45 @@
 # Importaciones para manejo de excepciones y respuestas HTTP
+import logging
+from datetime import datetime
+
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
-from sqlalchemy.exc import SQLAlchemyError
 from pydantic import ValidationError as PydanticValidationError
-from datetime import datetime
-import logging
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database import is_busy_error
 
 # Configurar logger para registrar errores
 logger = logging.getLogger(__name__)
 
+
 # Excepción personalizada para recursos no encontrados (404)
 class NotFoundError(HTTPException):
     """Excepción para cuando no se encuentra un recurso solicitado"""
+
     def __init__(self, detail: str = "Resource not found"):
         super().__init__(status_code=404, detail=detail)
 
+
 # Excepción personalizada para errores de validación (422)
 class ValidationError(HTTPException):
     """Excepción para errores de validación de datos"""
+
     def __init__(self, detail: str = "Validation error"):
         super().__init__(status_code=422, detail=detail)
 
+
+# Excepción personalizada para sobrecarga temporal (503 con Retry-After)
+class ServiceUnavailableError(HTTPException):
+    """Excepción para cuando el servidor no
+    puede atender la petición ahora (reintentar)"""
+
+    def __init__(self, detail: str = "Server busy, please retry", retry_after: int = 1):
+        super().__init__(
+            status_code=503, detail=detail, headers={"Retry-After": str(retry_after)}
+        )
+
+
 # Manejador para errores de recurso no encontrado (404)
 async def not_found_handler(request: Request, exc: NotFoundError):
     """Manejar errores 404 y devolver respuesta JSON estandarizada"""
@@ -29,10 +48,11 @@ async def not_found_handler(request: Request, exc: NotFoundError):
         content={
             "detail": exc.detail,
             "error_code": "NOT_FOUND",
-            "timestamp": datetime.utcnow().isoformat()
-        }
+            "timestamp": datetime.utcnow().isoformat(),
+        },
     )
 
+
 # Manejador para errores de validación personalizados (422)
 async def validation_error_handler(request: Request, exc: ValidationError):
     """Manejar errores de validación personalizados y devolver respuesta JSON"""
@@ -41,12 +61,29 @@ async def validation_error_handler(request: Request, exc: ValidationError):
         content={
             "detail": exc.detail,
             "error_code": "VALIDATION_ERROR",
-            "timestamp": datetime.utcnow().isoformat()
-        }
+            "timestamp": datetime.utcnow().isoformat(),
+        },
     )
 
+
+# Manejador para sobrecarga temporal (503)
+async def service_unavailable_handler(request: Request, exc: ServiceUnavailableError):
+    """Manejar sobrecargas temporales con Retry-After y respuesta JSON estandarizada"""
+    return JSONResponse(
+        status_code=503,
+        headers=exc.headers,
+        content={
+            "detail": exc.detail,
+            "error_code": "SERVER_BUSY",
+            "timestamp": datetime.utcnow().isoformat(),
+        },
+    )
+
+
 # Manejador para errores de validación de Pydantic (422)
-async def pydantic_validation_error_handler(request: Request, exc: PydanticValidationError):
+async def pydantic_validation_error_handler(
+    request: Request, exc: PydanticValidationError
+):
     """Manejar errores de validación de Pydantic con detalles específicos"""
     return JSONResponse(
         status_code=422,
@@ -54,23 +91,37 @@ async def pydantic_validation_error_handler(request: Request, exc: PydanticValid
             "detail": "Validation failed",
             "error_code": "VALIDATION_ERROR",
             "errors": exc.errors(),  # Incluir detalles específicos de validación
-            "timestamp": datetime.utcnow().isoformat()
-        }
+            "timestamp": datetime.utcnow().isoformat(),
+        },
     )
 
+
 # Manejador para errores de base de datos (500)
 async def database_error_handler(request: Request, exc: SQLAlchemyError):
     """Manejar errores de base de datos y registrar en logs"""
     logger.error(f"Database error: {exc}")  # Registrar error para debugging
+    if is_busy_error(exc):
+        # Bloqueo persistente tras agotar los reintentos:
+        # error temporal (503), no fallo interno
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": "1"},
+            content={
+                "detail": "Database busy, please retry",
+                "error_code": "DATABASE_BUSY",
+                "timestamp": datetime.utcnow().isoformat(),
+            },
+        )
     return JSONResponse(
         status_code=500,
         content={
             "detail": "Internal server error",
             "error_code": "DATABASE_ERROR",
-            "timestamp": datetime.utcnow().isoformat()
-        }
+            "timestamp": datetime.utcnow().isoformat(),
+        },
     )
 
+
 # Manejador general para excepciones no controladas (500)
 async def general_exception_handler(request: Request, exc: Exception):
     """Manejar excepciones generales no controladas"""
@@ -80,6 +131,6 @@ async def general_exception_handler(request: Request, exc: Exception):
         content={
             "detail": "Internal server error",
             "error_code": "INTERNAL_ERROR",
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    )
\ No newline at end of file
+            "timestamp": datetime.utcnow().isoformat(),
+        },
+    )
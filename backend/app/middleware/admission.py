@@ -0,0 +1,266 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.middleware.logging import client_ip
+
+# Methods that only read; every other method competes for the write slots
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def route_class(method: str) -> str:
+    """Admission class of a request: ``read`` or ``write``"""
+    return "read" if method in READ_METHODS else "write"
+
+
+class RateLimiter:
+    """Token bucket per client key (IP address)
+
+    Each client earns ``rate`` tokens per second up to ``burst``; a request
+    spends one. Buckets are kept in LRU order and capped at ``max_clients``, so
+    memory stays bounded no matter how many addresses are seen (an evicted
+    client simply starts again with a full bucket).
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, key: str, now: Optional[float] = None) -> float:
+        """Spend a token for ``key``; return 0 if
+        allowed, else seconds until the next token"""
+        now = time.monotonic() if now is None else now
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` requests in flight, with a bounded FIFO wait queue
+
+    When every slot is taken, up to ``queue_size`` requests wait for one (at most
+    ``timeout`` seconds); beyond that they are rejected immediately, so a burst
+    turns into fast 503s instead of a pile of requests that all time out.
+    A released slot is handed directly to the oldest waiter.
+    """
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if needed; False if rejected"""
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._abandon(waiter)
+        except asyncio.CancelledError:
+            # Client went away while queued: give back
+            # a slot that was already handed over
+            if self._abandon(waiter):
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Free a slot, handing it to the oldest waiter if there is one"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _abandon(self, waiter: asyncio.Future) -> bool:
+        """Stop waiting; True if a slot was handed
+        over in the meantime (the caller owns it)"""
+        if waiter.done():
+            return True
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        return False
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying per-client
+    rate limits and per-class concurrency limits
+
+    Every request first spends a token from its client's bucket (429 when
+    empty) and then takes a slot from the limiter of its class, ``read``
+    (GET/HEAD/OPTIONS) or ``write`` (everything else), waiting in a bounded queue when
+    the class is saturated (503 when the queue is full or the wait times out).
+    Both rejections carry ``Retry-After`` and never reach the threadpool or the
+    database. Paths in ``exempt_paths`` (health checks, metrics, the SSE feed)
+    bypass both checks.
+
+    Rejections are summarized in the logs at most once per ``log_interval``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limits: Optional[Dict[str, int]] = None,
+        queue_sizes: Optional[Dict[str, int]] = None,
+        queue_timeout: Optional[float] = None,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        exempt_paths: Optional[Iterable[str]] = None,
+        log_interval: Optional[float] = None,
+    ):
+        self.app = app
+        limits = settings.admission_limits if limits is None else limits
+        queue_sizes = (
+            settings.admission_queue_sizes if queue_sizes is None else queue_sizes
+        )
+        queue_timeout = (
+            settings.admission_queue_timeout if queue_timeout is None else queue_timeout
+        )
+        rate = settings.rate_limit_per_second if rate is None else rate
+        burst = settings.rate_limit_burst if burst is None else burst
+        self.limiters = {
+            name: ConcurrencyLimiter(limit, queue_sizes.get(name, 0), queue_timeout)
+            for name, limit in limits.items()
+        }
+        self.rate_limiter = (
+            RateLimiter(rate, burst, settings.rate_limit_max_clients)
+            if rate > 0
+            else None
+        )
+        self.exempt_paths = set(
+            settings.admission_exempt_paths if exempt_paths is None else exempt_paths
+        )
+        self.log_interval = (
+            settings.admission_log_interval if log_interval is None else log_interval
+        )
+        self.rejections: Dict[Tuple[str, str], int] = {}
+        self._last_report = float("-inf")
+        logger.info(
+            "Admission control: "
+            + ", ".join(
+                f"{name} {limiter.limit} in flight (+{limiter.queue_size} queued)"
+                for name, limiter in self.limiters.items()
+            )
+            + f", queue timeout {queue_timeout}s, "
+            + (
+                f"rate limit {rate}/s burst {burst} per client"
+                if self.rate_limiter
+                else "no rate limit"
+            )
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        kind = route_class(scope["method"])
+        if self.rate_limiter is not None:
+            retry_after = self.rate_limiter.acquire(client_ip(scope))
+            if retry_after:
+                self._record_rejection("rate_limited", kind)
+                await self._reject(
+                    scope,
+                    receive,
+                    send,
+                    429,
+                    "RATE_LIMITED",
+                    "Too many requests",
+                    math.ceil(retry_after),
+                )
+                return
+
+        limiter = self.limiters.get(kind)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        if not await limiter.acquire():
+            self._record_rejection("overloaded", kind)
+            await self._reject(
+                scope,
+                receive,
+                send,
+                503,
+                "SERVER_BUSY",
+                "Server busy, please retry",
+                settings.admission_retry_after,
+            )
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _reject(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        status_code: int,
+        error_code: str,
+        detail: str,
+        retry_after: int,
+    ) -> None:
+        response = JSONResponse(
+            status_code=status_code,
+            headers={"Retry-After": str(max(retry_after, 1))},
+            content={
+                "detail": detail,
+                "error_code": error_code,
+                "timestamp": datetime.utcnow().isoformat(),
+            },
+        )
+        await response(scope, receive, send)
+
+    def _record_rejection(self, reason: str, kind: str) -> None:
+        key = (reason, kind)
+        self.rejections[key] = self.rejections.get(key, 0) + 1
+        now = time.monotonic()
+        if now - self._last_report < self.log_interval:
+            return
+        self._last_report = now
+        summary = ", ".join(
+            f"{count} {reason} ({kind})"
+            for (reason, kind), count in sorted(self.rejections.items())
+        )
+        in_flight = ", ".join(
+            f"{name} {limiter.in_flight}/{limiter.limit} in flight, {limiter.queued} "
+            "queued"
+            for name, limiter in self.limiters.items()
+        )
+        logger.warning(f"Admission control rejected requests: {summary}; {in_flight}")
+        self.rejections.clear()
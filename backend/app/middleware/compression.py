@@ -0,0 +1,254 @@
+import zlib
+from typing import Callable, Dict, Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# Optional codecs: zstd and br are only offered when their packages are installed
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+# Media types worth compressing (text/* is always included)
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+# Never compressed: event streams must reach the client as soon as they are sent
+EXCLUDED_TYPES = {"text/event-stream"}
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        self._zlib = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+    def __init__(self, level: int):
+        self._brotli = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._brotli.process(data)
+
+    def flush(self) -> bytes:
+        return self._brotli.flush()
+
+    def finish(self) -> bytes:
+        return self._brotli.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self, level: int):
+        self._zstd = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._zstd.compress(data)
+
+    def flush(self) -> bytes:
+        return self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+# Available encodings in server preference order (used to break q-value ties)
+COMPRESSORS: Dict[str, Callable[[int], object]] = {
+    name: factory
+    for name, factory, module in (
+        ("zstd", _ZstdCompressor, zstandard),
+        ("br", _BrotliCompressor, brotli),
+        ("gzip", _GzipCompressor, zlib),
+    )
+    if module is not None
+}
+
+
+def negotiate(accept_encoding: str, available: Sequence[str]) -> Optional[str]:
+    """Pick the available encoding with the highest q-value in ``Accept-Encoding``
+
+    Ties go to the order of ``available``; ``*`` covers codings not listed and
+    ``q=0`` refuses a coding. Returns None when the response should stay
+    uncompressed.
+    """
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    """Whether a response with this Content-Type should be compressed"""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if not media_type or media_type in EXCLUDED_TYPES:
+        return False
+    return (
+        media_type.startswith("text/")
+        or media_type in COMPRESSIBLE_TYPES
+        or media_type.endswith("+json")
+    )
+
+
+def compression_level(
+    content_type: str, encoding: str, levels: Dict[str, Dict[str, int]]
+) -> int:
+    """Level for ``encoding`` from the media type's
+    entry, falling back to ``levels["default"]``"""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return levels.get(media_type, {}).get(encoding, levels["default"][encoding])
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses with zstd, br or gzip
+
+    The encoding is negotiated from ``Accept-Encoding`` among the codecs that
+    are installed, and the level comes from ``settings.compression_levels`` by
+    media type. Single-body responses smaller than ``minimum_size``, responses
+    that already have a ``Content-Encoding`` and non-compressible media types
+    (including ``text/event-stream``) pass through unchanged.
+
+    Streaming responses are compressed chunk by chunk, flushing the compressor
+    after each chunk so the client receives data as soon as the application
+    sends it. Compressed responses get ``Vary: Accept-Encoding`` and their
+    ETag is weakened, since the bytes differ from the identity representation.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1000,
+        levels: Optional[Dict[str, Dict[str, int]]] = None,
+        encodings: Optional[Sequence[str]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = levels or settings.compression_levels
+        self.encodings = [
+            name
+            for name in encodings or settings.compression_encodings
+            if name in COMPRESSORS
+        ]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(
+            Headers(scope=scope).get("accept-encoding", ""), self.encodings
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compressor = None
+        started = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, compressor, started
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body chunk shows the size
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                if start_message is not None and not started:
+                    started = True
+                    await send(start_message)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if not started:
+                started = True
+                start_message["headers"] = list(start_message.get("headers", []))
+                headers = MutableHeaders(raw=start_message["headers"])
+                if not self._should_compress(
+                    start_message["status"], headers, body, more_body
+                ):
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                content_type = headers.get("content-type", "")
+                compressor = COMPRESSORS[encoding](
+                    compression_level(content_type, encoding, self.levels)
+                )
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                if more_body:
+                    # Length of the streamed body is not known in advance
+                    del headers["Content-Length"]
+                    message["body"] = compressor.compress(body) + compressor.flush()
+                else:
+                    message["body"] = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(message["body"]))
+                await send(start_message)
+                await send(message)
+                return
+
+            if compressor is None:
+                await send(message)
+                return
+            data = compressor.compress(body)
+            message["body"] = data + (
+                compressor.flush() if more_body else compressor.finish()
+            )
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    def _should_compress(
+        self, status: int, headers: MutableHeaders, body: bytes, more_body: bool
+    ) -> bool:
+        if status < 200 or status in (204, 304):
+            return False
+        if "content-encoding" in headers or not is_compressible(
+            headers.get("content-type", "")
+        ):
+            return False
+        # Small single-body responses are not worth
+        # the CPU; streams are always compressed
+        return more_body or len(body) >= self.minimum_size
@@ -1,56 +1,100 @@
+import logging
+import random
 import time
 import uuid
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
 from app.core.logging import logger
+from app.core.metrics import route_template
+
+
+def client_ip(scope: Scope) -> str:
+    """Client address of an ASGI connection (the
+    proxy's unless uvicorn runs with --proxy-headers)"""
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class LoggingMiddleware:
+    """Pure ASGI middleware for request/response logging
+
+    Only observes the ``http.response.start`` message to capture the status code,
+    so requests and responses are passed through without the extra task and
+    stream wrapping of ``BaseHTTPMiddleware``.
+
+    Each request produces one access log line on completion. Successful
+    responses are sampled per route template (``settings.log_sample_rates``,
+    falling back to ``settings.log_sample_rate``); 4xx/5xx responses and
+    exceptions are always logged.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for request/response logging"""
-    
-    async def dispatch(self, request: Request, call_next):
         # Generate request ID
-        request_id = str(uuid.uuid4())[:8]
-        
-        # Log request
-        start_time = time.time()
-        logger.info(
-            f"Request started: {request.method} {request.url.path}",
-            extra={
-                "request_id": request_id,
-                "endpoint": f"{request.method} {request.url.path}",
-                "client_ip": request.client.host if request.client else "unknown"
-            }
-        )
-        
+        request_id = uuid.uuid4().hex[:8]
+        endpoint = f"{scope['method']} {scope['path']}"
+        ip = client_ip(scope)
+
+        # Log request (debug level: the completion line carries the same fields)
+        start_time = time.perf_counter()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Request started: {endpoint}",
+                extra={"request_id": request_id, "endpoint": endpoint, "client_ip": ip},
+            )
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
         # Process request
         try:
-            response = await call_next(request)
-            
-            # Calculate duration
-            duration = time.time() - start_time
-            
-            # Log response
-            logger.info(
-                f"Request completed: {response.status_code} in {duration:.3f}s",
-                extra={
-                    "request_id": request_id,
-                    "endpoint": f"{request.method} {request.url.path}",
-                    "status_code": response.status_code,
-                    "duration": duration
-                }
-            )
-            
-            return response
-            
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            duration = time.time() - start_time
+            duration = time.perf_counter() - start_time
             logger.error(
                 f"Request failed: {str(e)} in {duration:.3f}s",
                 extra={
                     "request_id": request_id,
-                    "endpoint": f"{request.method} {request.url.path}",
+                    "endpoint": endpoint,
+                    "route": route_template(scope),
+                    "client_ip": ip,
                     "error": str(e),
-                    "duration": duration
-                }
+                    "duration": duration,
+                },
             )
-            raise
\ No newline at end of file
+            raise
+
+        # Sample successful responses per route; errors are never sampled away
+        route = route_template(scope)
+        if status_code < 400:
+            rate = settings.log_sample_rates.get(route, settings.log_sample_rate)
+            if rate < 1.0 and random.random() >= rate:
+                return
+
+        # Log response once the body has been sent
+        duration = time.perf_counter() - start_time
+        logger.log(
+            logging.ERROR if status_code >= 500 else logging.INFO,
+            f"Request completed: {status_code} in {duration:.3f}s",
+            extra={
+                "request_id": request_id,
+                "endpoint": endpoint,
+                "route": route,
+                "client_ip": ip,
+                "status_code": status_code,
+                "duration": duration,
+            },
+        )
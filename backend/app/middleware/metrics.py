@@ -0,0 +1,41 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request counts, in-flight requests and latency
+
+    Requests are labelled by route template (``/api/v1/notes/{note_id}``) rather
+    than raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.http_requests_in_progress.inc((method,))
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            labels = (method, metrics.route_template(scope), str(status_code))
+            metrics.http_requests_total.inc(labels)
+            metrics.http_request_duration_seconds.observe(labels, duration)
+            metrics.http_requests_in_progress.dec((method,))
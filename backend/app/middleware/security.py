@@ -1,40 +1,74 @@
+import secrets
+
 from fastapi import FastAPI
-from fastapi.middleware.gzip import GZipMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-import secrets
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.middleware.compression import CompressionMiddleware
+
 
 def setup_security_middleware(app: FastAPI) -> None:
     """Setup security-related middleware"""
-    
-    # Add GZip compression
-    app.add_middleware(GZipMiddleware, minimum_size=1000)
-    
+
+    # Add response compression (zstd/br/gzip negotiated per request)
+    app.add_middleware(
+        CompressionMiddleware, minimum_size=settings.compression_minimum_size
+    )
+
     # Add session middleware with secure secret
     # In production, this should come from environment variables
     secret_key = secrets.token_urlsafe(32)
     app.add_middleware(
-        SessionMiddleware, 
+        SessionMiddleware,
         secret_key=secret_key,
         max_age=3600,  # 1 hour
         same_site="lax",
-        https_only=False  # Set to True in production with HTTPS
+        https_only=False,  # Set to True in production with HTTPS
     )
 
+
+# Security headers added to every response (ASGI header names are lowercase bytes)
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+]
+
+# Headers replaced by SECURITY_HEADERS or removed (server)
+_STRIPPED_HEADERS = {name for name, _ in SECURITY_HEADERS} | {b"server"}
+
+
+class SecurityHeadersMiddleware:
+    """Pure ASGI middleware that sets security headers on ``http.response.start``
+
+    The body is never touched, so streaming responses pass through unchanged.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Security headers, and remove server header for security
+                headers = [
+                    (name, value)
+                    for name, value in message.get("headers", [])
+                    if name.lower() not in _STRIPPED_HEADERS
+                ]
+                headers.extend(SECURITY_HEADERS)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
 def add_security_headers(app: FastAPI) -> None:
     """Add security headers to responses"""
-    
-    @app.middleware("http")
-    async def security_headers(request, call_next):
-        response = await call_next(request)
-        
-        # Security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        
-        # Remove server header for security
-        if "server" in response.headers:
-            del response.headers["server"]
-        
-        return response
\ No newline at end of file
+    app.add_middleware(SecurityHeadersMiddleware)
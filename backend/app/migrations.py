@@ -0,0 +1,139 @@
+# Migraciones ligeras del esquema para bases de datos existentes
+from typing import Callable, Dict
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    Table,
+    delete,
+    insert,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection, Engine
+
+from app import counters, search, tag_index
+from app.database import Base
+from app.models import Note, NoteTag
+from app.services.note_service import normalize_tags
+
+# Versión del esquema registrada en la tabla schema_version
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _metadata, Column("version", Integer, nullable=False)
+)
+
+# Tamaño de lote para copiar datos existentes
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _create_search_index(connection: Connection) -> None:
+    """v1: índice FTS5 de título/contenido"""
+    if search.is_search_supported(connection) and not search.search_index_exists(
+        connection
+    ):
+        search.rebuild_search_index(connection)
+
+
+def _create_keyset_indexes(connection: Connection) -> None:
+    """v2: índices compuestos (fecha, id) para paginación por cursor"""
+    for index in Note.__table__.indexes:
+        index.create(bind=connection, checkfirst=True)
+
+
+def _backfill_note_tags(connection: Connection) -> None:
+    """v3: copiar los tags separados por comas de cada nota a note_tags"""
+    connection.execute(delete(NoteTag))
+    rows = connection.execute(select(Note.id, Note.tags).where(Note.tags != ""))
+    for partition in rows.partitions(BACKFILL_BATCH_SIZE):
+        tag_rows = [
+            {"note_id": note_id, "tag": tag}
+            for note_id, tags in partition
+            for tag in normalize_tags(tags.split(","))
+        ]
+        if tag_rows:
+            connection.execute(insert(NoteTag), tag_rows)
+
+
+def _add_note_versions(connection: Connection) -> None:
+    """v4: columna version (ETag por nota) y triggers del contador de cambios"""
+    columns = {column["name"] for column in inspect(connection).get_columns("notes")}
+    if "version" not in columns:
+        connection.execute(
+            text("ALTER TABLE notes ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        )
+    if counters.is_supported(connection):
+        counters.create_counter_triggers(connection)
+
+
+def _add_total_counters(connection: Connection) -> None:
+    """v5: totales por estado de archivado y por tag (X-Total-Count y GET /tags/)"""
+    if counters.is_supported(connection):
+        # Recrear los triggers de v4 con el mantenimiento de los totales
+        counters.drop_counter_triggers(connection)
+        counters.create_counter_triggers(connection)
+        counters.recount_totals(connection)
+
+
+def _add_postgres_indexes(connection: Connection) -> None:
+    """v6: en PostgreSQL, columna tsvector con
+    índice GIN e índice GIN del array de tags"""
+    if search.is_postgresql(connection):
+        search.create_search_index(connection)
+    if tag_index.is_supported(connection):
+        tag_index.create_tags_index(connection)
+
+
+def _add_search_vocabulary(connection: Connection) -> None:
+    """v7: tabla fts5vocab del índice FTS5 (vocabulario de la búsqueda fuzzy)"""
+    if search.is_search_supported(connection) and not search.is_postgresql(connection):
+        search.create_search_index(connection)
+
+
+# Pasos de migración por versión (cada paso es idempotente)
+MIGRATIONS: Dict[int, Callable[[Connection], None]] = {
+    1: _create_search_index,
+    2: _create_keyset_indexes,
+    3: _backfill_note_tags,
+    4: _add_note_versions,
+    5: _add_total_counters,
+    6: _add_postgres_indexes,
+    7: _add_search_vocabulary,
+}
+
+SCHEMA_VERSION = max(MIGRATIONS)
+
+
+def get_schema_version(connection: Connection) -> int:
+    """Leer la versión del esquema (0 si la base de datos nunca se migró)"""
+    schema_version.create(bind=connection, checkfirst=True)
+    return connection.execute(select(schema_version.c.version)).scalar() or 0
+
+
+def read_schema_version(connection: Connection) -> int:
+    """Leer la versión del esquema sin crear nada (0 si la tabla no existe)"""
+    if not inspect(connection).has_table("schema_version"):
+        return 0
+    return connection.execute(select(schema_version.c.version)).scalar() or 0
+
+
+def migrate(connection: Connection) -> int:
+    """Crear tablas nuevas y aplicar las migraciones
+    pendientes en la transacción de ``connection``"""
+    # Tablas que aún no existen (incluye tablas añadidas en versiones nuevas)
+    Base.metadata.create_all(bind=connection)
+    current = get_schema_version(connection)
+    for version in sorted(v for v in MIGRATIONS if v > current):
+        MIGRATIONS[version](connection)
+    if current < SCHEMA_VERSION:
+        connection.execute(delete(schema_version))
+        connection.execute(insert(schema_version).values(version=SCHEMA_VERSION))
+    return SCHEMA_VERSION
+
+
+def run_migrations(engine: Engine) -> int:
+    """Crear tablas nuevas y aplicar las migraciones pendientes en una transacción"""
+    with engine.begin() as connection:
+        return migrate(connection)
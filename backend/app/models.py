@@ -1,32 +1,90 @@
 # Importaciones necesarias para definir modelos de SQLAlchemy
-from sqlalchemy import Column, String, Text, DateTime, Boolean
-from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    Uuid,
+)
+
 from .database import Base
 
+# Tipo de los ids de nota: texto en SQLite y UUID nativo en PostgreSQL (16 bytes,
+# índices más compactos); en Python siempre es un str con el formato canónico
+NoteId = String().with_variant(Uuid(as_uuid=False), "postgresql")
+
+
 # Modelo de base de datos para las notas
 class Note(Base):
     """Modelo que representa una nota en la base de datos"""
+
     __tablename__ = "notes"  # Nombre de la tabla en la base de datos
 
     # ID único como clave primaria (UUID convertido a string)
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
-    
+    id = Column(NoteId, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
+
     # Título de la nota (máximo 120 caracteres, obligatorio)
     title = Column(String(120), nullable=False)
-    
+
     # Contenido de la nota (texto largo, obligatorio)
     content = Column(Text, nullable=False)
-    
-    # Tags almacenados como string separado por comas (opcional)
+
+    # Copia desnormalizada de los tags separados por comas, solo para lectura rápida;
+    # la fuente indexada para filtrar y contar es la tabla note_tags
     tags = Column(String, default="")
-    
+
     # Estado de archivado (por defecto False, obligatorio)
     archived = Column(Boolean, default=False, nullable=False)
-    
+
+    # Versión de la nota: aumenta en cada actualización (base de los ETag)
+    version = Column(Integer, default=1, nullable=False, server_default="1")
+
     # Fecha de creación (se establece automáticamente)
     created_at = Column(DateTime, default=datetime.utcnow)
-    
+
     # Fecha de última actualización (se actualiza automáticamente)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Índices compuestos para paginación por cursor estable en (fecha, id)
+    __table_args__ = (
+        Index("ix_notes_updated_at_id", "updated_at", "id"),
+        Index("ix_notes_created_at_id", "created_at", "id"),
+    )
+
+
+# Tabla de asociación nota-tag (una fila por tag de cada nota)
+class NoteTag(Base):
+    """Tag normalizado de una nota, indexado para filtrar y contar sin leer las notas"""
+
+    __tablename__ = "note_tags"
+
+    # Nota a la que pertenece el tag (se elimina junto con la nota)
+    note_id = Column(
+        NoteId, ForeignKey("notes.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    # Texto del tag (máximo 50 caracteres, validado en los esquemas)
+    tag = Column(String(50), primary_key=True)
+
+    # Índice por tag para resolver filtros y conteos (cubre tag -> note_id)
+    __table_args__ = (Index("ix_note_tags_tag_note_id", "tag", "note_id"),)
+
+
+# Contadores agregados de notas mantenidos por triggers en cada escritura
+class NoteCounter(Base):
+    """Contador con nombre (p. ej. 'changes': número de escrituras sobre notes)"""
+
+    __tablename__ = "note_counters"
+
+    # Nombre del contador
+    key = Column(String, primary_key=True)
+
+    # Valor actual
+    value = Column(Integer, nullable=False, default=0)
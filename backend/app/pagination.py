@@ -0,0 +1,40 @@
+# Utilidades para paginación por cursor (keyset) sobre (fecha, id)
+import base64
+import json
+from datetime import datetime
+from typing import NamedTuple
+
+from app.exceptions.handlers import ValidationError
+
+# Columnas de ordenación permitidas (cada una tiene un índice compuesto con id)
+SORT_FIELDS = ("updated_at", "created_at")
+
+
+class Cursor(NamedTuple):
+    """Posición de la última nota devuelta: columna de orden, su valor y el id"""
+
+    sort: str
+    value: datetime
+    id: str
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """Codificar el cursor como token opaco seguro para URLs"""
+    payload = json.dumps(
+        [cursor.sort, cursor.value.isoformat(), cursor.id], separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: str) -> Cursor:
+    """Decodificar un token de cursor validando
+    que corresponde a la ordenación pedida"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        sort_field, value, note_id = json.loads(base64.urlsafe_b64decode(padded))
+        cursor = Cursor(sort_field, datetime.fromisoformat(value), str(note_id))
+    except (ValueError, TypeError):
+        raise ValidationError("Invalid cursor")
+    if cursor.sort != sort:
+        raise ValidationError("Cursor does not match the requested sort order")
+    return cursor
@@ -1,76 +1,212 @@
 # Importaciones para validación y esquemas de datos con Pydantic
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional
 from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, validator
+
+from app.core.config import settings
+
 
 # Esquema para crear una nueva nota
 class NoteCreate(BaseModel):
     """Esquema de datos para crear una nueva nota"""
+
     # Título de la nota (obligatorio, entre 1 y 120 caracteres)
-    title: str = Field(..., min_length=1, max_length=120, description="Note title (1-120 characters)")
+    title: str = Field(
+        ..., min_length=1, max_length=120, description="Note title (1-120 characters)"
+    )
     # Contenido de la nota (obligatorio, entre 1 y 10000 caracteres)
-    content: str = Field(..., min_length=1, max_length=10000, description="Note content (1-10000 characters)")
+    content: str = Field(
+        ...,
+        min_length=1,
+        max_length=10000,
+        description="Note content (1-10000 characters)",
+    )
     # Lista opcional de etiquetas
     tags: Optional[List[str]] = Field(default=None, description="List of tags")
     # Estado de archivado (opcional, por defecto False)
     archived: Optional[bool] = Field(default=False, description="Archive status")
-    
-    @validator('tags')
+
+    @validator("tags")
     def validate_tags(cls, v):
         """Validar que las etiquetas cumplan con las restricciones"""
         if v is not None:
             # Máximo 10 etiquetas permitidas
             if len(v) > 10:
-                raise ValueError('Maximum 10 tags allowed')
+                raise ValueError("Maximum 10 tags allowed")
             # Cada etiqueta máximo 50 caracteres
             for tag in v:
                 if len(tag) > 50:
-                    raise ValueError('Tag length cannot exceed 50 characters')
+                    raise ValueError("Tag length cannot exceed 50 characters")
         return v
 
+
 # Esquema para actualizar una nota existente
 class NoteUpdate(BaseModel):
-    """Esquema de datos para actualizar una nota existente (todos los campos opcionales)"""
+    """Esquema de datos para actualizar una nota
+    existente (todos los campos opcionales)"""
+
     # Título opcional para actualización
-    title: Optional[str] = Field(None, min_length=1, max_length=120, description="Note title (1-120 characters)")
+    title: Optional[str] = Field(
+        None, min_length=1, max_length=120, description="Note title (1-120 characters)"
+    )
     # Contenido opcional para actualización
-    content: Optional[str] = Field(None, min_length=1, max_length=10000, description="Note content (1-10000 characters)")
+    content: Optional[str] = Field(
+        None,
+        min_length=1,
+        max_length=10000,
+        description="Note content (1-10000 characters)",
+    )
     # Lista opcional de etiquetas para actualización
     tags: Optional[List[str]] = Field(None, description="List of tags")
     # Estado de archivado opcional para actualización
     archived: Optional[bool] = Field(None, description="Archive status")
-    
-    @validator('tags')
+
+    @validator("tags")
     def validate_tags(cls, v):
         """Validar que las etiquetas cumplan con las restricciones"""
         if v is not None:
             # Máximo 10 etiquetas permitidas
             if len(v) > 10:
-                raise ValueError('Maximum 10 tags allowed')
+                raise ValueError("Maximum 10 tags allowed")
             # Cada etiqueta máximo 50 caracteres
             for tag in v:
                 if len(tag) > 50:
-                    raise ValueError('Tag length cannot exceed 50 characters')
+                    raise ValueError("Tag length cannot exceed 50 characters")
         return v
 
+
 # Esquema de respuesta para devolver datos de una nota
 class NoteOut(BaseModel):
     """Esquema de salida que define cómo se devuelven los datos de una nota"""
-    id: str                    # ID único de la nota
-    title: str                 # Título de la nota
-    content: str               # Contenido de la nota
-    tags: List[str]            # Lista de etiquetas
-    archived: bool             # Estado de archivado
-    created_at: datetime       # Fecha de creación
-    updated_at: datetime       # Fecha de última actualización
+
+    id: str  # ID único de la nota
+    title: str  # Título de la nota
+    content: str  # Contenido de la nota
+    tags: List[str]  # Lista de etiquetas
+    archived: bool  # Estado de archivado
+    created_at: datetime  # Fecha de creación
+    updated_at: datetime  # Fecha de última actualización
 
     class Config:
         # Permitir crear el esquema desde atributos de modelo SQLAlchemy
         from_attributes = True
 
+
+# Esquema de respuesta para los elementos del listado de notas
+class NoteListOut(NoteOut):
+    """Nota devuelta por el listado; incluye el
+    fragmento resaltado cuando se pide highlight"""
+
+    snippet: Optional[str] = Field(
+        None, description="Highlighted search match (only with highlight=true)"
+    )
+    preview: Optional[str] = Field(
+        None,
+        description="First characters of the content (only when requested in fields)",
+    )
+
+
+# Esquema para crear varias notas en una sola petición
+class NoteBulkCreate(BaseModel):
+    """Lote de notas a crear en una única transacción"""
+
+    items: List[NoteCreate] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.bulk_max_items,
+        description="Notes to create",
+    )
+
+
+# Esquema para un elemento de actualización masiva (id + campos a cambiar)
+class NoteBulkUpdateItem(NoteUpdate):
+    """Actualización parcial de una nota identificada por su id"""
+
+    id: str = Field(..., description="Note UUID")
+
+
+# Esquema para actualizar varias notas en una sola petición
+class NoteBulkUpdate(BaseModel):
+    """Lote de actualizaciones aplicadas en una única transacción"""
+
+    items: List[NoteBulkUpdateItem] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.bulk_max_items,
+        description="Partial updates, one per note",
+    )
+
+
+# Esquema para eliminar varias notas en una sola petición
+class NoteBulkDelete(BaseModel):
+    """Lote de ids de notas a eliminar en una única transacción"""
+
+    ids: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.bulk_max_items,
+        description="Note UUIDs to delete",
+    )
+
+
+# Resultado de cada elemento de una operación masiva
+class BulkItemResult(BaseModel):
+    """Resultado individual: posición en la petición, id y código de estado"""
+
+    index: int  # Posición del elemento en la petición
+    id: str  # ID de la nota afectada
+    # Código HTTP equivalente (201, 200, 204, 404)
+    status: int
+    detail: Optional[str] = None  # Motivo del fallo, si lo hay
+
+
+# Respuesta de una operación masiva
+class BulkResult(BaseModel):
+    """Resumen y resultados por elemento de una operación masiva"""
+
+    succeeded: int  # Elementos aplicados
+    failed: int  # Elementos no aplicados
+    results: List[BulkItemResult]  # Resultado de cada elemento, en orden
+
+
+# Línea rechazada durante una importación
+class ImportLineError(BaseModel):
+    """Número de línea (desde 1) y motivo del rechazo"""
+
+    line: int
+    detail: str
+
+
+# Resultado de una importación NDJSON
+class ImportResult(BaseModel):
+    """Conteo de líneas aceptadas y rechazadas con el detalle de los rechazos"""
+
+    accepted: int  # Notas creadas
+    rejected: int  # Líneas no válidas
+    # Primeros rechazos (hasta import_max_errors)
+    errors: List[ImportLineError]
+    errors_truncated: bool = False  # Hubo más rechazos de los listados
+    # Notas válidas no escritas por un error de base de datos
+    failed: int = 0
+    # Primera línea no importada (reenviar desde aquí)
+    resume_from_line: Optional[int] = None
+    # DATABASE_BUSY o DATABASE_ERROR si la importación se detuvo
+    error_code: Optional[str] = None
+
+
+# Esquema de respuesta para el uso de cada tag
+class TagCount(BaseModel):
+    """Tag y número de notas que lo usan"""
+
+    tag: str  # Texto del tag
+    count: int  # Número de notas con el tag
+
+
 # Esquema para respuestas de error estandarizadas
 class ErrorResponse(BaseModel):
     """Esquema estándar para respuestas de error de la API"""
-    detail: str                                           # Mensaje de error detallado
-    error_code: Optional[str] = None                      # Código de error opcional
-    timestamp: datetime = Field(default_factory=datetime.utcnow)  # Timestamp del error
\ No newline at end of file
+
+    detail: str  # Mensaje de error detallado
+    error_code: Optional[str] = None  # Código de error opcional
+    timestamp: datetime = Field(default_factory=datetime.utcnow)  # Timestamp del error
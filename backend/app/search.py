@@ -0,0 +1,257 @@
+# Índice de búsqueda de texto completo para las
+# notas (SQLite FTS5 o tsvector de PostgreSQL)
+import re
+from typing import NamedTuple, Optional
+
+from sqlalchemy import column, event, func, literal_column, table, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.models import Note
+
+# Tabla virtual FTS5 con contenido externo: indexa title/content sin duplicar el texto
+FTS_TABLE = "notes_fts"
+
+# Vista fts5vocab del índice (una fila por término): vocabulario para la búsqueda fuzzy
+VOCAB_TABLE = "notes_fts_vocab"
+
+# Pesos bm25 por columna (title, content): una coincidencia en el título pesa más
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+# Sentencias DDL idempotentes para crear el índice y los triggers de sincronización.
+# El índice usa el rowid implícito de notes; tras un VACUUM los rowid pueden cambiar,
+# por lo que conviene reconstruir el índice (rebuild_search_index.py) después.
+_CREATE_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content,
+        content='notes', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {VOCAB_TABLE} USING fts5vocab({FTS_TABLE}, "
+    "'row')",
+    # Nueva nota: indexar título y contenido
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notes_fts_ai AFTER INSERT ON notes BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content)
+        VALUES (new.rowid, new.title, new.content);
+    END
+    """,
+    # Nota eliminada: retirar sus términos del índice
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notes_fts_ad AFTER DELETE ON notes BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.rowid, old.title, old.content);
+    END
+    """,
+    # Nota actualizada: solo reindexar si cambia el texto (archivar no toca el índice)
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notes_fts_au
+    AFTER UPDATE OF title, content ON notes BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.rowid, old.title, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, content)
+        VALUES (new.rowid, new.title, new.content);
+    END
+    """,
+]
+
+_DROP_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS notes_fts_ai",
+    "DROP TRIGGER IF EXISTS notes_fts_ad",
+    "DROP TRIGGER IF EXISTS notes_fts_au",
+    f"DROP TABLE IF EXISTS {VOCAB_TABLE}",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# PostgreSQL: columna tsvector generada (título con peso A, contenido con peso B) e
+# índice GIN. Se usa la configuración 'simple' (sin stemming ni stopwords), igual
+# que unicode61 en SQLite: las notas mezclan idiomas y la búsqueda es por prefijo.
+TS_CONFIG = "simple"
+_TS_VECTOR = (
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(content, '')), 'B')"
+)
+_PG_CREATE_STATEMENTS = [
+    "ALTER TABLE notes ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED "
+    f"ALWAYS AS ({_TS_VECTOR}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_notes_search_vector ON notes USING gin "
+    "(search_vector)",
+]
+_PG_DROP_STATEMENTS = [
+    "DROP INDEX IF EXISTS ix_notes_search_vector",
+    "ALTER TABLE notes DROP COLUMN IF EXISTS search_vector",
+]
+
+# Construcciones SQL reutilizables para consultar el índice
+notes_fts = table(FTS_TABLE, column("rowid"))
+_fts_column = literal_column(FTS_TABLE)
+_search_vector = literal_column("notes.search_vector")
+
+# Tokens de búsqueda: secuencias de letras/dígitos
+# (equivalente al tokenizador unicode61)
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def is_search_supported(connection) -> bool:
+    """Indicar si la conexión usa un motor con índice de búsqueda (FTS5 o tsvector)"""
+    return connection.dialect.name in ("sqlite", "postgresql")
+
+
+def is_postgresql(connection) -> bool:
+    """Indicar si la búsqueda se resuelve con tsvector (PostgreSQL) en lugar de FTS5"""
+    return connection.dialect.name == "postgresql"
+
+
+def search_index_exists(connection: Connection) -> bool:
+    """Comprobar si la tabla virtual (o la
+    columna search_vector) del índice ya existe"""
+    if is_postgresql(connection):
+        result = connection.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = 'notes' AND "
+                "column_name = 'search_vector'"
+            )
+        )
+        return result.first() is not None
+    result = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    )
+    return result.first() is not None
+
+
+def create_search_index(connection: Connection) -> None:
+    """Crear la tabla virtual y los triggers (o la
+    columna generada y su índice GIN) si no existen"""
+    statements = (
+        _PG_CREATE_STATEMENTS if is_postgresql(connection) else _CREATE_STATEMENTS
+    )
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def drop_search_index(connection: Connection) -> None:
+    """Eliminar el índice de búsqueda y lo que lo mantiene sincronizado"""
+    statements = _PG_DROP_STATEMENTS if is_postgresql(connection) else _DROP_STATEMENTS
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def rebuild_search_index(connection: Connection) -> None:
+    """Reconstruir el índice completo a partir de la tabla notes"""
+    create_search_index(connection)
+    if is_postgresql(connection):
+        # La columna generada siempre está al día: basta con compactar el índice GIN
+        connection.execute(text("REINDEX INDEX ix_notes_search_vector"))
+        return
+    connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    connection.execute(
+        text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    )
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Crear y poblar el índice en bases de datos existentes que aún no lo tienen"""
+    with engine.begin() as connection:
+        if not is_search_supported(connection) or search_index_exists(connection):
+            return
+        rebuild_search_index(connection)
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """Convertir el texto del usuario en una consulta FTS5 con coincidencia por prefijo
+
+    Cada palabra se escapa entre comillas (evita errores de sintaxis FTS5 con
+    caracteres como '-' o '"') y se marca con '*' para buscar por prefijo, de modo
+    que "prog" encuentre "programming" mientras el usuario escribe.
+    """
+    tokens = _TOKEN_RE.findall(search)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def match(query: str):
+    """Expresión `notes_fts MATCH :query`"""
+    return _fts_column.op("MATCH")(query)
+
+
+def rank():
+    """Puntuación bm25 (valores menores = más relevantes)"""
+    return func.bm25(_fts_column, TITLE_WEIGHT, CONTENT_WEIGHT)
+
+
+def snippet(tokens: int = 12):
+    """Fragmento del texto con las coincidencias resaltadas con <mark>"""
+    return func.snippet(_fts_column, -1, "<mark>", "</mark>", "…", tokens)
+
+
+def join_condition():
+    """Condición para unir notes con su fila del índice"""
+    return notes_fts.c.rowid == literal_column("notes.rowid")
+
+
+def build_ts_query(search: str) -> Optional[str]:
+    """Convertir el texto del usuario en una consulta
+    to_tsquery con prefijos ("prog:* & not:*")
+
+    Igual que en FTS5, todas las palabras deben aparecer y cada una se busca
+    por prefijo. Los tokens solo contienen letras, dígitos y '_', así que no
+    pueden introducir operadores de tsquery.
+    """
+    tokens = _TOKEN_RE.findall(search)
+    if not tokens:
+        return None
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def ts_query(query: str):
+    """Expresión to_tsquery(TS_CONFIG, :query)"""
+    return func.to_tsquery(literal_column(f"'{TS_CONFIG}'"), query)
+
+
+def ts_match(query: str):
+    """Expresión `notes.search_vector @@
+    to_tsquery(...)` (resuelta con el índice GIN)"""
+    return _search_vector.op("@@")(ts_query(query))
+
+
+def ts_rank(query: str):
+    """Relevancia ts_rank_cd para ORDER BY (descendente: más relevantes primero)"""
+    return func.ts_rank_cd(_search_vector, ts_query(query)).desc()
+
+
+def ts_headline(query: str, tokens: int = 12):
+    """Fragmento del contenido con las coincidencias resaltadas con <mark>"""
+    options = (
+        f"StartSel=<mark>, StopSel=</mark>, MaxWords={tokens}, "
+        f"MinWords={max(tokens // 2, 1)}, MaxFragments=1, FragmentDelimiter=…"
+    )
+    return func.ts_headline(
+        literal_column(f"'{TS_CONFIG}'"), Note.content, ts_query(query), options
+    )
+
+
+# Búsqueda resuelta con un índice: orden por
+# relevancia y fragmento resaltado del motor activo
+class Ranking(NamedTuple):
+    """Expresiones de relevancia y de fragmento para una búsqueda indexada"""
+
+    order_by: object
+    snippet: object
+
+
+# Crear el índice junto con la tabla notes (create_all) y eliminarlo con ella (drop_all)
+@event.listens_for(Note.__table__, "after_create")
+def _create_index_with_table(target, connection, **kw):
+    if is_search_supported(connection):
+        create_search_index(connection)
+
+
+@event.listens_for(Note.__table__, "before_drop")
+def _drop_index_with_table(target, connection, **kw):
+    if is_search_supported(connection):
+        drop_search_index(connection)
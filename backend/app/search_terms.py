@@ -0,0 +1,211 @@
+# Índice de trigramas del vocabulario de búsqueda
+# para tolerar errores de escritura (fuzzy=true)
+import bisect
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from app.core.logging import logger
+from app.search import VOCAB_TABLE
+
+# Tokens: secuencias de letras/dígitos, como el tokenizador unicode61 de FTS5
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_term(token: str) -> str:
+    """Minúsculas y sin diacríticos, igual que unicode61 remove_diacritics 2"""
+    decomposed = unicodedata.normalize("NFKD", token.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(*texts: Optional[str]) -> Set[str]:
+    """Términos normalizados de uno o varios textos"""
+    return {
+        normalize_term(token)
+        for value in texts
+        if value
+        for token in _TOKEN_RE.findall(value)
+    }
+
+
+def trigrams(term: str, prefix: bool = False) -> Set[str]:
+    """Trigramas de un término con relleno de espacios (como pg_trgm)
+
+    Con prefix=True no se rellena el final: el término es lo que el usuario
+    lleva escrito y puede continuar.
+    """
+    padded = f"  {term}" if prefix else f"  {term} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+# Vocabulario en memoria con sus trigramas
+class TermIndex:
+    """Términos del índice FTS5 y sus trigramas, para sugerir términos parecidos
+
+    El vocabulario se carga una vez desde fts5vocab (en segundo plano, la
+    primera vez que se pide una búsqueda fuzzy) y NoteService añade los
+    términos de cada nota que escribe. Los términos que dejan de usarse no se
+    quitan: como mucho amplían la consulta con un término sin resultados, y
+    desaparecen al reiniciar. Con varios procesos cada uno ve sus propias
+    escrituras y el vocabulario cargado al arrancar.
+
+    generation cambia cada vez que el vocabulario cambia (términos nuevos o fin
+    de la carga): los resultados fuzzy dependen de él, así que forma parte del
+    ETag de esos listados.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sorted: List[str] = []
+        self._terms: Set[str] = set()
+        self._postings: Dict[str, Set[str]] = {}
+        self.ready = False
+        self._loading = False
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def add(self, terms: Iterable[str]) -> None:
+        """Añadir términos ya normalizados (los que ya existen se ignoran)
+
+        Las escrituras (hilo de carga y NoteService) y las lecturas (similar,
+        has_prefix) comparten el cerrojo: iterar un conjunto de postings
+        mientras otro hilo lo amplía lanzaría RuntimeError.
+        """
+        terms = set(terms)
+        with self._lock:
+            new = terms - self._terms
+            if not new:
+                return
+            self._terms.update(new)
+            self.generation += 1
+            if len(new) == 1:
+                bisect.insort(self._sorted, next(iter(new)))
+            else:
+                # Lotes (carga inicial, notas largas): una
+                # ordenación en lugar de una inserción por término
+                self._sorted.extend(new)
+                self._sorted.sort()
+            for term in new:
+                for gram in trigrams(term):
+                    self._postings.setdefault(gram, set()).add(term)
+
+    def add_text(self, *texts: Optional[str]) -> None:
+        """Añadir los términos de título/contenido de una nota escrita
+
+        No hace nada hasta que se pide la carga: si nadie usa fuzzy, las
+        escrituras no pagan la tokenización.
+        """
+        if self.ready or self._loading:
+            self.add(tokenize(*texts))
+
+    def has_prefix(self, prefix: str) -> bool:
+        """Indicar si algún término empieza por prefix (búsqueda binaria)"""
+        with self._lock:
+            index = bisect.bisect_left(self._sorted, prefix)
+            return index < len(self._sorted) and self._sorted[index].startswith(prefix)
+
+    def similar(
+        self, token: str, threshold: float, limit: int, prefix: bool = False
+    ) -> List[Tuple[str, float]]:
+        """Términos parecidos a token ordenados por similitud (como mucho limit)
+
+        La similitud es la de pg_trgm: trigramas compartidos / trigramas de la
+        unión. Con prefix=True (la palabra que se está escribiendo) es la
+        fracción de los trigramas del token que aparecen en el término.
+        """
+        query = trigrams(token, prefix=prefix)
+        shared: Counter = Counter()
+        with self._lock:
+            for gram in query:
+                shared.update(self._postings.get(gram, ()))
+        scored = []
+        for term, common in shared.items():
+            if prefix:
+                score = common / len(query)
+            else:
+                score = common / (len(query) + len(trigrams(term)) - common)
+            if score >= threshold:
+                scored.append((term, score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+    def load(self, connection) -> None:
+        """Cargar el vocabulario completo del índice
+        FTS5 (lectura de toda la tabla fts5vocab)"""
+        rows = connection.execute(text(f"SELECT term FROM {VOCAB_TABLE}"))
+        for partition in rows.partitions(10000):
+            self.add(term for term, in partition)
+        with self._lock:
+            self.ready = True
+            self.generation += 1
+
+    def load_in_background(self, engine) -> None:
+        """Cargar el vocabulario en un hilo aparte (una
+        sola vez); mientras tanto no hay sugerencias"""
+        with self._lock:
+            if self.ready or self._loading:
+                return
+            self._loading = True
+
+        def run():
+            try:
+                with engine.connect() as connection:
+                    self.load(connection)
+                logger.info(f"Search vocabulary loaded: {len(self)} terms")
+            except Exception as exc:
+                logger.error(f"Could not load the search vocabulary: {exc}")
+            finally:
+                with self._lock:
+                    self._loading = False
+
+        threading.Thread(target=run, name="search-terms-loader", daemon=True).start()
+
+
+def build_fuzzy_match_query(
+    search: str,
+    index: TermIndex,
+    threshold: float,
+    max_expansions: int,
+    min_length: int = 3,
+) -> Optional[str]:
+    """Consulta FTS5 por prefijo en la que las palabras
+    sin coincidencias se amplían con términos parecidos
+
+    Una palabra que es prefijo de algún término se busca igual que sin fuzzy
+    (el usuario aún la está escribiendo). Si no lo es, probablemente tiene una
+    errata: se busca como ("palabra"* OR "término1" OR ...) con los términos
+    más parecidos del vocabulario. La última palabra se compara como prefijo.
+    """
+    tokens = _TOKEN_RE.findall(search)
+    if not tokens:
+        return None
+    groups = []
+    for position, token in enumerate(tokens):
+        alternatives = [f'"{token}"*']
+        term = normalize_term(token)
+        if len(term) >= min_length and index.ready and not index.has_prefix(term):
+            is_last = position == len(tokens) - 1
+            alternatives += [
+                f'"{similar}"'
+                for similar, _ in index.similar(
+                    term, threshold, max_expansions, prefix=is_last
+                )
+            ]
+        groups.append(
+            alternatives[0]
+            if len(alternatives) == 1
+            else f"({' OR '.join(alternatives)})"
+        )
+    # AND explícito: FTS5 no admite el AND implícito
+    # después de un grupo entre paréntesis
+    return " AND ".join(groups)
+
+
+# Instancia global usada por NoteService
+term_index = TermIndex()
@@ -0,0 +1,102 @@
+# Importaciones necesarias para la variante asíncrona del servicio de notas
+import asyncio
+from typing import List, Optional
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import busy_retry_delays, is_busy_error
+from app.schemas import (
+    BulkResult,
+    NoteBulkUpdateItem,
+    NoteCreate,
+    NoteListOut,
+    NoteOut,
+    NoteUpdate,
+    TagCount,
+)
+from app.services.note_service import NoteCount, NoteEntry, NoteService
+
+
+# Servicio asíncrono con la misma interfaz que NoteService
+class AsyncNoteService:
+    """Variante asíncrona de NoteService sobre una AsyncSession
+
+    Cada operación ejecuta la lógica de NoteService mediante AsyncSession.run_sync:
+    las consultas se esperan en el event loop a través del driver asíncrono en lugar
+    de bloquear un hilo del threadpool, y ambos servicios comparten la misma lógica.
+    """
+
+    def __init__(self, db: AsyncSession):
+        """Inicializar el servicio con una sesión asíncrona"""
+        self.db = db
+
+    async def _run(self, method: str, *args, **kwargs):
+        """Ejecutar un método de NoteService sobre la sesión síncrona subyacente
+
+        Los reintentos ante SQLITE_BUSY se hacen aquí con asyncio.sleep, para no
+        bloquear el event loop con el time.sleep del servicio síncrono.
+        """
+
+        def call(session):
+            return getattr(NoteService(session, retry_on_busy=False), method)(
+                *args, **kwargs
+            )
+
+        for delay in busy_retry_delays():
+            try:
+                return await self.db.run_sync(call)
+            except OperationalError as exc:
+                if not is_busy_error(exc):
+                    raise
+                await self.db.rollback()
+                await asyncio.sleep(delay)
+        return await self.db.run_sync(call)
+
+    async def create_note(self, note_data: NoteCreate) -> NoteOut:
+        """Crear una nueva nota en la base de datos"""
+        return await self._run("create_note", note_data)
+
+    async def get_notes(self, **kwargs) -> List[NoteListOut]:
+        """Obtener lista de notas (mismos argumentos que NoteService.get_notes)"""
+        return await self._run("get_notes", **kwargs)
+
+    async def get_note_by_id(self, note_id: str) -> NoteOut:
+        """Obtener una nota específica por su ID único"""
+        return await self._run("get_note_by_id", note_id)
+
+    async def get_note_entry(self, note_id: str) -> NoteEntry:
+        """Obtener una nota y su versión (para ETag)"""
+        return await self._run("get_note_entry", note_id)
+
+    async def count_notes(self, **kwargs) -> NoteCount:
+        """Total de notas que cumplen los filtros"""
+        return await self._run("count_notes", **kwargs)
+
+    async def get_collection_version(self) -> Optional[int]:
+        """Contador de cambios de la colección de notas"""
+        return await self._run("get_collection_version")
+
+    async def update_note(self, note_id: str, note_data: NoteUpdate) -> NoteOut:
+        """Actualizar una nota existente con nuevos datos"""
+        return await self._run("update_note", note_id, note_data)
+
+    async def delete_note(self, note_id: str) -> dict:
+        """Eliminar una nota de la base de datos"""
+        return await self._run("delete_note", note_id)
+
+    async def create_notes(self, items: List[NoteCreate]) -> BulkResult:
+        """Crear varias notas en una única transacción"""
+        return await self._run("create_notes", items)
+
+    async def update_notes(self, items: List[NoteBulkUpdateItem]) -> BulkResult:
+        """Actualizar varias notas en una única transacción"""
+        return await self._run("update_notes", items)
+
+    async def delete_notes(self, ids: List[str]) -> BulkResult:
+        """Eliminar varias notas en una única transacción"""
+        return await self._run("delete_notes", ids)
+
+    async def get_tag_counts(self, limit: int = 100) -> List[TagCount]:
+        """Obtener los tags más usados y cuántas notas tiene cada uno"""
+        return await self._run("get_tag_counts", limit)
@@ -0,0 +1,153 @@
+# Importación incremental de notas desde un cuerpo NDJSON en streaming
+from typing import AsyncIterator, List
+
+from pydantic import ValidationError as PydanticValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.database import is_busy_error
+from app.exceptions.handlers import ServiceUnavailableError
+from app.schemas import ImportLineError, ImportResult, NoteCreate
+from app.services.note_service import NoteService
+from app.services.write_coalescer import write_coalescer
+
+
+async def iter_ndjson_lines(chunks: AsyncIterator[bytes], max_line_bytes: int):
+    """Separar un flujo de bytes en líneas numeradas sin cargar el cuerpo completo
+
+    Produce tuplas (número de línea, bytes de la línea). Una línea más larga que
+    max_line_bytes se descarta hasta el siguiente salto de línea y se produce con
+    None como contenido, de modo que la memoria queda acotada.
+
+    Solo se busca el salto de línea en el fragmento nuevo y el límite se comprueba
+    antes de acumular: una línea larga enviada en fragmentos pequeños cuesta un
+    tiempo lineal, no cuadrático.
+    """
+    pending = bytearray()
+    line_number = 0
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            piece = chunk[start:] if end == -1 else chunk[start:end]
+            if not oversized and len(pending) + len(piece) > max_line_bytes:
+                # Descartar la línea demasiado larga hasta su salto de línea
+                pending.clear()
+                oversized = True
+            elif not oversized:
+                pending += piece
+            if end == -1:
+                break
+            line_number += 1
+            yield line_number, None if oversized else bytes(pending)
+            pending.clear()
+            oversized = False
+            start = end + 1
+    if pending or oversized:
+        yield line_number + 1, None if oversized else bytes(pending)
+
+
+def _describe(exc: PydanticValidationError) -> str:
+    """Resumir los errores de validación de una línea"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'line'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+async def import_ndjson(
+    chunks: AsyncIterator[bytes], service: NoteService, batch_size: int = None
+) -> ImportResult:
+    """Validar cada línea con NoteCreate e insertar las válidas por lotes
+
+    Cada lote se escribe con NoteService.create_notes (una transacción por lote)
+    en el threadpool, para no bloquear el event loop mientras se sigue leyendo.
+
+    Si un lote falla con un error de base de datos, los anteriores ya están
+    confirmados: la importación se detiene y el resultado indica cuántas notas
+    se escribieron (accepted), cuántas del lote fallido no (failed) y la línea
+    desde la que reenviar el resto (resume_from_line), sin duplicar notas.
+    """
+    batch_size = batch_size or settings.import_batch_size
+    accepted = rejected = 0
+    errors: List[ImportLineError] = []
+    batch: List[NoteCreate] = []
+    batch_start = None  # Línea de la primera nota del lote pendiente
+
+    def reject(line_number: int, detail: str):
+        nonlocal rejected
+        rejected += 1
+        if len(errors) < settings.import_max_errors:
+            errors.append(ImportLineError(line=line_number, detail=detail))
+
+    async for line_number, line in iter_ndjson_lines(
+        chunks, settings.import_max_line_bytes
+    ):
+        if line is None:
+            reject(line_number, f"Line exceeds {settings.import_max_line_bytes} bytes")
+            continue
+        if not line.strip():
+            continue  # Ignorar líneas vacías
+        try:
+            batch.append(NoteCreate.model_validate_json(line))
+        except PydanticValidationError as exc:
+            reject(line_number, _describe(exc))
+            continue
+        batch_start = batch_start or line_number
+        if len(batch) >= batch_size:
+            error_code = await _write_batch(service, batch)
+            if error_code:
+                break
+            accepted += len(batch)
+            batch, batch_start = [], None
+    else:
+        error_code = await _write_batch(service, batch) if batch else None
+        if not error_code:
+            accepted += len(batch)
+
+    result = ImportResult(
+        accepted=accepted,
+        rejected=rejected,
+        errors=errors,
+        errors_truncated=rejected > len(errors),
+    )
+    if error_code:
+        # Las líneas posteriores al lote fallido no se
+        # leyeron: se cuentan como pendientes de reenvío
+        result.failed, result.resume_from_line, result.error_code = (
+            len(batch),
+            batch_start,
+            error_code,
+        )
+    return result
+
+
+async def _write_batch(service: NoteService, batch: List[NoteCreate]):
+    """Escribir un lote; devolver None o el código de error si la transacción falló
+
+    Con settings.write_coalescing el lote pasa por el hilo escritor, como el
+    resto de escrituras de notas; una cola llena se trata como base de datos
+    ocupada.
+    """
+    if settings.write_coalescing:
+        try:
+            await write_coalescer.create_notes_async(batch)
+            return None
+        except ServiceUnavailableError:
+            logger.error(
+                f"Import batch of {len(batch)} notes rejected: write queue busy"
+            )
+            return "DATABASE_BUSY"
+        except SQLAlchemyError as exc:
+            logger.error(f"Import batch of {len(batch)} notes failed: {exc}")
+            return "DATABASE_BUSY" if is_busy_error(exc) else "DATABASE_ERROR"
+    try:
+        await run_in_threadpool(service.create_notes, batch)
+        return None
+    except SQLAlchemyError as exc:
+        logger.error(f"Import batch of {len(batch)} notes failed: {exc}")
+        await run_in_threadpool(service.db.rollback)
+        return "DATABASE_BUSY" if is_busy_error(exc) else "DATABASE_ERROR"
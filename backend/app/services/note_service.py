@@ -1,100 +1,740 @@
 # Importaciones necesarias para el servicio de notas
-from sqlalchemy.orm import Session
-from typing import List, Optional
+import uuid
 from datetime import datetime
-from app.models import Note
-from app.schemas import NoteCreate, NoteUpdate, NoteOut
-from app.exceptions.handlers import NotFoundError
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, func, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app import counters
+from app import search as fts
+from app import tag_index
+from app.core.cache import note_cache
+from app.core.config import settings
+from app.core.events import note_events
+from app.database import read_engine, retry_on_busy
+from app.exceptions.handlers import NotFoundError, ValidationError
+from app.models import Note, NoteTag
+from app.pagination import Cursor
+from app.schemas import (
+    BulkItemResult,
+    BulkResult,
+    NoteBulkUpdateItem,
+    NoteCreate,
+    NoteListOut,
+    NoteOut,
+    NoteUpdate,
+    TagCount,
+)
+from app.search_terms import build_fuzzy_match_query, term_index
+
+
+# Normalizar una lista de tags: sin espacios, sin
+# vacíos y sin duplicados (conserva el orden)
+def normalize_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    """Limpiar tags de entrada antes de guardarlos o filtrar por ellos"""
+    if not tags:
+        return []
+    return list(dict.fromkeys(tag.strip() for tag in tags if tag and tag.strip()))
+
+
+# Comprobar si un id tiene la forma canónica de un UUID (la que devuelve PostgreSQL)
+def _is_canonical_uuid(value: str) -> bool:
+    """Indicar si value es un UUID en minúsculas con guiones"""
+    try:
+        return str(uuid.UUID(value)) == value
+    except (TypeError, ValueError):
+        return False
+
+
+# Nota leída junto con su versión (valor guardado en la caché de notas)
+class NoteEntry(NamedTuple):
+    """Nota de salida y versión de la fila de la que se obtuvo"""
+
+    version: int
+    note: NoteOut
+
+
+# Columnas públicas de una nota (lecturas sin cargar objetos ORM)
+NOTE_COLUMNS = (
+    Note.id,
+    Note.title,
+    Note.content,
+    Note.tags,
+    Note.archived,
+    Note.created_at,
+    Note.updated_at,
+)
+
+# Campos que se pueden pedir en el listado con fields= (preview = inicio del contenido)
+LIST_FIELDS = (
+    "id",
+    "title",
+    "content",
+    "preview",
+    "tags",
+    "archived",
+    "created_at",
+    "updated_at",
+)
+
+
+# Total de un listado e indicación de si es exacto (False = limitado a count_cap)
+class NoteCount(NamedTuple):
+    """Total de notas y si el valor es exacto"""
+
+    total: int
+    exact: bool
+
 
 # Servicio que contiene la lógica de negocio para las notas
 class NoteService:
     """Servicio que maneja todas las operaciones CRUD de notas"""
-    
-    def __init__(self, db: Session):
+
+    def __init__(
+        self, db: Session, retry_on_busy: bool = True, returning: Optional[bool] = None
+    ):
         """Inicializar el servicio con una sesión de base de datos"""
         self.db = db  # Sesión de SQLAlchemy para operaciones de BD
-    
+        self.retry_on_busy = retry_on_busy  # Reintentar escrituras ante SQLITE_BUSY
+        # Usar UPDATE ... RETURNING (None = según el dialecto)
+        self.returning = returning
+
+    @retry_on_busy
     def create_note(self, note_data: NoteCreate) -> NoteOut:
         """Crear una nueva nota en la base de datos"""
+        note = self._insert_note(note_data)
+        self.db.commit()  # Confirmar cambios
+        note_events.publish("created", {"id": note.id, "version": 1})
+        return note
+
+    def _insert_note(self, note_data: NoteCreate) -> NoteOut:
+        """Insertar una nota y sus tags sin confirmar la
+        transacción (la usa también el agrupador de escrituras)"""
+        tags = normalize_tags(note_data.tags)
         # Crear instancia del modelo Note con los datos proporcionados
         db_note = Note(
+            id=str(uuid.uuid4()),
             title=note_data.title,
             content=note_data.content,
             # Convertir lista de tags a string separado por comas
-            tags=",".join(note_data.tags) if note_data.tags else "",
-            archived=note_data.archived or False  # Por defecto False si no se especifica
+            tags=",".join(tags),
+            # Por defecto False si no se especifica
+            archived=note_data.archived or False,
+            version=1,
         )
-        # Agregar la nota a la sesión y confirmar cambios
+        # Agregar la nota a la sesión y registrar sus tags
         self.db.add(db_note)
-        self.db.commit()
-        self.db.refresh(db_note)  # Actualizar el objeto con datos de la BD (ID, timestamps)
-        return self._to_note_out(db_note)  # Convertir a esquema de salida
-    
-    def get_notes(self, skip: int = 0, limit: int = 10, search: str = "", archived: Optional[bool] = None) -> List[NoteOut]:
-        """Obtener lista de notas con paginación, búsqueda y filtros"""
-        # Crear query base para obtener notas
-        query = self.db.query(Note)
-        
-        # Aplicar filtro de búsqueda si se proporciona
-        if search:
-            # Buscar en título O contenido (operador |)
-            query = query.filter(Note.title.contains(search) | Note.content.contains(search))
-        
-        # Aplicar filtro por estado de archivado si se especifica
-        if archived is not None:
-            query = query.filter(Note.archived == archived)
-        
-        # Aplicar paginación y ejecutar query
-        notes = query.offset(skip).limit(limit).all()
-        
-        # Convertir cada nota del modelo a esquema de salida
-        return [self._to_note_out(note) for note in notes]
-    
+        self.db.flush()
+        self._insert_tags(db_note.id, tags)
+        term_index.add_text(note_data.title, note_data.content)
+        # Convertir antes del commit: los timestamps ya
+        # están asignados y no hace falta un refresh
+        return self._to_note_out(db_note)
+
+    def get_notes(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        search: str = "",
+        archived: Optional[bool] = None,
+        highlight: bool = False,
+        sort: str = "updated_at",
+        cursor: Optional[Cursor] = None,
+        keyset: bool = False,
+        tags: Optional[List[str]] = None,
+        tags_mode: str = "any",
+        raw: bool = False,
+        fields: Optional[List[str]] = None,
+        preview_length: int = 200,
+        fuzzy: bool = False,
+    ) -> List[NoteListOut]:
+        """Obtener lista de notas con paginación, búsqueda y filtros
+
+        Con keyset=True (o un cursor) la página se obtiene con una condición
+        (sort, id) < cursor sobre el índice compuesto en lugar de OFFSET, de modo
+        que cualquier página cuesta lo mismo y el orden es estable ante escrituras.
+
+        Con raw=True se leen solo las columnas y se devuelven diccionarios con la
+        forma de NoteListOut (sin objetos ORM ni validación), listos para orjson.
+        Con fields (subconjunto de LIST_FIELDS) la consulta selecciona solo esas
+        columnas más el id, y preview se calcula en SQL con substr(), de modo que
+        el contenido completo no se lee ni se transfiere salvo que se pida.
+
+        Con fuzzy=True las palabras de la búsqueda que no coinciden con ningún
+        término se amplían con los términos más parecidos (erratas).
+        """
+        # Crear query base para obtener notas y aplicar búsqueda y filtros
+        if fields is not None:
+            entities = self._projected_columns(fields, preview_length)
+        else:
+            entities = NOTE_COLUMNS if raw else (Note,)
+        query, ranking = self._filter_notes(
+            self.db.query(*entities), search, archived, tags, tags_mode, fuzzy
+        )
+        sort_column = getattr(Note, sort)
+        keyset = keyset or cursor is not None
+        # Ordenar por relevancia (bm25 o ts_rank_cd) salvo
+        # en modo cursor, que necesita un orden estable
+        ranked = ranking is not None and not keyset
+        if ranked and highlight:
+            query = query.add_columns(ranking.snippet.label("snippet"))
+
+        if ranked:
+            query = query.order_by(ranking.order_by, Note.id)
+        else:
+            # Orden determinista: más recientes primero, id como desempate
+            query = query.order_by(sort_column.desc(), Note.id.desc())
+
+        # Aplicar paginación (cursor u offset) y ejecutar query
+        if keyset:
+            if cursor is not None:
+                query = query.filter(
+                    tuple_(sort_column, Note.id) < tuple_(cursor.value, cursor.id)
+                )
+            rows = query.limit(limit).all()
+        else:
+            rows = query.offset(skip).limit(limit).all()
+
+        # Subconjunto de campos: diccionarios con solo las columnas seleccionadas
+        if fields is not None:
+            return [self._projected_fields(row) for row in rows]
+
+        # Ruta rápida: diccionarios directamente desde las filas
+        if raw:
+            if ranked and highlight:
+                return [
+                    dict(self._note_fields(row), snippet=row.snippet) for row in rows
+                ]
+            return [self._note_fields(row) for row in rows]
+
+        # Convertir cada nota del modelo a esquema de salida (con fragmento si se pidió)
+        if ranked and highlight:
+            return [self._to_note_list_out(note, snippet) for note, snippet in rows]
+        return [self._to_note_list_out(note) for note in rows]
+
+    def iter_note_batches(
+        self,
+        search: str = "",
+        archived: Optional[bool] = None,
+        tags: Optional[List[str]] = None,
+        tags_mode: str = "any",
+        batch_size: int = 1000,
+    ) -> Iterator[List[dict]]:
+        """Recorrer todas las notas filtradas en
+        lotes, con un cursor del lado del servidor
+
+        Las filas se leen con yield_per (sin cargar el resultado completo ni crear
+        objetos ORM), así que la memoria es constante sea cual sea el total.
+        """
+        query, _ = self._filter_notes(
+            select(*NOTE_COLUMNS), search, archived, tags, tags_mode
+        )
+        query = query.order_by(Note.created_at, Note.id).execution_options(
+            yield_per=batch_size
+        )
+        for partition in self.db.execute(query).partitions():
+            yield [self._note_fields(row) for row in partition]
+
     def get_note_by_id(self, note_id: str) -> NoteOut:
         """Obtener una nota específica por su ID único"""
+        return self.get_note_entry(note_id).note
+
+    def get_note_entry(self, note_id: str) -> NoteEntry:
+        """Obtener una nota y su versión (para ETag), usando la caché de lecturas"""
+        # Servir desde la caché si la nota se leyó recientemente
+        cached = note_cache.get(note_id)
+        if cached is not None:
+            return cached
+        generation = note_cache.generation
         # Buscar nota por ID en la base de datos
-        note = self.db.query(Note).filter(Note.id == note_id).first()
+        note = (
+            self.db.query(Note).filter(Note.id == note_id).first()
+            if self._queryable_ids([note_id])
+            else None
+        )
         if not note:
             # Lanzar excepción si no se encuentra la nota
             raise NotFoundError("Note not found")
-        return self._to_note_out(note)
-    
+        entry = NoteEntry(note.version, self._to_note_out(note))
+        # Guardar en caché salvo que otra escritura la haya invalidado mientras tanto
+        note_cache.set(note_id, entry, generation)
+        return entry
+
+    def count_notes(
+        self,
+        search: str = "",
+        archived: Optional[bool] = None,
+        tags: Optional[List[str]] = None,
+        tags_mode: str = "any",
+        fuzzy: bool = False,
+    ) -> NoteCount:
+        """Total de notas que cumplen los filtros (para X-Total-Count)
+
+        Sin búsqueda, con archivado y como mucho un tag, el total se lee de los
+        contadores que mantienen los triggers. En el resto de casos se cuenta con
+        COUNT(*) hasta settings.count_cap y, si se alcanza, se devuelve el límite
+        marcado como no exacto.
+        """
+        tags = normalize_tags(tags)
+        if not search and counters.is_supported(self.db.get_bind()):
+            keys = None
+            if not tags:
+                states = [False, True] if archived is None else [archived]
+                keys = [counters.archived_key(state) for state in states]
+            elif len(tags) == 1 and archived is None:
+                keys = [counters.tag_key(tags[0])]
+            if keys:
+                return NoteCount(counters.sum_counters(self.db, keys), True)
+        # Contar con límite para no recorrer resultados enormes
+        cap = settings.count_cap
+        query, _ = self._filter_notes(
+            select(Note.id), search, archived, tags, tags_mode, fuzzy
+        )
+        total = self.db.execute(
+            select(func.count()).select_from(query.limit(cap + 1).subquery())
+        ).scalar()
+        return NoteCount(min(total, cap), total <= cap)
+
+    def get_collection_version(self) -> Optional[int]:
+        """Contador de cambios de la colección de
+        notas (None si el motor no lo mantiene)"""
+        return counters.get_counter(self.db, counters.CHANGES)
+
+    @retry_on_busy
     def update_note(self, note_id: str, note_data: NoteUpdate) -> NoteOut:
-        """Actualizar una nota existente con nuevos datos"""
-        # Buscar la nota a actualizar
-        db_note = self.db.query(Note).filter(Note.id == note_id).first()
-        if not db_note:
-            raise NotFoundError("Note not found")
-        
-        # Obtener solo los campos que se van a actualizar (exclude_unset=True)
-        update_data = note_data.dict(exclude_unset=True)
-        for key, value in update_data.items():
-            # Convertir tags de lista a string si es necesario
-            if key == "tags":
-                value = ",".join(value) if value else ""
-            # Actualizar el atributo en el modelo
-            setattr(db_note, key, value)
-        
-        # Actualizar timestamp de modificación
-        db_note.updated_at = datetime.utcnow()
+        """Actualizar una nota existente con una sola sentencia UPDATE ... RETURNING"""
+        try:
+            entry = self._apply_update(note_id, note_data)
+        except NotFoundError:
+            self.db.rollback()
+            raise
         self.db.commit()  # Confirmar cambios
-        self.db.refresh(db_note)  # Refrescar objeto con datos actualizados
-        return self._to_note_out(db_note)
-    
-    def delete_note(self, note_id: str) -> dict:
-        """Eliminar una nota de la base de datos"""
-        # Buscar la nota a eliminar
-        db_note = self.db.query(Note).filter(Note.id == note_id).first()
-        if not db_note:
+        note_cache.delete(note_id)  # Invalidar la copia en caché
+        note_events.publish("updated", {"id": note_id, "version": entry.version})
+        return entry.note
+
+    def _apply_update(self, note_id: str, note_data: NoteUpdate) -> NoteEntry:
+        """Actualizar una nota sin confirmar la
+        transacción; NotFoundError si no existe"""
+        # Obtener solo los campos que se van a actualizar (exclude_unset=True)
+        values = note_data.dict(exclude_unset=True)
+        if not self._queryable_ids([note_id]):
             raise NotFoundError("Note not found")
-        # Eliminar nota de la base de datos
-        self.db.delete(db_note)
+        tags = None
+        if "tags" in values:
+            # Convertir tags de lista a string (sus
+            # filas en note_tags se reemplazan después)
+            tags = normalize_tags(values["tags"])
+            values["tags"] = ",".join(tags)
+
+        # Actualizar campos, timestamp de modificación y versión en la misma sentencia
+        statement = (
+            update(Note)
+            .where(Note.id == note_id)
+            .values(**values, updated_at=datetime.utcnow(), version=Note.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if self._use_returning():
+            row = self.db.execute(
+                statement.returning(*NOTE_COLUMNS, Note.version)
+            ).first()
+        else:
+            # Sin RETURNING (SQLite < 3.35): leer la
+            # fila actualizada en la misma transacción
+            updated = self.db.execute(statement).rowcount
+            row = (
+                self.db.execute(
+                    select(*NOTE_COLUMNS, Note.version).where(Note.id == note_id)
+                ).first()
+                if updated
+                else None
+            )
+        if row is None:
+            raise NotFoundError("Note not found")
+        if tags is not None:
+            self._replace_tags(note_id, tags)
+        term_index.add_text(values.get("title"), values.get("content"))
+        return NoteEntry(row.version, NoteOut(**self._note_fields(row)))
+
+    @retry_on_busy
+    def delete_note(self, note_id: str) -> dict:
+        """Eliminar una nota con una sola sentencia DELETE (sin SELECT previo)"""
+        try:
+            self._apply_delete(note_id)
+        except NotFoundError:
+            self.db.rollback()
+            raise
         self.db.commit()  # Confirmar eliminación
+        note_cache.delete(note_id)  # Invalidar la copia en caché
+        note_events.publish("deleted", {"id": note_id})
         return {"message": "Note deleted successfully"}
-    
+
+    def _apply_delete(self, note_id: str) -> None:
+        """Eliminar una nota sin confirmar la transacción; NotFoundError si no existe"""
+        if not self._queryable_ids([note_id]):
+            raise NotFoundError("Note not found")
+        # rowcount basta para detectar el 404:
+        # RETURNING no aporta nada aquí y es más lento
+        statement = (
+            delete(Note)
+            .where(Note.id == note_id)
+            .execution_options(synchronize_session=False)
+        )
+        if self.db.execute(statement).rowcount == 0:
+            raise NotFoundError("Note not found")
+        # Eliminar sus tags (ya borrados por ON DELETE
+        # CASCADE si las claves foráneas están activas)
+        self.db.execute(delete(NoteTag).where(NoteTag.note_id == note_id))
+
+    @retry_on_busy
+    def create_notes(self, items: List[NoteCreate]) -> BulkResult:
+        """Crear varias notas en una única transacción con inserciones executemany"""
+        result = self._apply_create_notes(items)
+        self.db.commit()
+        note_events.publish_many(
+            "created", [{"id": item.id, "version": 1} for item in result.results]
+        )
+        return result
+
+    def _apply_create_notes(self, items: List[NoteCreate]) -> BulkResult:
+        """Insertar varias notas sin confirmar la transacción"""
+        now = datetime.utcnow()
+        note_rows, tag_rows = [], []
+        for note_data in items:
+            note_id = str(uuid.uuid4())
+            tags = normalize_tags(note_data.tags)
+            note_rows.append(
+                {
+                    "id": note_id,
+                    "title": note_data.title,
+                    "content": note_data.content,
+                    "tags": ",".join(tags),
+                    "archived": note_data.archived or False,
+                    "version": 1,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+            tag_rows.extend({"note_id": note_id, "tag": tag} for tag in tags)
+            term_index.add_text(note_data.title, note_data.content)
+        # Un INSERT por tabla con todos los parámetros y un solo commit
+        self.db.execute(insert(Note), note_rows)
+        if tag_rows:
+            self.db.execute(insert(NoteTag), tag_rows)
+        results = [
+            BulkItemResult(index=i, id=row["id"], status=201)
+            for i, row in enumerate(note_rows)
+        ]
+        return BulkResult(succeeded=len(results), failed=0, results=results)
+
+    @retry_on_busy
+    def update_notes(self, items: List[NoteBulkUpdateItem]) -> BulkResult:
+        """Actualizar varias notas en una única
+        transacción (las inexistentes devuelven 404)"""
+        result, versions = self._apply_update_notes(items)
+        self.db.commit()
+        note_cache.delete(*versions)
+        note_events.publish_many(
+            "updated",
+            [
+                {"id": note_id, "version": version}
+                for note_id, version in versions.items()
+            ],
+        )
+        return result
+
+    def _apply_update_notes(
+        self, items: List[NoteBulkUpdateItem]
+    ) -> Tuple[BulkResult, Dict[str, int]]:
+        """Actualizar varias notas sin confirmar; devuelve
+        el resultado y la nueva versión de cada nota"""
+        # Validar todo el lote antes de escribir nada
+        ids = [item.id for item in items]
+        self._check_unique_ids(ids)
+        changes = []
+        for index, item in enumerate(items):
+            update_data = item.dict(exclude_unset=True, exclude={"id"})
+            for key in ("title", "content", "archived"):
+                if key in update_data and update_data[key] is None:
+                    raise ValidationError(f"Item {index}: '{key}' cannot be null")
+            changes.append(update_data)
+
+        existing = set(self._existing_versions(ids))
+        now = datetime.utcnow()
+        groups, new_tags = {}, {}
+        for note_id, update_data in zip(ids, changes):
+            if note_id not in existing:
+                continue
+            if "tags" in update_data:
+                new_tags[note_id] = normalize_tags(update_data["tags"])
+                update_data["tags"] = ",".join(new_tags[note_id])
+            groups.setdefault(tuple(sorted(update_data)), []).append(
+                {
+                    **{f"new_{key}": value for key, value in update_data.items()},
+                    "note_id": note_id,
+                    "now": now,
+                }
+            )
+            term_index.add_text(update_data.get("title"), update_data.get("content"))
+
+        # UPDATE por clave primaria con executemany, una sentencia por conjunto
+        # de columnas. La versión se incrementa en la propia sentencia (version
+        # = version + 1): leerla antes y escribir el valor calculado perdería
+        # incrementos concurrentes en PostgreSQL (sentencia de Core sobre la
+        # tabla: el UPDATE masivo del ORM exige la clave en cada fila)
+        notes = Note.__table__
+        for keys, group_params in groups.items():
+            statement = (
+                update(notes)
+                .where(notes.c.id == bindparam("note_id"))
+                .values(
+                    **{key: bindparam(f"new_{key}") for key in keys},
+                    updated_at=bindparam("now"),
+                    version=notes.c.version + 1,
+                )
+            )
+            self.db.execute(statement, group_params)
+        # Versiones resultantes leídas en la misma transacción
+        # (las filas siguen bloqueadas); una nota borrada entre
+        # la comprobación y el UPDATE se informa como 404
+        versions = self._existing_versions(
+            [note_id for note_id in ids if note_id in existing]
+        )
+        results, updated = [], {}
+        for index, note_id in enumerate(ids):
+            if note_id not in versions:
+                results.append(
+                    BulkItemResult(
+                        index=index, id=note_id, status=404, detail="Note not found"
+                    )
+                )
+                new_tags.pop(note_id, None)
+                continue
+            updated[note_id] = versions[note_id]
+            results.append(BulkItemResult(index=index, id=note_id, status=200))
+        if new_tags:
+            self.db.execute(delete(NoteTag).where(NoteTag.note_id.in_(list(new_tags))))
+            tag_rows = [
+                {"note_id": note_id, "tag": tag}
+                for note_id, tags in new_tags.items()
+                for tag in tags
+            ]
+            if tag_rows:
+                self.db.execute(insert(NoteTag), tag_rows)
+        return (
+            BulkResult(
+                succeeded=len(updated),
+                failed=len(results) - len(updated),
+                results=results,
+            ),
+            updated,
+        )
+
+    @retry_on_busy
+    def delete_notes(self, ids: List[str]) -> BulkResult:
+        """Eliminar varias notas en una única
+        transacción (las inexistentes devuelven 404)"""
+        result = self._apply_delete_notes(ids)
+        self.db.commit()
+        deleted = [item.id for item in result.results if item.status == 204]
+        note_cache.delete(*deleted)
+        note_events.publish_many("deleted", [{"id": note_id} for note_id in deleted])
+        return result
+
+    def _apply_delete_notes(self, ids: List[str]) -> BulkResult:
+        """Eliminar varias notas sin confirmar la transacción"""
+        self._check_unique_ids(ids)
+        existing = set(self._existing_versions(ids))
+        if existing:
+            found = list(existing)
+            self.db.execute(delete(NoteTag).where(NoteTag.note_id.in_(found)))
+            self.db.execute(
+                delete(Note)
+                .where(Note.id.in_(found))
+                .execution_options(synchronize_session=False)
+            )
+        results = [
+            (
+                BulkItemResult(index=index, id=note_id, status=204)
+                if note_id in existing
+                else BulkItemResult(
+                    index=index, id=note_id, status=404, detail="Note not found"
+                )
+            )
+            for index, note_id in enumerate(ids)
+        ]
+        return BulkResult(
+            succeeded=len(existing), failed=len(ids) - len(existing), results=results
+        )
+
+    def get_tag_counts(self, limit: int = 100) -> List[TagCount]:
+        """Obtener los tags más usados y cuántas notas tiene cada uno"""
+        if counters.is_supported(self.db.get_bind()):
+            # Leer los totales mantenidos por triggers
+            rows = counters.get_tag_totals(self.db, limit)
+        else:
+            # Agrupar solo sobre el índice de note_tags, sin leer las notas
+            count = func.count().label("count")
+            rows = self.db.execute(
+                select(NoteTag.tag, count)
+                .group_by(NoteTag.tag)
+                .order_by(count.desc(), NoteTag.tag)
+                .limit(limit)
+            )
+        return [TagCount(tag=tag, count=total) for tag, total in rows]
+
+    def _filter_notes(
+        self,
+        query,
+        search: str = "",
+        archived: Optional[bool] = None,
+        tags: Optional[List[str]] = None,
+        tags_mode: str = "any",
+        fuzzy: bool = False,
+    ):
+        """Aplicar búsqueda, archivado y tags a una consulta de notas
+
+        Devuelve la consulta y, si la búsqueda se resolvió con un índice (FTS5 o
+        tsvector), las expresiones de relevancia y fragmento (fts.Ranking).
+        fuzzy solo se aplica con FTS5; en PostgreSQL
+        la búsqueda sigue siendo por prefijo.
+        """
+        ranking = None
+        bind = self.db.get_bind()
+        # Aplicar filtro de búsqueda si se proporciona
+        if search:
+            match_query = fts.build_match_query(search)
+            if match_query and fts.is_postgresql(bind):
+                # Buscar en la columna tsvector (índice GIN) por prefijo
+                ts_query = fts.build_ts_query(search)
+                query = query.filter(fts.ts_match(ts_query))
+                ranking = fts.Ranking(fts.ts_rank(ts_query), fts.ts_headline(ts_query))
+            elif match_query and fts.is_search_supported(bind):
+                if fuzzy:
+                    # Ampliar las palabras sin coincidencias con términos
+                    # parecidos del vocabulario El hilo de carga necesita
+                    # un motor síncrono (la ruta async usa aiosqlite)
+                    term_index.load_in_background(
+                        read_engine if bind.dialect.is_async else bind
+                    )
+                    match_query = build_fuzzy_match_query(
+                        search,
+                        term_index,
+                        settings.fuzzy_similarity_threshold,
+                        settings.fuzzy_max_expansions,
+                        settings.fuzzy_min_token_length,
+                    )
+                # Buscar en el índice FTS5 por prefijo
+                query = query.join(fts.notes_fts, fts.join_condition())
+                query = query.filter(fts.match(match_query))
+                ranking = fts.Ranking(fts.rank(), fts.snippet())
+            else:
+                # Sin índice (u otra base de datos): buscar
+                # en título O contenido (operador |)
+                query = query.filter(
+                    Note.title.contains(search) | Note.content.contains(search)
+                )
+
+        # Aplicar filtro por estado de archivado si se especifica
+        if archived is not None:
+            query = query.filter(Note.archived == archived)
+
+        # Aplicar filtro por tags: índice GIN del array
+        # de tags en PostgreSQL, note_tags en el resto
+        tags = normalize_tags(tags)
+        if tags and tag_index.is_supported(bind):
+            query = query.filter(tag_index.tags_filter(tags, tags_mode))
+        elif tags:
+            query = query.filter(Note.id.in_(self._tagged_note_ids(tags, tags_mode)))
+        return query, ranking
+
+    def _use_returning(self) -> bool:
+        """Indicar si UPDATE ... RETURNING está
+        disponible (SQLite >= 3.35, PostgreSQL)"""
+        if self.returning is not None:
+            return self.returning
+        return self.db.get_bind().dialect.update_returning
+
+    def _existing_versions(self, ids: List[str]) -> dict:
+        """Obtener la versión actual de los ids que existen, con una sola consulta"""
+        ids = self._queryable_ids(ids)
+        if not ids:
+            return {}
+        return dict(
+            self.db.execute(select(Note.id, Note.version).where(Note.id.in_(ids))).all()
+        )
+
+    def _queryable_ids(self, ids: List[str]) -> List[str]:
+        """Ids que pueden existir en la base de datos
+
+        Con UUID nativo (PostgreSQL) un id mal formado no puede existir y además
+        haría fallar la consulta, así que se descarta antes (404 en lugar de 500).
+        Solo se aceptan ids en la forma canónica que genera create_note.
+        """
+        if not fts.is_postgresql(self.db.get_bind()):
+            return ids
+        return [note_id for note_id in ids if _is_canonical_uuid(note_id)]
+
+    def _check_unique_ids(self, ids: List[str]) -> None:
+        """Rechazar lotes que repiten el mismo id"""
+        if len(set(ids)) != len(ids):
+            raise ValidationError("Duplicate note ids in request")
+
+    def _tagged_note_ids(self, tags: List[str], mode: str = "any"):
+        """Subconsulta con los ids de notas que
+        tienen alguno (any) o todos (all) los tags"""
+        query = select(NoteTag.note_id).where(NoteTag.tag.in_(tags))
+        if mode == "all" and len(tags) > 1:
+            query = query.group_by(NoteTag.note_id).having(func.count() == len(tags))
+        return query
+
+    def _insert_tags(self, note_id: str, tags: List[str]) -> None:
+        """Insertar las filas de note_tags de una nota"""
+        if tags:
+            self.db.execute(
+                insert(NoteTag), [{"note_id": note_id, "tag": tag} for tag in tags]
+            )
+
+    def _replace_tags(self, note_id: str, tags: List[str]) -> None:
+        """Sustituir los tags de una nota en note_tags"""
+        self.db.execute(delete(NoteTag).where(NoteTag.note_id == note_id))
+        self._insert_tags(note_id, tags)
+
     def _to_note_out(self, note: Note) -> NoteOut:
         """Convertir modelo de Note a esquema de salida NoteOut"""
-        return NoteOut(
+        return NoteOut(**self._note_fields(note))
+
+    def _to_note_list_out(
+        self, note: Note, snippet: Optional[str] = None
+    ) -> NoteListOut:
+        """Convertir modelo de Note a elemento de
+        listado (con fragmento resaltado opcional)"""
+        return NoteListOut(**self._note_fields(note), snippet=snippet)
+
+    def _projected_columns(self, fields: List[str], preview_length: int) -> list:
+        """Columnas a seleccionar para un subconjunto
+        de campos (el id siempre se incluye)"""
+        columns = [Note.id]
+        for field in dict.fromkeys(fields):
+            if field == "preview":
+                columns.append(
+                    func.substr(Note.content, 1, preview_length).label("preview")
+                )
+            elif field != "id":
+                columns.append(getattr(Note, field))
+        return columns
+
+    def _projected_fields(self, row) -> dict:
+        """Convertir una fila proyectada en diccionario con la forma de NoteListOut"""
+        item = dict(row._mapping)
+        if "tags" in item:
+            item["tags"] = item["tags"].split(",") if item["tags"] else []
+        return item
+
+    def _note_fields(self, note: Note) -> dict:
+        """Extraer los campos públicos de una nota"""
+        return dict(
             id=note.id,
             title=note.title,
             content=note.content,
@@ -102,5 +742,5 @@ class NoteService:
             tags=note.tags.split(",") if note.tags else [],
             archived=note.archived,
             created_at=note.created_at,
-            updated_at=note.updated_at
-        )
\ No newline at end of file
+            updated_at=note.updated_at,
+        )
@@ -0,0 +1,369 @@
+# Agrupación de escrituras concurrentes de notas en una sola transacción (group commit)
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.cache import note_cache
+from app.core.config import settings
+from app.core.events import note_events
+from app.core.logging import logger
+from app.database import SessionLocal, busy_retry_delays, is_busy_error
+from app.exceptions.handlers import ServiceUnavailableError
+from app.schemas import BulkResult, NoteBulkUpdateItem, NoteCreate, NoteOut, NoteUpdate
+from app.services.note_service import NoteService
+
+
+# Resultado de una operación aplicada sin commit y lo que hay que hacer tras el commit
+class AppliedWrite(NamedTuple):
+    """Respuesta de la petición, eventos a publicar
+    (tipo, datos) y notas a invalidar en caché"""
+
+    result: Any
+    events: List[Tuple[str, dict]]
+    invalidate: List[str]
+
+
+# Escritura pendiente: función que la aplica sin commit y futuro con su resultado
+class PendingWrite(NamedTuple):
+    """Operación encolada por una petición"""
+
+    apply: Callable[[NoteService], AppliedWrite]
+    future: Future
+
+
+# Agrupador de escrituras con un hilo escritor propio
+class WriteCoalescer:
+    """Confirma en una sola transacción las escrituras de notas que llegan juntas
+
+    Cada petición encola su operación y espera su resultado. El hilo escritor
+    toma la primera operación pendiente, recoge las que lleguen durante como
+    mucho max_delay_ms (o hasta max_batch) y las aplica en una transacción con
+    un único commit: con SQLite, un solo fsync para todo el lote. Con
+    settings.write_coalescing todas las rutas que escriben notas (creación,
+    actualización, borrado y operaciones bulk, síncronas o async) pasan por
+    aquí, así que el hilo escritor es el único que escribe notas.
+
+    Cada operación se ejecuta en su propio SAVEPOINT, así que un 404 o un error
+    de integridad solo afecta a su petición. Si el lote entero falla, se vuelve
+    a intentar (bloqueos) o se aplica operación a operación para que cada
+    petición reciba su propio resultado o error.
+
+    La cola admite como mucho max_queue operaciones: con la cola llena la
+    petición recibe 503 en lugar de bloquear un hilo más. Una operación que no
+    empezó a aplicarse en timeout segundos se descarta (503); si el hilo
+    escritor ya la tomó, se espera a su commit para no responder 503 a una
+    escritura que sí se hizo.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_delay_ms: float = 2.0,
+        max_batch: int = 64,
+        max_queue: int = 1024,
+        timeout: float = 2.0,
+    ):
+        self.session_factory = session_factory
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue: "queue.Queue[PendingWrite]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def create_note(self, note_data: NoteCreate) -> NoteOut:
+        """Crear una nota dentro del siguiente lote"""
+        return self.wait(self.submit(self._create(note_data)))
+
+    def update_note(self, note_id: str, note_data: NoteUpdate) -> NoteOut:
+        """Actualizar una nota dentro del siguiente lote (NotFoundError si no existe)"""
+        return self.wait(self.submit(self._update(note_id, note_data)))
+
+    def delete_note(self, note_id: str) -> None:
+        """Eliminar una nota dentro del siguiente lote (NotFoundError si no existe)"""
+        return self.wait(self.submit(self._delete(note_id)))
+
+    def create_notes(self, items: List[NoteCreate]) -> BulkResult:
+        """Crear varias notas dentro del siguiente lote"""
+        return self.wait(self.submit(self._create_many(items)))
+
+    def update_notes(self, items: List[NoteBulkUpdateItem]) -> BulkResult:
+        """Actualizar varias notas dentro del siguiente lote"""
+        return self.wait(self.submit(self._update_many(items)))
+
+    def delete_notes(self, ids: List[str]) -> BulkResult:
+        """Eliminar varias notas dentro del siguiente lote"""
+        return self.wait(self.submit(self._delete_many(ids)))
+
+    async def create_note_async(self, note_data: NoteCreate) -> NoteOut:
+        """create_note para las rutas async: espera el lote sin ocupar un hilo"""
+        return await self.wait_async(self.submit(self._create(note_data)))
+
+    async def update_note_async(self, note_id: str, note_data: NoteUpdate) -> NoteOut:
+        """update_note para las rutas async: espera el lote sin ocupar un hilo"""
+        return await self.wait_async(self.submit(self._update(note_id, note_data)))
+
+    async def delete_note_async(self, note_id: str) -> None:
+        """delete_note para las rutas async"""
+        return await self.wait_async(self.submit(self._delete(note_id)))
+
+    async def create_notes_async(self, items: List[NoteCreate]) -> BulkResult:
+        """create_notes para las rutas async"""
+        return await self.wait_async(self.submit(self._create_many(items)))
+
+    async def update_notes_async(self, items: List[NoteBulkUpdateItem]) -> BulkResult:
+        """update_notes para las rutas async"""
+        return await self.wait_async(self.submit(self._update_many(items)))
+
+    async def delete_notes_async(self, ids: List[str]) -> BulkResult:
+        """delete_notes para las rutas async"""
+        return await self.wait_async(self.submit(self._delete_many(ids)))
+
+    # Operaciones: aplican la escritura con los
+    # métodos _apply_* de NoteService (sin commit)
+    @staticmethod
+    def _create(note_data: NoteCreate) -> Callable[[NoteService], AppliedWrite]:
+        def apply(service: NoteService) -> AppliedWrite:
+            note = service._insert_note(note_data)
+            return AppliedWrite(note, [("created", {"id": note.id, "version": 1})], [])
+
+        return apply
+
+    @staticmethod
+    def _update(
+        note_id: str, note_data: NoteUpdate
+    ) -> Callable[[NoteService], AppliedWrite]:
+        def apply(service: NoteService) -> AppliedWrite:
+            entry = service._apply_update(note_id, note_data)
+            return AppliedWrite(
+                entry.note,
+                [("updated", {"id": note_id, "version": entry.version})],
+                [note_id],
+            )
+
+        return apply
+
+    @staticmethod
+    def _delete(note_id: str) -> Callable[[NoteService], AppliedWrite]:
+        def apply(service: NoteService) -> AppliedWrite:
+            service._apply_delete(note_id)
+            return AppliedWrite(None, [("deleted", {"id": note_id})], [note_id])
+
+        return apply
+
+    @staticmethod
+    def _create_many(items: List[NoteCreate]) -> Callable[[NoteService], AppliedWrite]:
+        def apply(service: NoteService) -> AppliedWrite:
+            result = service._apply_create_notes(items)
+            return AppliedWrite(
+                result,
+                [("created", {"id": item.id, "version": 1}) for item in result.results],
+                [],
+            )
+
+        return apply
+
+    @staticmethod
+    def _update_many(
+        items: List[NoteBulkUpdateItem],
+    ) -> Callable[[NoteService], AppliedWrite]:
+        def apply(service: NoteService) -> AppliedWrite:
+            result, versions = service._apply_update_notes(items)
+            events = [
+                ("updated", {"id": note_id, "version": version})
+                for note_id, version in versions.items()
+            ]
+            return AppliedWrite(result, events, list(versions))
+
+        return apply
+
+    @staticmethod
+    def _delete_many(ids: List[str]) -> Callable[[NoteService], AppliedWrite]:
+        def apply(service: NoteService) -> AppliedWrite:
+            result = service._apply_delete_notes(ids)
+            deleted = [item.id for item in result.results if item.status == 204]
+            return AppliedWrite(
+                result, [("deleted", {"id": note_id}) for note_id in deleted], deleted
+            )
+
+        return apply
+
+    def submit(self, apply: Callable[[NoteService], AppliedWrite]) -> Future:
+        """Encolar una operación y devolver el futuro
+        con su respuesta (503 si la cola está llena)"""
+        self._ensure_started()
+        pending = PendingWrite(apply, Future())
+        try:
+            self._queue.put_nowait(pending)
+        except queue.Full:
+            raise ServiceUnavailableError("Write queue full, please retry")
+        return pending.future
+
+    def wait(self, future: Future) -> Any:
+        """Esperar el resultado como mucho timeout
+        segundos antes de que empiece a aplicarse"""
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise ServiceUnavailableError("Write queue busy, please retry")
+            # El hilo escritor ya la está aplicando: esperar a su commit
+            return future.result()
+
+    async def wait_async(self, future: Future) -> Any:
+        """Variante de wait que espera en el bucle de eventos"""
+        result = asyncio.wrap_future(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(result), self.timeout)
+        except asyncio.TimeoutError:
+            if future.cancel():
+                raise ServiceUnavailableError("Write queue busy, please retry")
+            return await result
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="note-write-coalescer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Bucle del hilo escritor: recoger un lote y aplicarlo"""
+        while True:
+            batch = self._collect(self._queue.get())
+            # Marcar el lote como en curso: las operaciones
+            # que ya agotaron su espera se descartan
+            batch = [
+                pending
+                for pending in batch
+                if pending.future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            except Exception as exc:
+                # Error inesperado (no de base de datos):
+                # responder a todas las peticiones del lote
+                logger.error(f"Write coalescer batch failed: {exc}")
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(exc)
+
+    def _collect(self, first: PendingWrite) -> List[PendingWrite]:
+        """Reunir las operaciones que llegan hasta max_delay después de la primera"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                # Las que ya esperan (llegadas durante el
+                # commit anterior) se toman sin esperar
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[PendingWrite]) -> None:
+        """Aplicar el lote en una transacción, reintentando ante bloqueos"""
+        metrics.db_write_batch_size.observe((), len(batch))
+        for delay in busy_retry_delays():
+            try:
+                return self._commit(batch)
+            except OperationalError as exc:
+                if not is_busy_error(exc):
+                    return self._write_separately(batch, exc)
+                time.sleep(delay)
+            except SQLAlchemyError as exc:
+                return self._write_separately(batch, exc)
+        try:
+            self._commit(batch)
+        except SQLAlchemyError as exc:
+            self._write_separately(batch, exc)
+
+    def _write_separately(self, batch: List[PendingWrite], exc: Exception) -> None:
+        """Si el lote no se pudo confirmar, aplicar
+        cada operación en su propia transacción"""
+        if len(batch) == 1:
+            batch[0].future.set_exception(exc)
+            return
+        logger.warning(
+            f"Write batch of {len(batch)} failed ({exc}); retrying writes one by one"
+        )
+        for pending in batch:
+            self._write([pending])
+
+    def _commit(self, batch: List[PendingWrite]) -> None:
+        """Una transacción con un SAVEPOINT por operación y un solo commit"""
+        db = self.session_factory()
+        try:
+            service = NoteService(db, retry_on_busy=False)
+            applied, failed = [], []
+            for pending in batch:
+                savepoint = db.begin_nested()
+                try:
+                    applied_write = pending.apply(service)
+                except OperationalError as exc:
+                    if is_busy_error(exc):
+                        raise
+                    savepoint.rollback()
+                    failed.append((pending, exc))
+                except (HTTPException, SQLAlchemyError) as exc:
+                    # Error de esta petición (404,
+                    # integridad...): el resto del lote sigue
+                    savepoint.rollback()
+                    failed.append((pending, exc))
+                else:
+                    savepoint.commit()
+                    applied.append((pending, applied_write))
+            db.commit()
+        finally:
+            db.close()
+        # Después del commit: invalidar la caché, publicar
+        # los eventos y responder a cada petición
+        invalidated = [note_id for _, write in applied for note_id in write.invalidate]
+        if invalidated:
+            note_cache.delete(*invalidated)
+        for kind in ("created", "updated", "deleted"):
+            note_events.publish_many(
+                kind,
+                [
+                    data
+                    for _, write in applied
+                    for event, data in write.events
+                    if event == kind
+                ],
+            )
+        for pending, write in applied:
+            pending.future.set_result(write.result)
+        for pending, exc in failed:
+            pending.future.set_exception(exc)
+
+
+# Instancia global usada por las rutas de escritura
+# cuando settings.write_coalescing está activo
+write_coalescer = WriteCoalescer(
+    max_delay_ms=settings.write_coalesce_max_delay_ms,
+    max_batch=settings.write_coalesce_max_batch,
+    max_queue=settings.write_coalesce_max_queue,
+    timeout=settings.write_coalesce_timeout,
+)
@@ -0,0 +1,106 @@
+# Preparación de la base de datos al arrancar:
+# comprobación del esquema y datos de ejemplo opcionales
+import time
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.database import busy_retry_delays, engine, is_busy_error, read_engine
+from app.migrations import SCHEMA_VERSION, migrate, read_schema_version
+from app.models import Note
+
+# Clave del bloqueo consultivo de PostgreSQL que
+# serializa migraciones y seed entre procesos
+MIGRATION_LOCK_KEY = 7320145
+
+# Notas de ejemplo creadas con SEED_SAMPLE_DATA=true en una base de datos vacía
+SAMPLE_NOTES = [
+    {
+        "title": "Welcome to Notes App",
+        "content": "This is your first note! You can create, edit, and delete notes "
+        "using this application.",
+        "tags": ["welcome"],
+        "archived": False,
+    },
+    {
+        "title": "Meeting Notes",
+        "content": "Project kickoff meeting scheduled for next week.",
+        "tags": ["meeting", "work"],
+        "archived": False,
+    },
+    {
+        "title": "Shopping List",
+        "content": "Milk, bread, eggs, apples",
+        "tags": ["shopping"],
+        "archived": False,
+    },
+]
+
+
+def _has_notes(connection: Connection) -> bool:
+    """Comprobar si hay alguna nota (una fila con LIMIT 1, sin COUNT)"""
+    return connection.execute(select(Note.id).limit(1)).first() is not None
+
+
+def _seed(connection: Connection) -> int:
+    """Crear las notas de ejemplo dentro de la transacción de ``connection``"""
+    # Importación diferida: solo se necesita cuando el seed está activado
+    from app.schemas import NoteCreate
+    from app.services.note_service import NoteService
+
+    # La sesión se une a la transacción existente: su commit no la cierra
+    db = Session(bind=connection)
+    try:
+        NoteService(db).create_notes([NoteCreate(**note) for note in SAMPLE_NOTES])
+    finally:
+        db.close()
+    return len(SAMPLE_NOTES)
+
+
+def _migrate_and_seed(write_engine: Engine) -> int:
+    """Migrar y poblar en una sola transacción de escritura
+
+    El motor de escritura abre la transacción con BEGIN IMMEDIATE (en
+    PostgreSQL se toma un pg_advisory_xact_lock): un único proceso migra o
+    puebla a la vez y los demás esperan el bloqueo y vuelven a comprobar el
+    estado dentro de la transacción, así que no se duplica nada.
+    """
+    with write_engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+            )
+        version = migrate(connection)
+        if settings.seed_sample_data and not _has_notes(connection):
+            logger.info(f"Database seeded with {_seed(connection)} sample notes")
+    return version
+
+
+def prepare_database(
+    write_engine: Engine = engine, check_engine: Engine = read_engine
+) -> int:
+    """Comprobar la versión del esquema y migrar o poblar solo si hace falta
+
+    En el caso habitual (esquema al día) solo se lee schema_version desde el
+    motor de lectura, sin create_all ni bloqueos. Devuelve la versión del esquema.
+    """
+    with check_engine.connect() as connection:
+        current = read_schema_version(connection)
+        needs_seed = settings.seed_sample_data and (
+            current < SCHEMA_VERSION or not _has_notes(connection)
+        )
+    if current == SCHEMA_VERSION and not needs_seed:
+        return current
+    # Otro proceso puede tener el bloqueo más allá del busy_timeout (migraciones largas)
+    for delay in busy_retry_delays():
+        try:
+            return _migrate_and_seed(write_engine)
+        except OperationalError as exc:
+            if not is_busy_error(exc):
+                raise
+            time.sleep(delay)
+    return _migrate_and_seed(write_engine)
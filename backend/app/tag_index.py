@@ -0,0 +1,67 @@
+# Índice GIN de los tags como array (PostgreSQL) para filtrar notas por tags
+from typing import List
+
+from sqlalchemy import Text, cast, event, func, literal_column, text
+from sqlalchemy.engine import Connection
+
+from app.models import Note
+
+# Índice de expresión sobre string_to_array(tags, ','): la
+# consulta debe usar exactamente la misma expresión (separador
+# literal, no parámetro) para que el planificador lo use
+TAGS_INDEX = "ix_notes_tags_gin"
+_TAGS_ARRAY = "string_to_array(tags, ',')"
+
+_CREATE_STATEMENTS = [
+    f"CREATE INDEX IF NOT EXISTS {TAGS_INDEX} ON notes USING gin ({_TAGS_ARRAY})",
+]
+
+_DROP_STATEMENTS = [
+    f"DROP INDEX IF EXISTS {TAGS_INDEX}",
+]
+
+
+def is_supported(connection) -> bool:
+    """Indicar si la conexión usa un motor con arrays e índices GIN (PostgreSQL)"""
+    return connection.dialect.name == "postgresql"
+
+
+def create_tags_index(connection: Connection) -> None:
+    """Crear el índice GIN de tags si no existe"""
+    for statement in _CREATE_STATEMENTS:
+        connection.execute(text(statement))
+
+
+def drop_tags_index(connection: Connection) -> None:
+    """Eliminar el índice GIN de tags"""
+    for statement in _DROP_STATEMENTS:
+        connection.execute(text(statement))
+
+
+def tags_array():
+    """Expresión string_to_array(notes.tags, ',') (la misma del índice)"""
+    return func.string_to_array(Note.tags, literal_column("','"))
+
+
+def tags_filter(tags: List[str], mode: str = "any"):
+    """Notas con alguno (&&, any) o todos (@>,
+    all) los tags, resuelto con el índice GIN"""
+    # Importación diferida: el dialecto de PostgreSQL solo se carga si se usa
+    from sqlalchemy.dialects.postgresql import ARRAY, array
+
+    wanted = cast(array(tags), ARRAY(Text))
+    operator = "@>" if mode == "all" else "&&"
+    return tags_array().op(operator)(wanted)
+
+
+# Crear el índice junto con la tabla notes (create_all) y eliminarlo con ella (drop_all)
+@event.listens_for(Note.__table__, "after_create")
+def _create_index_with_table(target, connection, **kw):
+    if is_supported(connection):
+        create_tags_index(connection)
+
+
+@event.listens_for(Note.__table__, "before_drop")
+def _drop_index_with_table(target, connection, **kw):
+    if is_supported(connection):
+        drop_tags_index(connection)
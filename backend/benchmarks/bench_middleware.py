@@ -0,0 +1,78 @@
+# Benchmark de peticiones por segundo a través de toda la pila de middleware
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from app.core.logging import setup_logging
+from app.startup import prepare_database
+from main import app
+
+
+def silence_logs():
+    """Send application logs to /dev/null so
+    terminal output does not skew the numbers"""
+    setup_logging(stream=open(os.devnull, "w"))
+
+
+async def measure(
+    client: httpx.AsyncClient, path: str, requests: int, concurrency: int
+) -> float:
+    """Run `requests` GETs against `path` with
+    `concurrency` workers and return requests/second"""
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            response = await client.get(path)
+            assert response.status_code == 200, response.status_code
+
+    # Calentamiento (cachés, conexiones del pool)
+    for _ in range(50):
+        await client.get(path)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+
+async def run(requests: int, concurrency: int, rounds: int) -> None:
+    """Benchmark /health and GET /api/v1/notes/{id} in-process (no network stack)"""
+    # ASGITransport no ejecuta el lifespan: preparar la base de datos aquí
+    prepare_database()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://localhost"
+    ) as client:
+        created = await client.post(
+            "/api/v1/notes/",
+            json={"title": "Benchmark", "content": "Middleware benchmark"},
+        )
+        note_id = created.json()["id"]
+        try:
+            for label, path in (
+                ("/health", "/health"),
+                ("GET /notes/{id}", f"/api/v1/notes/{note_id}"),
+            ):
+                # Mejor de varias rondas para reducir el ruido del sistema
+                best = max(
+                    [
+                        await measure(client, path, requests, concurrency)
+                        for _ in range(rounds)
+                    ]
+                )
+                print(f"{label:<18} {best:8.0f} req/s")
+        finally:
+            await client.delete(f"/api/v1/notes/{note_id}")
+
+
+# Ejecutar benchmark si se ejecuta directamente: python -m benchmarks.bench_middleware
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=run.__doc__)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    silence_logs()
+    asyncio.run(run(args.requests, args.concurrency, args.rounds))
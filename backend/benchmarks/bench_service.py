@@ -0,0 +1,135 @@
+# Micro-benchmarks de NoteService (listado, búsqueda, conteo, lectura y actualización)
+import argparse
+import random
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import bindparam, text
+
+from app.core.cache import note_cache
+from app.core.config import settings
+from app.database import ReadSessionLocal, SessionLocal, engine
+from app.migrations import run_migrations
+from app.pagination import Cursor
+from app.schemas import NoteUpdate
+from app.services.note_service import NoteService
+from benchmarks.common import print_table, summarize, write_results
+from benchmarks.generate import WORDS
+
+
+def sample_ids(count: int, rng: random.Random) -> List[str]:
+    """Random existing note ids, picked by rowid so large tables are not scanned"""
+    db = ReadSessionLocal()
+    try:
+        low, high = db.execute(text("SELECT min(rowid), max(rowid) FROM notes")).one()
+        if low is None:
+            raise SystemExit(
+                "The database has no notes: run python -m benchmarks.generate first"
+            )
+        rowids = [rng.randint(low, high) for _ in range(count)]
+        query = text("SELECT id FROM notes WHERE rowid IN :rowids").bindparams(
+            bindparam("rowids", expanding=True)
+        )
+        return db.execute(query, {"rowids": rowids}).scalars().all()
+    finally:
+        db.close()
+
+
+def run_operation(
+    operation: Callable[[NoteService], object], iterations: int, write: bool = False
+) -> Dict[str, float]:
+    """Time ``iterations`` calls of ``operation``,
+    each with a fresh session like a request"""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        db = SessionLocal() if write else ReadSessionLocal()
+        try:
+            call_started = time.perf_counter()
+            operation(NoteService(db))
+            latencies.append(time.perf_counter() - call_started)
+        finally:
+            db.close()
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def build_operations(rng: random.Random):
+    """Benchmarked operations: name -> (callable receiving a NoteService, writes?)"""
+    ids = sample_ids(1000, rng)
+    db = ReadSessionLocal()
+    try:
+        middle = NoteService(db).get_note_by_id(ids[0])
+    finally:
+        db.close()
+    cursor = Cursor("updated_at", middle.updated_at, middle.id)
+
+    def get_cold(service):
+        note_cache.clear()
+        return service.get_note_by_id(rng.choice(ids))
+
+    return {
+        "list_page_1": (lambda s: s.get_notes(limit=20), False),
+        "list_offset_page_500": (lambda s: s.get_notes(skip=10000, limit=20), False),
+        "list_keyset": (
+            lambda s: s.get_notes(limit=20, cursor=cursor, keyset=True),
+            False,
+        ),
+        "list_tag": (lambda s: s.get_notes(limit=20, tags=["work"]), False),
+        "list_archived": (lambda s: s.get_notes(limit=20, archived=True), False),
+        "search": (lambda s: s.get_notes(limit=20, search=rng.choice(WORDS)), False),
+        "search_highlight": (
+            lambda s: s.get_notes(limit=20, search=rng.choice(WORDS), highlight=True),
+            False,
+        ),
+        "count_all": (lambda s: s.count_notes(), False),
+        "count_search": (lambda s: s.count_notes(search=rng.choice(WORDS)), False),
+        "get_cold": (get_cold, False),
+        "get_warm": (lambda s: s.get_note_by_id(ids[0]), False),
+        "update": (
+            lambda s: s.update_note(
+                rng.choice(ids), NoteUpdate(title=" ".join(rng.choices(WORDS, k=3)))
+            ),
+            True,
+        ),
+    }
+
+
+def run(
+    iterations: int, only: List[str], output: str = None, seed: int = 1
+) -> Dict[str, Dict[str, float]]:
+    """Run the NoteService micro-benchmarks against settings.database_url"""
+    run_migrations(engine)
+    rng = random.Random(seed)
+    operations = build_operations(rng)
+    results = {}
+    for name, (operation, write) in operations.items():
+        if only and name not in only:
+            continue
+        results[name] = run_operation(operation, iterations, write)
+    print_table(results)
+    if output:
+        write_results(
+            output,
+            "service",
+            {"iterations": iterations, "database_url": settings.database_url},
+            results,
+        )
+    return results
+
+
+# Ejecutar micro-benchmarks si se ejecuta directamente:
+# DATABASE_URL=sqlite:///./bench.db python -m
+# benchmarks.bench_service --output service.json
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks of NoteService methods (the update benchmark "
+        "writes)"
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument(
+        "--only", nargs="*", default=[], help="Operation names to run (default: all)"
+    )
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    run(args.iterations, args.only, args.output, args.seed)
@@ -0,0 +1,213 @@
+# Micro-benchmark de escrituras de notas: ORM
+# frente a una sola sentencia y commits agrupados
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import sessionmaker
+
+from app.database import configure_sqlite_engine
+from app.migrations import run_migrations
+from app.models import Note, NoteTag
+from app.schemas import NoteCreate, NoteUpdate
+from app.services.note_service import NoteService
+from app.services.write_coalescer import WriteCoalescer
+from benchmarks.common import print_table, summarize, write_results
+from benchmarks.generate import WORDS
+
+
+def orm_update(db, note_id: str, title: str) -> None:
+    """Previous implementation: load the row, mutate the ORM object, commit, refresh"""
+    note = db.query(Note).filter(Note.id == note_id).first()
+    note.title = title
+    note.updated_at = datetime.utcnow()
+    note.version = note.version + 1
+    db.commit()
+    db.refresh(note)
+
+
+def orm_delete(db, note_id: str) -> None:
+    """Previous implementation: load the row,
+    delete its tags and the ORM object, commit"""
+    note = db.query(Note).filter(Note.id == note_id).first()
+    db.execute(delete(NoteTag).where(NoteTag.note_id == note_id))
+    db.delete(note)
+    db.commit()
+
+
+# Variantes de actualización y de borrado: nombre -> función(sesión, id[, título])
+UPDATE_VARIANTS: Dict[str, Callable] = {
+    "orm": orm_update,
+    "no_returning": lambda db, note_id, title: NoteService(
+        db, returning=False
+    ).update_note(note_id, NoteUpdate(title=title)),
+    "returning": lambda db, note_id, title: NoteService(db, returning=True).update_note(
+        note_id, NoteUpdate(title=title)
+    ),
+}
+DELETE_VARIANTS: Dict[str, Callable] = {
+    "orm": orm_delete,
+    "statement": lambda db, note_id: NoteService(db).delete_note(note_id),
+}
+
+
+def time_writes(session_factory, ids: List[str], write: Callable) -> Dict[str, float]:
+    """Time one write per id, each with a fresh session like a request"""
+    latencies = []
+    started = time.perf_counter()
+    for note_id in ids:
+        db = session_factory()
+        try:
+            call_started = time.perf_counter()
+            write(db, note_id)
+            latencies.append(time.perf_counter() - call_started)
+        finally:
+            db.close()
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def time_concurrent_creates(
+    session_factory,
+    notes: int,
+    threads: int,
+    rng: random.Random,
+    coalescer: WriteCoalescer = None,
+) -> Dict[str, float]:
+    """Create ``notes`` notes from ``threads``
+    concurrent clients, one request-like call each"""
+    payloads = [
+        NoteCreate(
+            title=" ".join(rng.choices(WORDS, k=3)),
+            content=" ".join(rng.choices(WORDS, k=40)),
+            tags=rng.sample(WORDS, 2),
+        )
+        for _ in range(notes)
+    ]
+
+    def create(note_data: NoteCreate) -> float:
+        call_started = time.perf_counter()
+        if coalescer is not None:
+            coalescer.create_note(note_data)
+        else:
+            with session_factory() as db:
+                NoteService(db).create_note(note_data)
+        return time.perf_counter() - call_started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        latencies = list(pool.map(create, payloads))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def create_notes(session_factory, count: int, rng: random.Random) -> List[str]:
+    """Insert ``count`` notes and return their ids in random order"""
+    db = session_factory()
+    try:
+        created = NoteService(db).create_notes(
+            [
+                NoteCreate(
+                    title=" ".join(rng.choices(WORDS, k=3)),
+                    content=" ".join(rng.choices(WORDS, k=40)),
+                    tags=rng.sample(WORDS, 2),
+                )
+                for _ in range(count)
+            ]
+        )
+    finally:
+        db.close()
+    ids = [item.id for item in created.results]
+    rng.shuffle(ids)
+    return ids
+
+
+def run(
+    notes: int,
+    output: str = None,
+    seed: int = 1,
+    threads: int = 16,
+    max_delay_ms: float = 2.0,
+) -> Dict[str, Dict[str, float]]:
+    """Update and delete ``notes`` notes with each variant on a temporary database,
+    then create them concurrently with and without the write coalescer"""
+    rng = random.Random(seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # Mismo perfil que el motor de escritura de
+        # la aplicación (PRAGMAs y BEGIN IMMEDIATE)
+        engine = configure_sqlite_engine(
+            create_engine(
+                f"sqlite:///{os.path.join(directory, 'writes.db')}",
+                connect_args={"check_same_thread": False},
+            ),
+            immediate=True,
+        )
+        run_migrations(engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+        # Cada variante trabaja sobre notas nuevas,
+        # así que todas ven una tabla del mismo tamaño
+        for name, update in UPDATE_VARIANTS.items():
+            ids = create_notes(session_factory, notes, rng)
+            titles = {note_id: " ".join(rng.choices(WORDS, k=3)) for note_id in ids}
+            results[f"update_{name}"] = time_writes(
+                session_factory,
+                ids,
+                lambda db, note_id: update(db, note_id, titles[note_id]),
+            )
+            with session_factory() as db:
+                NoteService(db).delete_notes(ids)
+        for name, remove in DELETE_VARIANTS.items():
+            results[f"delete_{name}"] = time_writes(
+                session_factory, create_notes(session_factory, notes, rng), remove
+            )
+        # Creaciones concurrentes: una transacción por petición frente a lotes agrupados
+        results["create_concurrent"] = time_concurrent_creates(
+            session_factory, notes, threads, rng
+        )
+        coalescer = WriteCoalescer(session_factory, max_delay_ms=max_delay_ms)
+        results["create_coalesced"] = time_concurrent_creates(
+            session_factory, notes, threads, rng, coalescer
+        )
+        engine.dispose()
+    print_table(results)
+    if output:
+        write_results(
+            output,
+            "writes",
+            {"notes": notes, "threads": threads, "max_delay_ms": max_delay_ms},
+            results,
+        )
+    return results
+
+
+# Ejecutar micro-benchmark si se ejecuta directamente:
+# python -m benchmarks.bench_writes --notes 2000
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Per-write latency of note updates/deletes: ORM vs single "
+        "statements"
+    )
+    parser.add_argument(
+        "--notes", type=int, default=1000, help="Notes updated and deleted per variant"
+    )
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=16,
+        help="Concurrent clients for the create comparison",
+    )
+    parser.add_argument(
+        "--max-delay-ms",
+        type=float,
+        default=2.0,
+        help="Write coalescer batching window",
+    )
+    args = parser.parse_args()
+    run(args.notes, args.output, args.seed, args.threads, args.max_delay_ms)
@@ -0,0 +1,74 @@
+# Utilidades compartidas por los benchmarks: percentiles y resultados en JSON
+import json
+import math
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Percentile of ``samples`` (nearest-rank method); 0 for an empty sequence"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Throughput and p50/p95/p99/max latency in milliseconds for a list of seconds"""
+    return {
+        "count": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+
+def git_revision() -> Optional[str]:
+    """Current commit hash (None outside a git checkout)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, benchmark: str, parameters: dict, results: dict) -> None:
+    """Save results with the commit and environment
+    so runs can be compared across commits"""
+    document = {
+        "benchmark": benchmark,
+        "commit": git_revision(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "parameters": parameters,
+        "results": results,
+    }
+    with open(path, "w") as output:
+        json.dump(document, output, indent=2)
+    print(f"Results written to {path}")
+
+
+def print_table(results: Dict[str, Dict[str, float]]) -> None:
+    """Print one row per scenario/operation with its latency percentiles"""
+    print(
+        f"{'name':<24} {'count':>7} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'errors':>7} {'rejected':>8}"
+    )
+    for name, row in results.items():
+        print(
+            f"{name:<24} {row['count']:>7} {row['throughput']:>9.0f} "
+            f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+            f"{row.get('errors', ''):>7} "
+            f"{row.get('rejected', ''):>8}"
+        )
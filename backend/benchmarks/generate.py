@@ -0,0 +1,199 @@
+# Generador de datos sintéticos: llena una base
+# de datos SQLite con notas y tags realistas
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import create_engine
+
+from app import counters, search
+from app.core.config import settings
+from app.migrations import run_migrations
+from app.models import Note, NoteTag
+
+# Vocabulario para títulos y contenido
+WORDS = (
+    "project meeting review budget release sprint design deploy customer report idea "
+    "draft "
+    "invoice travel recipe garden workout reading journal backlog roadmap feedback bug "
+    "feature "
+    "database search cache latency index query migration schema api frontend backend "
+    "server "
+    "kitchen grocery weekend holiday family birthday doctor appointment school "
+    "homework music "
+    "movie book article research paper summary notes plan goal habit task priority "
+    "deadline "
+    "café niño über résumé año señal"
+).split()
+
+# Tags frecuentes (distribución sesgada, como en datos reales) y tags raros
+COMMON_TAGS = [
+    "work",
+    "personal",
+    "ideas",
+    "todo",
+    "meeting",
+    "shopping",
+    "reading",
+    "travel",
+]
+RARE_TAGS = [
+    f"{word}-{n}" for word in ("project", "topic", "client", "area") for n in range(50)
+]
+
+INSERT_NOTE = (
+    "INSERT INTO notes (id, title, content, tags, archived, version, created_at, "
+    "updated_at) "
+    "VALUES (?, ?, ?, ?, ?, 1, ?, ?)"
+)
+INSERT_TAG = "INSERT INTO note_tags (note_id, tag) VALUES (?, ?)"
+
+
+def build_pool(rng: random.Random, count: int, make):
+    """Pool of generated strings reused across
+    notes (building text per note is the slow part)"""
+    return [make() for _ in range(count)]
+
+
+def generate_batch(
+    rng: random.Random, size: int, id_range: range, titles, contents, start: datetime
+):
+    """Note rows and tag rows for one batch, sorted by id
+
+    Ids are random UUIDs drawn from ``id_range`` (a slice of the 128-bit space),
+    so consecutive batches insert in primary-key order while the ids stay
+    uniformly distributed overall.
+    """
+    span = int(timedelta(days=730).total_seconds())
+    note_rows, tag_rows = [], []
+    for bits in sorted(
+        rng.randrange(id_range.start, id_range.stop) for _ in range(size)
+    ):
+        note_id = str(uuid.UUID(int=bits, version=4))
+        tags = list(
+            dict.fromkeys(
+                rng.choice(COMMON_TAGS) if rng.random() < 0.8 else rng.choice(RARE_TAGS)
+                for _ in range(rng.randint(0, 3))
+            )
+        )
+        created_at = start + timedelta(seconds=rng.randrange(span))
+        updated_at = (
+            created_at + timedelta(seconds=rng.randrange(86400 * 30))
+            if rng.random() < 0.3
+            else created_at
+        )
+        note_rows.append(
+            (
+                note_id,
+                rng.choice(titles),
+                rng.choice(contents),
+                ",".join(tags),
+                rng.random() < 0.1,
+                created_at.isoformat(sep=" "),
+                updated_at.isoformat(sep=" "),
+            )
+        )
+        tag_rows.extend((note_id, tag) for tag in sorted(tags))
+    return note_rows, tag_rows
+
+
+def generate(
+    database_url: str, count: int, batch_size: int = 50000, seed: Optional[int] = None
+) -> None:
+    """Insert ``count`` notes with executemany,
+    then rebuild indexes, search index and counters
+
+    Secondary indexes and the FTS/counter triggers are dropped during the load
+    (one executemany per batch in primary-key order, without per-row index or
+    trigger work) and rebuilt once at the end.
+    """
+    engine = create_engine(database_url)
+    run_migrations(engine)
+    rng = random.Random(seed)
+    sentences = build_pool(
+        rng,
+        2000,
+        lambda: " ".join(rng.choices(WORDS, k=rng.randint(6, 16))).capitalize() + ".",
+    )
+    titles = build_pool(
+        rng,
+        20000,
+        lambda: " ".join(rng.choices(WORDS, k=rng.randint(2, 6))).capitalize(),
+    )
+    contents = build_pool(
+        rng, 50000, lambda: " ".join(rng.choices(sentences, k=rng.randint(1, 12)))
+    )
+    start = datetime.utcnow() - timedelta(days=730)
+    secondary_indexes = list(Note.__table__.indexes) + list(NoteTag.__table__.indexes)
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        connection.exec_driver_sql("PRAGMA synchronous = OFF")
+        connection.exec_driver_sql("PRAGMA cache_size = -262144")
+        search.drop_search_index(connection)
+        counters.drop_counter_triggers(connection)
+        for index in secondary_indexes:
+            index.drop(bind=connection, checkfirst=True)
+
+        batches = -(-count // batch_size)
+        width = 2**128 // batches
+        inserted = 0
+        for batch in range(batches):
+            size = min(batch_size, count - inserted)
+            note_rows, tag_rows = generate_batch(
+                rng,
+                size,
+                range(batch * width, (batch + 1) * width),
+                titles,
+                contents,
+                start,
+            )
+            connection.exec_driver_sql(INSERT_NOTE, note_rows)
+            if tag_rows:
+                connection.exec_driver_sql(INSERT_TAG, tag_rows)
+            inserted += size
+            print(
+                f"  {inserted}/{count} notes inserted "
+                f"({time.perf_counter() - started:.1f}s)"
+            )
+
+        loaded = time.perf_counter()
+        # Reconstruir índices, índice de búsqueda, triggers y totales una sola vez
+        for index in secondary_indexes:
+            index.create(bind=connection, checkfirst=True)
+        search.rebuild_search_index(connection)
+        counters.create_counter_triggers(connection)
+        counters.recount_totals(connection)
+    finished = time.perf_counter()
+    print(
+        f"Inserted {count} notes in {loaded - started:.1f}s, "
+        f"indexes and counters rebuilt in {finished - loaded:.1f}s"
+    )
+
+
+# Ejecutar generador si se ejecuta directamente:
+# python -m benchmarks.generate --count 1000000
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fill a SQLite database with synthetic notes"
+    )
+    parser.add_argument(
+        "--count", type=int, default=100000, help="Number of notes to add"
+    )
+    parser.add_argument(
+        "--database-url",
+        default=settings.database_url,
+        help="Target database (defaults to DATABASE_URL / notes.db)",
+    )
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Random seed (reusing a seed on the same database repeats ids)",
+    )
+    args = parser.parse_args()
+    generate(args.database_url, args.count, args.batch_size, args.seed)
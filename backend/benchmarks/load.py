@@ -0,0 +1,220 @@
+# Escenarios de carga HTTP contra la aplicación
+# ASGI (en proceso) o un servidor en marcha
+import argparse
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from benchmarks.common import print_table, summarize, write_results
+from benchmarks.generate import COMMON_TAGS, WORDS
+
+API = "/api/v1"
+
+# Cada escenario es una petición elegida al azar por iteración
+Request = Callable[
+    [httpx.AsyncClient, random.Random, List[str]], Awaitable[httpx.Response]
+]
+
+
+async def list_notes(client, rng, ids):
+    return await client.get(
+        f"{API}/notes/", params={"per_page": 20, "page": rng.randint(1, 50)}
+    )
+
+
+async def search_notes(client, rng, ids):
+    return await client.get(
+        f"{API}/notes/", params={"search": rng.choice(WORDS), "per_page": 20}
+    )
+
+
+async def tagged_notes(client, rng, ids):
+    return await client.get(
+        f"{API}/notes/", params={"tags": rng.choice(COMMON_TAGS), "per_page": 20}
+    )
+
+
+async def get_note(client, rng, ids):
+    return await client.get(f"{API}/notes/{rng.choice(ids)}")
+
+
+async def update_note(client, rng, ids):
+    return await client.put(
+        f"{API}/notes/{rng.choice(ids)}",
+        json={"title": " ".join(rng.choices(WORDS, k=3))},
+    )
+
+
+async def create_note(client, rng, ids):
+    return await client.post(
+        f"{API}/notes/",
+        json={
+            "title": "Load test",
+            "content": " ".join(rng.choices(WORDS, k=40)),
+            "tags": rng.sample(COMMON_TAGS, 2),
+        },
+    )
+
+
+async def mixed(client, rng, ids):
+    # 80 % lecturas, 20 % escrituras
+    request = rng.choices(
+        [list_notes, search_notes, get_note, update_note, create_note],
+        weights=[30, 20, 30, 10, 10],
+    )[0]
+    return await request(client, rng, ids)
+
+
+SCENARIOS: Dict[str, Request] = {
+    "health": lambda client, rng, ids: client.get("/health"),
+    "list": list_notes,
+    "search": search_notes,
+    "tags": tagged_notes,
+    "get": get_note,
+    "update": update_note,
+    "mixed": mixed,
+}
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    request: Request,
+    ids: List[str],
+    duration: float,
+    concurrency: int,
+    seed: int,
+) -> Dict[str, float]:
+    """Run ``request`` with ``concurrency`` workers for ``duration`` seconds
+
+    Requests shed by admission control (429/503 with ``Retry-After``) are
+    counted as ``rejected``, kept out of the latency percentiles, and the
+    worker waits ``Retry-After`` seconds like a well-behaved client.
+    """
+    latencies: List[float] = []
+    errors = rejected = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_rng: random.Random):
+        nonlocal errors, rejected
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await request(client, worker_rng, ids)
+            if response.status_code in (429, 503) and "retry-after" in response.headers:
+                rejected += 1
+                await asyncio.sleep(
+                    min(
+                        float(response.headers["retry-after"]),
+                        max(deadline - time.perf_counter(), 0),
+                    )
+                )
+                continue
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(seed + n)) for n in range(concurrency)))
+    result = summarize(latencies, time.perf_counter() - started)
+    result["errors"] = errors
+    result["rejected"] = rejected
+    return result
+
+
+async def fetch_ids(client: httpx.AsyncClient, count: int = 200) -> List[str]:
+    """Ids of existing notes to read and update"""
+    response = await client.get(f"{API}/notes/", params={"per_page": 100, "cursor": ""})
+    ids = [note["id"] for note in response.json()]
+    cursor = response.headers.get("X-Next-Cursor")
+    while cursor and len(ids) < count:
+        response = await client.get(
+            f"{API}/notes/", params={"per_page": 100, "cursor": cursor}
+        )
+        ids += [note["id"] for note in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+    if not ids:
+        raise SystemExit(
+            "The database has no notes: run python -m benchmarks.generate first"
+        )
+    return ids
+
+
+async def run(
+    scenarios: List[str],
+    duration: float,
+    concurrency: int,
+    base_url: str = None,
+    output: str = None,
+    seed: int = 1,
+) -> Dict[str, Dict[str, float]]:
+    """Run the selected scenarios in order and print/save their latency percentiles"""
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, timeout=30)
+    else:
+        # Importación diferida: solo el modo en proceso carga la aplicación
+        import os
+
+        from app.core.logging import setup_logging
+        from app.startup import prepare_database
+        from main import app
+
+        setup_logging(stream=open(os.devnull, "w"))
+        # ASGITransport no ejecuta el lifespan: preparar la base de datos aquí
+        prepare_database()
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://localhost",
+            timeout=30,
+        )
+    results = {}
+    async with client:
+        ids = await fetch_ids(client)
+        for name in scenarios:
+            results[name] = await run_scenario(
+                client, SCENARIOS[name], ids, duration, concurrency, seed
+            )
+    print_table(results)
+    if output:
+        parameters = {
+            "duration": duration,
+            "concurrency": concurrency,
+            "base_url": base_url or "asgi",
+        }
+        write_results(output, "load", parameters, results)
+    return results
+
+
+# Ejecutar escenarios si se ejecuta directamente: DATABASE_URL=sqlite:///./bench.db
+# python -m benchmarks.load --scenarios list get mixed --output load.json
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="HTTP load scenarios with p50/p95/p99 latency and throughput"
+    )
+    parser.add_argument(
+        "--scenarios",
+        nargs="*",
+        default=["health", "list", "get", "mixed"],
+        choices=list(SCENARIOS),
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="Seconds per scenario"
+    )
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--base-url", help="Target a running server instead of the in-process app"
+    )
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(
+        run(
+            args.scenarios,
+            args.duration,
+            args.concurrency,
+            args.base_url,
+            args.output,
+            args.seed,
+        )
+    )
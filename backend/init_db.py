@@ -1,6 +1,7 @@
 # Importaciones para inicialización de base de datos
 from app.database import Base, engine
-from app.models import Note
+from app.models import Note  # noqa: F401
+
 
 def init_database():
     """Initialize the database with all tables"""
@@ -10,6 +11,7 @@ def init_database():
     Base.metadata.create_all(bind=engine)
     print("Database initialized successfully!")
 
+
 # Ejecutar inicialización si se ejecuta directamente
 if __name__ == "__main__":
-    init_database()
\ No newline at end of file
+    init_database()
@@ -0,0 +1,18 @@
+# Reconstruir el índice de búsqueda de texto completo de una base de datos existente
+from app.database import Base, engine
+from app.search import rebuild_search_index
+
+
+def rebuild():
+    """Rebuild the full-text search index from the notes table"""
+    # Asegurar que la tabla notes existe antes de indexarla
+    Base.metadata.create_all(bind=engine)
+    # Crear tabla virtual y triggers si faltan y reindexar todas las notas
+    with engine.begin() as connection:
+        rebuild_search_index(connection)
+    print("Search index rebuilt successfully!")
+
+
+# Ejecutar reconstrucción si se ejecuta directamente
+if __name__ == "__main__":
+    rebuild()
@@ -1,17 +1,24 @@
+import os
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from app.database import Base, get_db
+
+from app.database import Base, get_db, get_read_db
 from main import app
 
 # Test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_complete.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+Base.metadata.drop_all(bind=engine)
 Base.metadata.create_all(bind=engine)
 
+
 def override_get_db():
     try:
         db = TestingSessionLocal()
@@ -19,11 +26,14 @@ def override_get_db():
     finally:
         db.close()
 
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 client = TestClient(app)
 
+
 class TestNotesAPI:
-    
+
     def test_create_note_success(self):
         response = client.post(
             "/api/v1/notes/",
@@ -31,15 +41,15 @@ class TestNotesAPI:
                 "title": "Test Note",
                 "content": "Test content",
                 "tags": ["test", "api"],
-                "archived": False
-            }
+                "archived": False,
+            },
         )
         assert response.status_code == 201
         data = response.json()
         assert data["title"] == "Test Note"
         assert data["content"] == "Test content"
         assert data["tags"] == ["test", "api"]
-        assert data["archived"] == False
+        assert data["archived"] is False
         assert "id" in data
         assert "created_at" in data
         assert "updated_at" in data
@@ -47,22 +57,20 @@ class TestNotesAPI:
     def test_create_note_validation_errors(self):
         # Title too long
         response = client.post(
-            "/api/v1/notes/",
-            json={"title": "x" * 121, "content": "Test content"}
+            "/api/v1/notes/", json={"title": "x" * 121, "content": "Test content"}
         )
         assert response.status_code == 422
-        
+
         # Content too long
         response = client.post(
-            "/api/v1/notes/",
-            json={"title": "Test", "content": "x" * 10001}
+            "/api/v1/notes/", json={"title": "Test", "content": "x" * 10001}
         )
         assert response.status_code == 422
-        
+
         # Too many tags
         response = client.post(
             "/api/v1/notes/",
-            json={"title": "Test", "content": "Test", "tags": ["tag"] * 11}
+            json={"title": "Test", "content": "Test", "tags": ["tag"] * 11},
         )
         assert response.status_code == 422
 
@@ -70,23 +78,43 @@ class TestNotesAPI:
         # Create multiple notes
         for i in range(15):
             client.post(
-                "/api/v1/notes/",
-                json={"title": f"Note {i}", "content": f"Content {i}"}
+                "/api/v1/notes/", json={"title": f"Note {i}", "content": f"Content {i}"}
             )
-        
+
         # Test pagination
         response = client.get("/api/v1/notes/?page=1&per_page=10")
         assert response.status_code == 200
         data = response.json()
         assert len(data) == 10
 
+    def test_cursor_pagination(self):
+        for i in range(5):
+            client.post(
+                "/api/v1/notes/", json={"title": f"Cursor {i}", "content": "Keyset"}
+            )
+        total = client.get("/api/v1/notes/?per_page=100").json()
+
+        # Walk every page following X-Next-Cursor
+        seen, cursor = [], ""
+        while cursor is not None:
+            response = client.get(
+                "/api/v1/notes/", params={"per_page": 3, "cursor": cursor}
+            )
+            assert response.status_code == 200
+            seen.extend(note["id"] for note in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+        assert seen == [note["id"] for note in total]
+
+        response = client.get("/api/v1/notes/?cursor=not-a-cursor")
+        assert response.status_code == 422
+
     def test_search_functionality(self):
         # Create searchable note
         client.post(
             "/api/v1/notes/",
-            json={"title": "Searchable Title", "content": "Unique content here"}
+            json={"title": "Searchable Title", "content": "Unique content here"},
         )
-        
+
         # Search by title
         response = client.get("/api/v1/notes/?search=Searchable")
         assert response.status_code == 200
@@ -94,51 +122,1677 @@ class TestNotesAPI:
         assert len(data) > 0
         assert any("Searchable" in note["title"] for note in data)
 
+    def test_search_prefix_ranking_and_highlight(self):
+        client.post(
+            "/api/v1/notes/",
+            json={"title": "Misc", "content": "Talk about quarterly planning"},
+        )
+        client.post(
+            "/api/v1/notes/", json={"title": "Quarterly planning", "content": "Agenda"}
+        )
+
+        # Prefix match, title matches ranked first
+        response = client.get("/api/v1/notes/?search=quarter&highlight=true")
+        assert response.status_code == 200
+        data = response.json()
+        assert [note["title"] for note in data[:2]] == ["Quarterly planning", "Misc"]
+        assert "<mark>Quarterly</mark>" in data[0]["snippet"]
+
+        # Snippet omitted unless requested
+        response = client.get("/api/v1/notes/?search=quarter")
+        assert "snippet" not in response.json()[0]
+
+    def test_search_index_follows_updates_and_deletes(self):
+        note_id = client.post(
+            "/api/v1/notes/", json={"title": "Zeppelin", "content": "Airship"}
+        ).json()["id"]
+        client.put(f"/api/v1/notes/{note_id}", json={"title": "Dirigible"})
+
+        assert client.get("/api/v1/notes/?search=zeppelin").json() == []
+        assert [
+            n["id"] for n in client.get("/api/v1/notes/?search=dirigible").json()
+        ] == [note_id]
+
+        client.delete(f"/api/v1/notes/{note_id}")
+        assert client.get("/api/v1/notes/?search=dirigible").json() == []
+
+    def test_fuzzy_search_tolerates_typos(self):
+        from app.search_terms import term_index
+
+        note_id = client.post(
+            "/api/v1/notes/",
+            json={"title": "Kubernetes rollout", "content": "Programming checklist"},
+        ).json()["id"]
+        with engine.connect() as connection:
+            term_index.load(connection)
+
+        # Without fuzzy a misspelled word matches nothing
+        assert client.get("/api/v1/notes/?search=kubernets").json() == []
+        # Typos in any word, prefixes still work, unrelated words stay unmatched
+        for search in [
+            "kubernets",
+            "Kubernets programing",
+            "kube programing",
+            "Programing checkl",
+        ]:
+            response = client.get(
+                "/api/v1/notes/", params={"search": search, "fuzzy": "true"}
+            )
+            assert [n["id"] for n in response.json()] == [note_id], search
+        assert (
+            client.get("/api/v1/notes/?search=kubernets+zzqxw&fuzzy=true").json() == []
+        )
+
+        # Notes written after the vocabulary was loaded are picked up
+        other_id = client.post(
+            "/api/v1/notes/", json={"title": "Xylophone", "content": "Music"}
+        ).json()["id"]
+        assert [
+            n["id"]
+            for n in client.get("/api/v1/notes/?search=xylofone&fuzzy=true").json()
+        ] == [other_id]
+
+    def test_fuzzy_listing_etag_changes_when_vocabulary_loads(self, monkeypatch):
+        from app.api import notes as notes_api
+        from app.search_terms import TermIndex
+        from app.services import note_service
+
+        note_id = client.post(
+            "/api/v1/notes/", json={"title": "Zeppelin hangar", "content": "x"}
+        ).json()["id"]
+        # Fresh vocabulary whose background load is run by hand below
+        index = TermIndex()
+        monkeypatch.setattr(index, "load_in_background", lambda engine: None)
+        monkeypatch.setattr(note_service, "term_index", index)
+        monkeypatch.setattr(notes_api, "term_index", index)
+
+        url = "/api/v1/notes/?search=zepelin&fuzzy=true"
+        response = client.get(url)
+        assert response.json() == []
+        etag = response.headers["ETag"]
+        assert etag != client.get("/api/v1/notes/?search=zepelin").headers["ETag"]
+
+        with engine.connect() as connection:
+            index.load(connection)
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert [n["id"] for n in response.json()] == [note_id]
+        assert (
+            client.get(
+                url, headers={"If-None-Match": response.headers["ETag"]}
+            ).status_code
+            == 304
+        )
+
+    def test_term_index_lookups_during_concurrent_adds(self):
+        import sys
+        import threading
+
+        from app.search_terms import TermIndex, build_fuzzy_match_query
+
+        index = TermIndex()
+        index.add(["programming"])
+        index.ready = True
+        errors, done = [], threading.Event()
+
+        def writer():
+            try:
+                # Every term shares trigrams with the
+                # lookups, so their postings keep growing
+                for batch in range(200):
+                    index.add([f"program{batch}x{i}" for i in range(50)])
+                    index.add([f"programs{batch}"])
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                done.set()
+
+        # Switch threads as often as possible so lookups interleave with the adds
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            thread = threading.Thread(target=writer)
+            thread.start()
+            lookups = 0
+            while not done.is_set() or lookups == 0:
+                try:
+                    index.similar("programing", 0.3, 5)
+                    build_fuzzy_match_query("programing", index, 0.3, 5)
+                except Exception as exc:
+                    errors.append(exc)
+                    break
+                lookups += 1
+            thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        assert errors == []
+        assert len(index) == 1 + 200 * 51
+
     def test_archive_filter(self):
         # Create archived and non-archived notes
-        client.post("/api/v1/notes/", json={"title": "Active", "content": "Active note", "archived": False})
-        client.post("/api/v1/notes/", json={"title": "Archived", "content": "Archived note", "archived": True})
-        
+        client.post(
+            "/api/v1/notes/",
+            json={"title": "Active", "content": "Active note", "archived": False},
+        )
+        client.post(
+            "/api/v1/notes/",
+            json={"title": "Archived", "content": "Archived note", "archived": True},
+        )
+
         # Filter by archived status
         response = client.get("/api/v1/notes/?archived=false")
         assert response.status_code == 200
         data = response.json()
         assert all(not note["archived"] for note in data)
 
+    def test_tag_filters_and_counts(self):
+        client.post(
+            "/api/v1/notes/",
+            json={"title": "T1", "content": "c", "tags": ["tagx", "tagy"]},
+        )
+        client.post(
+            "/api/v1/notes/", json={"title": "T2", "content": "c", "tags": ["tagx"]}
+        )
+        note_id = client.post(
+            "/api/v1/notes/", json={"title": "T3", "content": "c", "tags": ["tagz"]}
+        ).json()["id"]
+
+        def titles(params):
+            notes = client.get("/api/v1/notes/", params=params).json()
+            return sorted(n["title"] for n in notes)
+
+        assert titles({"tags": "tagx,tagz"}) == ["T1", "T2", "T3"]
+        assert titles({"tags": ["tagx", "tagy"], "tags_mode": "all"}) == ["T1"]
+
+        # Updating tags moves the note between tag filters
+        client.put(f"/api/v1/notes/{note_id}", json={"tags": ["tagy"]})
+        assert titles({"tags": "tagz"}) == []
+
+        counts = {
+            t["tag"]: t["count"] for t in client.get("/api/v1/tags/?limit=1000").json()
+        }
+        assert counts["tagx"] == 2 and counts["tagy"] == 2 and "tagz" not in counts
+
+    def test_migration_backfills_note_tags(self, tmp_path):
+        from app.migrations import SCHEMA_VERSION, run_migrations
+
+        legacy = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+        with legacy.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE notes (id VARCHAR PRIMARY KEY, title VARCHAR(120) NOT "
+                "NULL, content TEXT NOT NULL, "
+                "tags VARCHAR, archived BOOLEAN NOT NULL, created_at DATETIME, "
+                "updated_at DATETIME)"
+            )
+            conn.exec_driver_sql(
+                "INSERT INTO notes VALUES ('n1', 'Legacy', 'Old note', 'a, b,a', 0, "
+                "'2024-01-01 00:00:00', '2024-01-01 00:00:00')"
+            )
+
+        assert run_migrations(legacy) == SCHEMA_VERSION
+        with legacy.connect() as conn:
+            tags = (
+                conn.exec_driver_sql(
+                    "SELECT tag FROM note_tags WHERE note_id = 'n1' ORDER BY tag"
+                )
+                .scalars()
+                .all()
+            )
+            matches = conn.exec_driver_sql(
+                "SELECT rowid FROM notes_fts WHERE notes_fts MATCH 'legacy'"
+            ).all()
+            totals = dict(
+                conn.exec_driver_sql(
+                    "SELECT key, value FROM note_counters WHERE key != 'changes'"
+                ).all()
+            )
+        assert tags == ["a", "b"]
+        assert len(matches) == 1
+        assert totals == {"archived:0": 1, "tag:a": 1, "tag:b": 1}
+
+    def test_startup_runs_in_lifespan_within_budget(self, tmp_path):
+        import json
+        import os
+        import subprocess
+        import sys
+
+        # Proceso nuevo: la configuración se lee del entorno al importar
+        script = (
+            "import json, os, time\n"
+            "started = time.perf_counter()\n"
+            "import main\n"
+            "import_seconds = time.perf_counter() - started\n"
+            "created_on_import = os.path.exists('startup.db')\n"
+            "from fastapi.testclient import TestClient\n"
+            "started = time.perf_counter()\n"
+            "with TestClient(main.app):\n"
+            "    startup_seconds = time.perf_counter() - started\n"
+            "with TestClient(main.app) as second:\n"
+            "    notes = len(second.get('/api/v1/notes/').json())\n"
+            "print(json.dumps({'import': import_seconds,\n"
+            "                  'created_on_import': created_on_import,\n"
+            "                  'startup': startup_seconds, 'notes': notes}))\n"
+        )
+        env = {
+            **os.environ,
+            "DATABASE_URL": "sqlite:///./startup.db",
+            "SEED_SAMPLE_DATA": "true",
+            "LOG_QUEUE": "false",
+            "METRICS_ENABLED": "false",
+        }
+        backend = os.path.dirname(os.path.abspath(__file__))
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=tmp_path,
+            capture_output=True,
+            text=True,
+            env={**env, "PYTHONPATH": backend},
+        )
+        assert result.returncode == 0, result.stderr
+        report = json.loads(result.stdout.splitlines()[-1])
+
+        # Importar no toca la base de datos; el arranque migra y siembra una sola vez
+        assert report["created_on_import"] is False
+        assert report["notes"] == 3
+        assert report["import"] < 3.0 and report["startup"] < 2.0
+
+    def test_total_count_header(self, monkeypatch):
+        from app.core.config import settings
+
+        def total(**params):
+            response = client.get("/api/v1/notes/", params=params)
+            return (
+                int(response.headers["X-Total-Count"]),
+                response.headers["X-Total-Count-Exact"],
+            )
+
+        before_all, before_archived = total()[0], total(archived=True)[0]
+        ids = [
+            client.post(
+                "/api/v1/notes/",
+                json={
+                    "title": f"Totals {i}",
+                    "content": "Count me",
+                    "tags": ["totals"],
+                },
+            ).json()["id"]
+            for i in range(3)
+        ]
+        client.put(f"/api/v1/notes/{ids[0]}", json={"archived": True})
+        client.delete(f"/api/v1/notes/{ids[1]}")
+
+        assert total() == (before_all + 2, "true")
+        assert total(archived=True) == (before_archived + 1, "true")
+        assert total(tags="totals") == (2, "true")
+        assert total(tags="totals", archived=False) == (1, "true")
+        assert total(search="totals") == (2, "true")
+        # Con más resultados que count_cap el total es un mínimo
+        monkeypatch.setattr(settings, "count_cap", 1)
+        assert total(search="totals") == (1, "false")
+
+    def test_synthetic_generator_keeps_indexes_consistent(self, tmp_path):
+        from benchmarks.generate import generate
+
+        url = f"sqlite:///{tmp_path}/bench.db"
+        generate(url, 500, batch_size=200, seed=7)
+        with create_engine(url).begin() as conn:
+            assert conn.exec_driver_sql("SELECT count(*) FROM notes").scalar() == 500
+            counters = dict(
+                conn.exec_driver_sql("SELECT key, value FROM note_counters").all()
+            )
+            tag_totals = dict(
+                conn.exec_driver_sql(
+                    "SELECT 'tag:' || tag, count(*) FROM note_tags GROUP BY tag"
+                ).all()
+            )
+            assert counters["archived:0"] + counters.get("archived:1", 0) == 500
+            assert {
+                k: v for k, v in counters.items() if k.startswith("tag:")
+            } == tag_totals
+            fts_rows = conn.exec_driver_sql(
+                "SELECT count(*) FROM notes_fts WHERE notes_fts MATCH 'project'"
+            ).scalar()
+            like_rows = conn.exec_driver_sql(
+                "SELECT count(*) FROM notes WHERE title LIKE '%project%' OR content "
+                "LIKE '%project%'"
+            ).scalar()
+            assert fts_rows == like_rows > 0
+            # Los triggers vuelven a estar activos tras la carga
+            conn.exec_driver_sql("DELETE FROM notes WHERE rowid = 1")
+            assert (
+                conn.exec_driver_sql(
+                    "SELECT value FROM note_counters WHERE key = 'changes'"
+                ).scalar()
+                == 1
+            )
+
+    def test_bulk_create_update_delete(self):
+        response = client.post(
+            "/api/v1/notes/bulk",
+            json={
+                "items": [
+                    {"title": f"Bulk {i}", "content": "Batch", "tags": ["bulk"]}
+                    for i in range(3)
+                ]
+            },
+        )
+        assert response.status_code == 201
+        body = response.json()
+        assert (
+            body["succeeded"] == 3
+            and [r["status"] for r in body["results"]] == [201] * 3
+        )
+        ids = [r["id"] for r in body["results"]]
+        assert client.get(f"/api/v1/notes/{ids[0]}").json()["tags"] == ["bulk"]
+
+        response = client.patch(
+            "/api/v1/notes/bulk",
+            json={
+                "items": [
+                    {"id": ids[0], "title": "Bulk renamed"},
+                    {"id": ids[1], "archived": True, "tags": ["bulk2"]},
+                    {"id": "missing-id", "title": "Nope"},
+                ]
+            },
+        )
+        assert response.status_code == 200
+        assert [r["status"] for r in response.json()["results"]] == [200, 200, 404]
+        assert client.get(f"/api/v1/notes/{ids[0]}").json()["title"] == "Bulk renamed"
+        second = client.get(f"/api/v1/notes/{ids[1]}").json()
+        assert second["archived"] is True and second["tags"] == ["bulk2"]
+
+        response = client.request(
+            "DELETE", "/api/v1/notes/bulk", json={"ids": [ids[0], "missing-id"]}
+        )
+        assert response.status_code == 200
+        assert response.json()["succeeded"] == 1
+        assert [r["status"] for r in response.json()["results"]] == [204, 404]
+        assert client.get(f"/api/v1/notes/{ids[0]}").status_code == 404
+
+        # Duplicate ids are rejected before writing
+        response = client.request(
+            "DELETE", "/api/v1/notes/bulk", json={"ids": [ids[1], ids[1]]}
+        )
+        assert response.status_code == 422
+
+    def test_bulk_update_increments_version_in_the_update(self, monkeypatch):
+        from sqlalchemy import update
+
+        from app.models import Note
+        from app.schemas import NoteBulkUpdateItem, NoteCreate
+        from app.services.note_service import NoteService
+
+        db = TestingSessionLocal()
+        try:
+            service = NoteService(db)
+            note_id = service.create_note(NoteCreate(title="Versioned", content="x")).id
+            existing_versions = NoteService._existing_versions
+
+            def concurrent_write_after_read(self, ids):
+                versions = existing_versions(self, ids)
+                # Another writer bumps the version between
+                # the existence check and the bulk UPDATE
+                self.db.execute(
+                    update(Note)
+                    .where(Note.id == note_id)
+                    .values(version=Note.version + 1)
+                )
+                monkeypatch.setattr(
+                    NoteService, "_existing_versions", existing_versions
+                )
+                return versions
+
+            monkeypatch.setattr(
+                NoteService, "_existing_versions", concurrent_write_after_read
+            )
+            service.update_notes([NoteBulkUpdateItem(id=note_id, title="Versioned v2")])
+            # 1 (create) + 1 (concurrent write) + 1 (bulk update): no increment is lost
+            assert service.get_note_entry(note_id).version == 3
+        finally:
+            db.close()
+
+    def test_async_database_routes(self, tmp_path):
+        import asyncio
+        import inspect
+
+        import httpx
+        from fastapi import FastAPI
+        from sqlalchemy import event, text
+        from sqlalchemy.exc import OperationalError
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        from app.api.v1.api import build_api_router, get_notes_router
+        from app.database import (
+            create_async_database_engine,
+            get_async_db,
+            get_async_read_db,
+        )
+
+        Base.metadata.create_all(bind=create_engine(f"sqlite:///{tmp_path}/async.db"))
+        # Mismo perfil que los motores de la aplicación:
+        # BEGIN IMMEDIATE al escribir, query_only al leer
+        async_engine = create_async_database_engine(
+            f"sqlite+aiosqlite:///{tmp_path}/async.db"
+        )
+        async_read_engine = create_async_database_engine(
+            f"sqlite+aiosqlite:///{tmp_path}/async.db", read_only=True
+        )
+        statements = []
+        event.listen(
+            async_engine.sync_engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        factory = async_sessionmaker(async_engine, expire_on_commit=False)
+        read_factory = async_sessionmaker(async_read_engine, expire_on_commit=False)
+
+        async def override_get_async_db():
+            async with factory() as db:
+                yield db
+
+        async def override_get_async_read_db():
+            async with read_factory() as db:
+                yield db
+
+        async_app = FastAPI()
+        async_app.include_router(
+            build_api_router(async_database=True), prefix="/api/v1"
+        )
+        async_app.dependency_overrides[get_async_db] = override_get_async_db
+        async_app.dependency_overrides[get_async_read_db] = override_get_async_read_db
+        endpoints = {
+            (r.path, tuple(r.methods)): r.endpoint
+            for r in get_notes_router(async_database=True).routes
+        }
+        assert inspect.iscoroutinefunction(endpoints[("/{note_id}", ("GET",))])
+
+        with TestClient(async_app) as async_client:
+            note_id = async_client.post(
+                "/api/v1/notes/",
+                json={"title": "Async", "content": "Event loop", "tags": ["aio"]},
+            ).json()["id"]
+            assert async_client.get(f"/api/v1/notes/{note_id}").json()["tags"] == [
+                "aio"
+            ]
+            assert [
+                n["id"] for n in async_client.get("/api/v1/notes/?search=event").json()
+            ] == [note_id]
+            assert (
+                async_client.put(
+                    f"/api/v1/notes/{note_id}", json={"title": "Async 2"}
+                ).json()["title"]
+                == "Async 2"
+            )
+            assert async_client.delete(f"/api/v1/notes/{note_id}").status_code == 204
+            assert async_client.get(f"/api/v1/notes/{note_id}").status_code == 404
+
+        async def concurrent_writes():
+            transport = httpx.ASGITransport(app=async_app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as http:
+                note_id = (
+                    await http.post(
+                        "/api/v1/notes/", json={"title": "Contended", "content": "x"}
+                    )
+                ).json()["id"]
+                # Lectura y escritura en la misma transacción
+                # desde muchas conexiones a la vez
+                responses = await asyncio.gather(
+                    *(
+                        http.put(f"/api/v1/notes/{note_id}", json={"content": f"v{n}"})
+                        for n in range(20)
+                    ),
+                    *(
+                        http.post(
+                            "/api/v1/notes/",
+                            json={"title": f"Parallel {n}", "content": "x"},
+                        )
+                        for n in range(10)
+                    ),
+                )
+                assert [r.status_code for r in responses] == [200] * 20 + [201] * 10
+                assert (await http.get(f"/api/v1/notes/{note_id}")).headers[
+                    "ETag"
+                ] == '"v21"'
+            assert statements.count("BEGIN IMMEDIATE") >= 31
+            async with read_factory() as db:
+                assert (await db.execute(text("PRAGMA query_only"))).scalar() == 1
+                with pytest.raises(OperationalError):
+                    await db.execute(text("DELETE FROM notes"))
+            await async_engine.dispose()
+            await async_read_engine.dispose()
+
+        asyncio.run(concurrent_writes())
+
+    def test_sqlite_tuning_profile(self):
+        from app.database import engine as write_engine
+        from app.database import read_engine
+
+        with write_engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar().lower() == "wal"
+            assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        with read_engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA query_only").scalar() == 1
+
+    def test_busy_writes_are_retried(self):
+        import sqlite3
+
+        from sqlalchemy.exc import OperationalError
+
+        from app.database import retry_on_busy
+
+        class FakeSession:
+            rollbacks = 0
+
+            def rollback(self):
+                self.rollbacks += 1
+
+        class Writer:
+            db = FakeSession()
+            calls = 0
+
+            @retry_on_busy
+            def write(self):
+                self.calls += 1
+                if self.calls < 3:
+                    raise OperationalError(
+                        "INSERT", {}, sqlite3.OperationalError("database is locked")
+                    )
+                return "ok"
+
+        writer = Writer()
+        assert writer.write() == "ok"
+        assert writer.calls == 3 and writer.db.rollbacks == 2
+
+    def test_note_cache_hits_and_invalidation(self, monkeypatch):
+        from app.core.cache import LRUCache, NullCache, create_cache
+        from app.core.config import settings
+        from app.services import note_service
+
+        # Off by default (per-process copies go stale with several workers)
+        monkeypatch.setattr(settings, "note_cache_enabled", False)
+        assert isinstance(create_cache(), NullCache)
+        monkeypatch.setattr(settings, "note_cache_enabled", True)
+        note_cache = create_cache()
+        assert isinstance(note_cache, LRUCache)
+        monkeypatch.setattr(note_service, "note_cache", note_cache)
+        note_id = client.post(
+            "/api/v1/notes/", json={"title": "Cached", "content": "Hot"}
+        ).json()["id"]
+
+        before = note_cache.stats()
+        client.get(f"/api/v1/notes/{note_id}")
+        client.get(f"/api/v1/notes/{note_id}")
+        after = note_cache.stats()
+        assert after["misses"] == before["misses"] + 1
+        assert after["hits"] == before["hits"] + 1
+
+        # Updates and deletes invalidate the cached copy
+        client.put(f"/api/v1/notes/{note_id}", json={"title": "Cached v2"})
+        assert client.get(f"/api/v1/notes/{note_id}").json()["title"] == "Cached v2"
+        client.delete(f"/api/v1/notes/{note_id}")
+        assert client.get(f"/api/v1/notes/{note_id}").status_code == 404
+
+        # Bounded size with LRU eviction; stale fills are discarded
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert (
+            cache.get("b") is None
+            and cache.get("a") == 1
+            and cache.stats()["evictions"] == 1
+        )
+        generation = cache.generation
+        cache.delete("a")
+        cache.set("a", "stale", generation)
+        assert cache.get("a") is None
+
+        # Backends must implement the whole interface
+        from app.core.cache import CacheBackend
+
+        class Partial(CacheBackend):
+            def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            Partial()
+
+    def test_conditional_get_with_etags(self):
+        note_id = client.post(
+            "/api/v1/notes/", json={"title": "ETag", "content": "x" * 2000}
+        ).json()["id"]
+
+        response = client.get(
+            f"/api/v1/notes/{note_id}", headers={"Accept-Encoding": "gzip"}
+        )
+        etag = response.headers["ETag"]
+        assert response.headers["Content-Encoding"] == "gzip"
+        response = client.get(
+            f"/api/v1/notes/{note_id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304 and response.content == b""
+        # Weak comparison against every tag of the list:
+        # the W/ prefix added by compression still matches
+        assert etag.startswith("W/")
+        response = client.get(
+            f"/api/v1/notes/{note_id}", headers={"If-None-Match": f'"x", {etag}'}
+        )
+        assert response.status_code == 304
+
+        # A write changes both the note and the collection ETags
+        list_etag = client.get("/api/v1/notes/").headers["ETag"]
+        assert (
+            client.get(
+                "/api/v1/notes/", headers={"If-None-Match": list_etag}
+            ).status_code
+            == 304
+        )
+        client.put(f"/api/v1/notes/{note_id}", json={"title": "ETag v2"})
+        response = client.get(
+            f"/api/v1/notes/{note_id}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200 and response.headers["ETag"] != etag
+        assert (
+            client.get(
+                "/api/v1/notes/", headers={"If-None-Match": list_etag}
+            ).status_code
+            == 200
+        )
+
+    def test_response_compression(self):
+        import asyncio
+        import zlib
+
+        from app.middleware.compression import CompressionMiddleware, negotiate
+
+        assert negotiate("gzip;q=0.5, br", ["zstd", "br", "gzip"]) == "br"
+        assert negotiate("*", ["zstd", "gzip"]) == "zstd"
+        assert negotiate("gzip;q=0, *;q=0.1", ["gzip"]) is None
+        assert negotiate("identity", ["gzip"]) is None
+
+        note_id = client.post(
+            "/api/v1/notes/", json={"title": "Compressed", "content": "y" * 2000}
+        ).json()["id"]
+        response = client.get(
+            f"/api/v1/notes/{note_id}", headers={"Accept-Encoding": "br;q=0.9, gzip"}
+        )
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert response.headers["ETag"].startswith('W/"v')
+        assert response.json()["content"] == "y" * 2000
+
+        # Small bodies and clients without compression are left alone
+        assert (
+            "Content-Encoding"
+            not in client.get("/health", headers={"Accept-Encoding": "gzip"}).headers
+        )
+        response = client.get(
+            f"/api/v1/notes/{note_id}", headers={"Accept-Encoding": "identity"}
+        )
+        assert "Content-Encoding" not in response.headers and response.headers[
+            "ETag"
+        ].startswith('"v')
+
+        # Streams are compressed incrementally: every chunk decodes on its own
+        chunks = [b"first chunk\n", b"second chunk\n", b""]
+
+        async def streaming_app(scope, receive, send):
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", b"application/x-ndjson")],
+                }
+            )
+            for index, chunk in enumerate(chunks):
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": index < len(chunks) - 1,
+                    }
+                )
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "headers": [(b"accept-encoding", b"gzip")],
+        }
+        asyncio.run(CompressionMiddleware(streaming_app)(scope, None, send))
+        assert (b"content-encoding", b"gzip") in sent[0]["headers"]
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        assert [decoder.decompress(message["body"]) for message in sent[1:]] == chunks
+        assert decoder.eof
+
+    def test_zstd_and_brotli_compression(self):
+        import asyncio
+
+        import brotli
+        import zstandard
+
+        decoders = {
+            "zstd": lambda: zstandard.ZstdDecompressor().decompressobj().decompress,
+            "br": lambda: brotli.Decompressor().process,
+        }
+        body = b'{"content": "' + b"z" * 4000 + b'"}'
+        chunks = [b"first chunk\n", b"second chunk\n", b""]
+
+        def run(chunks, encoding):
+            async def app(scope, receive, send):
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 200,
+                        "headers": [(b"content-type", b"application/json")],
+                    }
+                )
+                for index, chunk in enumerate(chunks):
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": index < len(chunks) - 1,
+                        }
+                    )
+
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "headers": [(b"accept-encoding", f"gzip;q=0.5, {encoding}".encode())],
+            }
+            asyncio.run(CompressionMiddleware(app)(scope, None, send))
+            assert (b"content-encoding", encoding.encode()) in sent[0]["headers"]
+            return sent
+
+        from app.middleware.compression import CompressionMiddleware
+
+        for encoding, decoder in decoders.items():
+            # Single body: complete frame with its compressed Content-Length
+            sent = run([body], encoding)
+            assert (b"content-length", str(len(sent[1]["body"])).encode()) in sent[0][
+                "headers"
+            ]
+            assert decoder()(sent[1]["body"]) == body
+            # Streamed: each flushed chunk decodes as soon as it arrives
+            decode = decoder()
+            assert [
+                decode(message["body"]) for message in run(chunks, encoding)[1:]
+            ] == chunks
+
+        # Through the app, preferred over gzip when the client accepts them
+        note_id = client.post(
+            "/api/v1/notes/", json={"title": "Zstd", "content": "w" * 2000}
+        ).json()["id"]
+        for encoding in decoders:
+            response = client.get(
+                f"/api/v1/notes/{note_id}",
+                headers={"Accept-Encoding": f"gzip, {encoding}"},
+            )
+            assert response.headers["Content-Encoding"] == encoding
+            assert response.json()["content"] == "w" * 2000
+
+    def test_streaming_export(self):
+        import csv
+        import io
+        import json
+
+        client.post(
+            "/api/v1/notes/bulk",
+            json={
+                "items": [
+                    {
+                        "title": f"Export {i}",
+                        "content": 'Line, with "quotes"',
+                        "tags": ["export"],
+                        "archived": i == 0,
+                    }
+                    for i in range(3)
+                ]
+            },
+        )
+
+        response = client.get("/api/v1/notes/export?tags=export&archived=false")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(row["title"] for row in rows) == ["Export 1", "Export 2"]
+        assert rows[0]["tags"] == ["export"] and rows[0]["archived"] is False
+
+        response = client.get("/api/v1/notes/export?format=csv&tags=export")
+        assert (
+            response.headers["content-disposition"]
+            == 'attachment; filename="notes.csv"'
+        )
+        records = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(records) == 3 and records[0]["content"] == 'Line, with "quotes"'
+
+        response = client.get("/api/v1/notes/export?format=csv&tags=no-such-tag")
+        assert (
+            response.text.strip()
+            == "id,title,content,tags,archived,created_at,updated_at"
+        )
+
+    def test_note_change_stream(self):
+        import asyncio
+
+        from app.core.events import RESYNC_MESSAGE, NoteBroadcaster, note_events
+
+        async def stream_while_writing():
+            sent, disconnected = [], asyncio.Event()
+
+            async def receive():
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                sent.append(message)
+                if b"event: deleted" in message.get("body", b""):
+                    disconnected.set()
+
+            scope = {
+                "type": "http",
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": "/api/v1/notes/stream",
+                "raw_path": b"/api/v1/notes/stream",
+                "root_path": "",
+                "query_string": b"",
+                "headers": [(b"accept-encoding", b"gzip")],
+                "client": ("127.0.0.1", 5000),
+                "server": ("testserver", 80),
+            }
+            subscribers = note_events.subscriber_count
+            stream = asyncio.create_task(app(scope, receive, send))
+            while note_events.subscriber_count == subscribers:
+                await asyncio.sleep(0.01)
+            created = await asyncio.to_thread(
+                client.post, "/api/v1/notes/", json={"title": "Live", "content": "x"}
+            )
+            note_id = created.json()["id"]
+            await asyncio.to_thread(client.delete, f"/api/v1/notes/{note_id}")
+            await asyncio.wait_for(stream, 5)
+            assert note_events.subscriber_count == subscribers
+            return sent, note_id
+
+        sent, note_id = asyncio.run(stream_while_writing())
+        headers = dict(sent[0]["headers"])
+        assert (
+            headers[b"content-type"].startswith(b"text/event-stream")
+            and b"content-encoding" not in headers
+        )
+        body = b"".join(message.get("body", b"") for message in sent[1:]).decode()
+        assert body.startswith("retry: ")
+        assert f'event: created\ndata: {{"id":"{note_id}","version":1}}' in body
+        assert f'event: deleted\ndata: {{"id":"{note_id}"}}' in body
+
+        # Slow consumers get a single resync; reconnects
+        # replay from the history when possible
+        async def slow_consumers():
+            broadcaster = NoteBroadcaster(queue_size=2, history_size=3)
+            broadcaster.publish("created", {"id": "a"})
+            slow = broadcaster.subscribe()
+            broadcaster.publish_many(
+                "updated", [{"id": "a", "version": v} for v in (2, 3, 4)]
+            )
+            assert slow.queue.qsize() == 1 and slow.queue.get_nowait() == RESYNC_MESSAGE
+            replay = broadcaster.subscribe(last_event_id=3)
+            assert replay.queue.qsize() == 1 and replay.queue.get_nowait().startswith(
+                b"id: 4\n"
+            )
+            assert (
+                broadcaster.subscribe(last_event_id=0).queue.get_nowait()
+                == RESYNC_MESSAGE
+            )
+            assert (
+                broadcaster.subscribe(last_event_id=99).queue.get_nowait()
+                == RESYNC_MESSAGE
+            )
+
+        asyncio.run(slow_consumers())
+
+    def test_streaming_import(self):
+        lines = [
+            '{"title": "Imported 1", "content": "First", "tags": ["import"]}',
+            '{"title": "", "content": "Empty title"}',
+            "",
+            "not json",
+            '{"title": "Imported 2", "content": "Second", "tags": ["import"]}',
+            '{"title": "Imported 3", "content": "Third"}',
+        ]
+        body = "\n".join(lines).encode()
+        chunks = (body[i : i + 7] for i in range(0, len(body), 7))
+        response = client.post(
+            "/api/v1/notes/import?batch_size=2",
+            content=chunks,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["accepted"] == 3
+        assert data["rejected"] == 2
+        assert [error["line"] for error in data["errors"]] == [2, 4]
+        assert data["errors_truncated"] is False
+
+        titles = {
+            note["title"] for note in client.get("/api/v1/notes/?tags=import").json()
+        }
+        assert titles == {"Imported 1", "Imported 2"}
+
+    def test_ndjson_lines_with_long_lines_in_small_chunks(self):
+        import asyncio
+
+        from app.services.note_import import iter_ndjson_lines
+
+        body = (
+            b"a" * 10
+            + b"\n"
+            + b"b" * 11
+            + b"\nok\n"
+            + b"c" * 11
+            + b"\n"
+            + b"d" * 50
+            + b"\nend"
+        )
+
+        async def lines(size):
+            async def chunks():
+                for i in range(0, len(body), size):
+                    yield body[i : i + size]
+
+            return [
+                line async for line in iter_ndjson_lines(chunks(), max_line_bytes=10)
+            ]
+
+        # Lines over the limit are dropped whether they arrive split or in one chunk
+        expected = [
+            (1, b"a" * 10),
+            (2, None),
+            (3, b"ok"),
+            (4, None),
+            (5, None),
+            (6, b"end"),
+        ]
+        for size in (1, 3, len(body)):
+            assert asyncio.run(lines(size)) == expected, size
+
+    def test_import_reports_partial_counts_on_database_error(self, monkeypatch):
+        from sqlalchemy.exc import OperationalError
+
+        from app.services.note_service import NoteService
+
+        create_notes = NoteService.create_notes
+        calls = []
+
+        def failing_second_batch(self, items):
+            calls.append(len(items))
+            if len(calls) == 2:
+                raise OperationalError("INSERT", {}, Exception("disk I/O error"))
+            return create_notes(self, items)
+
+        monkeypatch.setattr(NoteService, "create_notes", failing_second_batch)
+        lines = [
+            f'{{"title": "Partial {n}", "content": "x", "tags": ["partial"]}}'
+            for n in range(1, 6)
+        ]
+        lines.insert(1, "not json")
+        response = client.post(
+            "/api/v1/notes/import?batch_size=2",
+            content="\n".join(lines).encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        # The first batch stays committed; the client learns where to resume
+        assert response.status_code == 500
+        data = response.json()
+        assert (data["accepted"], data["rejected"], data["failed"]) == (2, 1, 2)
+        assert data["resume_from_line"] == 4 and data["error_code"] == "DATABASE_ERROR"
+        titles = {
+            note["title"] for note in client.get("/api/v1/notes/?tags=partial").json()
+        }
+        assert titles == {"Partial 1", "Partial 2"}
+
+    def test_fast_json_output_is_identical(self, monkeypatch):
+        from app.core.config import settings
+
+        note_id = client.post(
+            "/api/v1/notes/",
+            json={
+                "title": 'Fast ñandú "quoted"',
+                "content": "Línea 1\nLínea 2 <tab>\t✓ fastjson",
+                "tags": ["fast", "json"],
+            },
+        ).json()["id"]
+        urls = [
+            f"/api/v1/notes/{note_id}",
+            "/api/v1/notes/?tags=fast&per_page=100",
+            "/api/v1/notes/?search=fastjson&highlight=true",
+            "/api/v1/notes/?cursor=&per_page=1",
+        ]
+
+        def fetch():
+            return [
+                (
+                    r.status_code,
+                    r.content,
+                    r.headers.get("X-Next-Cursor"),
+                    r.headers.get("ETag"),
+                )
+                for r in map(client.get, urls)
+            ]
+
+        monkeypatch.setattr(settings, "fast_json", False)
+        expected = fetch()
+        monkeypatch.setattr(settings, "fast_json", True)
+        assert fetch() == expected
+
+    def test_sparse_fieldsets_and_preview(self):
+        client.post(
+            "/api/v1/notes/",
+            json={"title": "Sparse", "content": "Ábcdefghij" * 50, "tags": ["sparse"]},
+        )
+        client.post(
+            "/api/v1/notes/",
+            json={"title": "Sparse 2", "content": "Short", "tags": ["sparse"]},
+        )
+
+        response = client.get(
+            "/api/v1/notes/?tags=sparse&fields=title,preview&preview_length=12"
+        )
+        assert response.status_code == 200
+        notes = response.json()
+        assert [set(note) for note in notes] == [{"id", "title", "preview"}] * 2
+        assert {note["preview"] for note in notes} == {"Short", "ÁbcdefghijÁb"}
+
+        # El cursor sigue funcionando aunque la columna de orden no se pida
+        first = client.get("/api/v1/notes/?tags=sparse&fields=tags&per_page=1&cursor=")
+        assert first.json()[0]["tags"] == ["sparse"] and set(first.json()[0]) == {
+            "id",
+            "tags",
+        }
+        cursor = first.headers["X-Next-Cursor"]
+        second = client.get(
+            f"/api/v1/notes/?tags=sparse&fields=tags&per_page=1&cursor={cursor}"
+        )
+        assert second.json()[0]["id"] != first.json()[0]["id"]
+
+        assert client.get("/api/v1/notes/?fields=title,secret").status_code == 422
+
     def test_update_note(self):
         # Create note
         create_response = client.post(
-            "/api/v1/notes/",
-            json={"title": "Original", "content": "Original content"}
+            "/api/v1/notes/", json={"title": "Original", "content": "Original content"}
         )
         note_id = create_response.json()["id"]
-        
+
         # Update note
         response = client.put(
-            f"/api/v1/notes/{note_id}",
-            json={"title": "Updated", "archived": True}
+            f"/api/v1/notes/{note_id}", json={"title": "Updated", "archived": True}
         )
         assert response.status_code == 200
         data = response.json()
         assert data["title"] == "Updated"
-        assert data["archived"] == True
+        assert data["archived"] is True
+
+    def test_single_statement_update_and_delete(self):
+        from sqlalchemy import event
+
+        from app.exceptions.handlers import NotFoundError
+        from app.schemas import NoteCreate, NoteUpdate
+        from app.services.note_service import NoteService
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[0])
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            # RETURNING (SQLite >= 3.35) y la variante
+            # sin RETURNING para versiones antiguas
+            for returning in (True, False):
+                db = TestingSessionLocal()
+                service = NoteService(db, returning=returning)
+                note_id = service.create_note(
+                    NoteCreate(title="Returning", content="x", tags=["r"])
+                ).id
+                statements.clear()
+                updated = service.update_note(note_id, NoteUpdate(title="Returning v2"))
+                assert statements == (["UPDATE"] if returning else ["UPDATE", "SELECT"])
+                assert updated.title == "Returning v2" and updated.tags == ["r"]
+                assert service.get_note_entry(note_id).version == 2
+                statements.clear()
+                service.delete_note(note_id)
+                assert statements == ["DELETE", "DELETE"]
+                with pytest.raises(NotFoundError):
+                    service.update_note(note_id, NoteUpdate(title="Gone"))
+                with pytest.raises(NotFoundError):
+                    service.delete_note(note_id)
+                db.close()
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    def test_write_coalescer_groups_concurrent_writes(self, monkeypatch):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from sqlalchemy import event
+
+        from app.api import notes as notes_api
+        from app.core.config import settings
+        from app.database import configure_sqlite_engine
+        from app.exceptions.handlers import NotFoundError
+        from app.schemas import NoteCreate, NoteUpdate
+        from app.services.note_service import NoteService
+        from app.services.write_coalescer import WriteCoalescer
+
+        # Mismo perfil que el motor de escritura (BEGIN
+        # IMMEDIATE: los SAVEPOINT no confirman nada)
+        writer = configure_sqlite_engine(
+            create_engine(
+                SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+            ),
+            immediate=True,
+        )
+        factory = sessionmaker(bind=writer, autoflush=False, autocommit=False)
+        with factory() as db:
+            existing = (
+                NoteService(db)
+                .create_note(NoteCreate(title="Coalesced", content="x"))
+                .id
+            )
+            doomed = [
+                NoteService(db)
+                .create_note(NoteCreate(title=f"Doomed {n}", content="x"))
+                .id
+                for n in range(2)
+            ]
+        coalescer = WriteCoalescer(factory, max_delay_ms=300, max_batch=10)
+        commits = []
+
+        def record(conn):
+            commits.append(conn)
+
+        event.listen(writer, "commit", record)
+        try:
+            with ThreadPoolExecutor(10) as pool:
+                created = [
+                    pool.submit(
+                        coalescer.create_note,
+                        NoteCreate(title=f"Batch {n}", content="x", tags=["batch"]),
+                    )
+                    for n in range(5)
+                ]
+                updated = pool.submit(
+                    coalescer.update_note, existing, NoteUpdate(tags=["batch"])
+                )
+                missing = pool.submit(
+                    coalescer.update_note, "missing-id", NoteUpdate(title="Nope")
+                )
+                # Deletes and bulk writes share the same queue and transaction
+                deleted = pool.submit(coalescer.delete_note, doomed[0])
+                bulk_created = pool.submit(
+                    coalescer.create_notes,
+                    [NoteCreate(title="Bulk", content="x", tags=["batch"])],
+                )
+                bulk_deleted = pool.submit(
+                    coalescer.delete_notes, [doomed[1], "missing-id"]
+                )
+                notes = [future.result(5) for future in created]
+                # Cada petición recibe su resultado o su
+                # error, con un solo commit para todas
+                assert updated.result(5).tags == ["batch"]
+                with pytest.raises(NotFoundError):
+                    missing.result(5)
+                assert deleted.result(5) is None
+                assert bulk_created.result(5).succeeded == 1
+                assert [item.status for item in bulk_deleted.result(5).results] == [
+                    204,
+                    404,
+                ]
+            assert len(commits) == 1
+            assert {note.title for note in notes} == {f"Batch {n}" for n in range(5)}
+            with factory() as db:
+                assert NoteService(db).count_notes(tags=["batch"]).total == 7
+                assert NoteService(db).get_note_entry(existing).version == 2
+                for note_id in doomed:
+                    with pytest.raises(NotFoundError):
+                        NoteService(db).get_note_entry(note_id)
+
+            # With coalescing on, the delete and bulk
+            # routes also write through the writer thread
+            monkeypatch.setattr(settings, "write_coalescing", True)
+            monkeypatch.setattr(notes_api, "write_coalescer", coalescer)
+            bulk = client.post(
+                "/api/v1/notes/bulk",
+                json={"items": [{"title": "Routed", "content": "x"}]},
+            ).json()
+            routed_id = bulk["results"][0]["id"]
+            assert (
+                client.patch(
+                    "/api/v1/notes/bulk",
+                    json={"items": [{"id": routed_id, "archived": True}]},
+                ).json()["succeeded"]
+                == 1
+            )
+            assert client.delete(f"/api/v1/notes/{routed_id}").status_code == 204
+            assert client.delete(f"/api/v1/notes/{routed_id}").status_code == 404
+            assert (
+                client.request(
+                    "DELETE", "/api/v1/notes/bulk", json={"ids": [existing]}
+                ).json()["succeeded"]
+                == 1
+            )
+            assert len(commits) == 6
+        finally:
+            event.remove(writer, "commit", record)
+            writer.dispose()
+
+    def test_write_coalescer_backpressure(self, monkeypatch):
+        import asyncio
+        import threading
+        from concurrent.futures import Future
+
+        from app.api import notes as notes_api
+        from app.core.config import settings
+        from app.database import configure_sqlite_engine
+        from app.exceptions.handlers import ServiceUnavailableError
+        from app.schemas import NoteCreate
+        from app.services.note_service import NoteService
+        from app.services.write_coalescer import WriteCoalescer
+
+        writer = configure_sqlite_engine(
+            create_engine(
+                SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+            ),
+            immediate=True,
+        )
+        factory = sessionmaker(bind=writer, autoflush=False, autocommit=False)
+        entered, gate = threading.Event(), threading.Event()
+
+        def blocking_factory():
+            entered.set()
+            gate.wait(5)
+            return factory()
+
+        coalescer = WriteCoalescer(
+            blocking_factory, max_delay_ms=0, max_batch=1, max_queue=1, timeout=0.2
+        )
+        try:
+            # The writer thread holds the first write;
+            # the queue takes one more and then rejects
+            first = coalescer.submit(
+                coalescer._create(NoteCreate(title="Backpressure", content="x"))
+            )
+            assert entered.wait(5)
+            queued = coalescer.submit(
+                coalescer._create(NoteCreate(title="Dropped", content="x"))
+            )
+            with pytest.raises(ServiceUnavailableError):
+                coalescer.create_note(NoteCreate(title="Rejected", content="x"))
+            # Through the API the rejection is a 503 with Retry-After
+            monkeypatch.setattr(settings, "write_coalescing", True)
+            monkeypatch.setattr(notes_api, "write_coalescer", coalescer)
+            response = client.post(
+                "/api/v1/notes/", json={"title": "Rejected", "content": "x"}
+            )
+            assert (
+                response.status_code == 503
+                and response.json()["error_code"] == "SERVER_BUSY"
+            )
+            assert response.headers["Retry-After"] == "1"
+            # A write still queued after the timeout is dropped, never applied later
+            with pytest.raises(ServiceUnavailableError):
+                coalescer.wait(queued)
+            gate.set()
+            assert first.result(5).title == "Backpressure"
+            assert (
+                asyncio.run(
+                    coalescer.create_note_async(NoteCreate(title="Async", content="x"))
+                ).title
+                == "Async"
+            )
+            with factory() as db:
+                assert NoteService(db).count_notes(search="Dropped").total == 0
+            with pytest.raises(ServiceUnavailableError):
+                asyncio.run(coalescer.wait_async(Future()))
+        finally:
+            gate.set()
+            writer.dispose()
+
+    @pytest.mark.skipif(
+        not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set"
+    )
+    def test_postgresql_backend(self):
+        from sqlalchemy import text
+
+        from app.database import engine_options
+        from app.exceptions.handlers import NotFoundError
+        from app.migrations import run_migrations, schema_version
+        from app.schemas import NoteCreate, NoteUpdate
+        from app.services.note_service import NoteService
+
+        url = os.environ["TEST_POSTGRES_URL"]
+        pg_engine = create_engine(url, **engine_options(url))
+        Base.metadata.drop_all(bind=pg_engine)
+        schema_version.drop(bind=pg_engine, checkfirst=True)
+        run_migrations(pg_engine)
+        try:
+            with pg_engine.connect() as connection:
+                id_type = connection.execute(
+                    text(
+                        "SELECT data_type FROM information_schema.columns WHERE "
+                        "table_name = 'notes' AND column_name = 'id'"
+                    )
+                ).scalar()
+                indexes = set(
+                    connection.execute(
+                        text(
+                            "SELECT indexname FROM pg_indexes WHERE tablename = 'notes'"
+                        )
+                    ).scalars()
+                )
+            assert id_type == "uuid"
+            assert {"ix_notes_search_vector", "ix_notes_tags_gin"} <= indexes
+            db = sessionmaker(bind=pg_engine)()
+            service = NoteService(db)
+            first = service.create_note(
+                NoteCreate(
+                    title="Programming notes",
+                    content="Python and SQL",
+                    tags=["dev", "sql"],
+                )
+            )
+            service.create_notes(
+                [
+                    NoteCreate(
+                        title="Groceries", content="programming snacks", tags=["home"]
+                    )
+                ]
+            )
+            # Búsqueda por prefijo con tsvector: el
+            # título (peso A) puntúa más que el contenido
+            results = service.get_notes(search="prog", highlight=True)
+            assert [note.title for note in results] == [
+                "Programming notes",
+                "Groceries",
+            ]
+            assert "<mark>" in results[1].snippet
+            assert service.count_notes(tags=["dev", "sql"], tags_mode="all") == (
+                1,
+                True,
+            )
+            assert [note.id for note in service.get_notes(tags=["sql", "home"])] != []
+            # UPDATE ... RETURNING y ids que no son
+            # UUID (404, no error de la base de datos)
+            assert (
+                service.update_note(first.id, NoteUpdate(title="Programming v2")).title
+                == "Programming v2"
+            )
+            for bad_id in ("not-a-uuid", first.id.upper()):
+                with pytest.raises(NotFoundError):
+                    service.get_note_entry(bad_id)
+                with pytest.raises(NotFoundError):
+                    service.delete_note(bad_id)
+            assert service.delete_notes(["not-a-uuid", first.id]).succeeded == 1
+            # Sin triggers de contadores: sin versión de colección
+            # (ni ETag de listado) y totales con COUNT(*)
+            assert service.get_collection_version() is None
+            assert service.count_notes() == (1, True)
+            db.close()
+        finally:
+            Base.metadata.drop_all(bind=pg_engine)
+            schema_version.drop(bind=pg_engine, checkfirst=True)
+            pg_engine.dispose()
 
     def test_delete_note(self):
         # Create note
         create_response = client.post(
-            "/api/v1/notes/",
-            json={"title": "To Delete", "content": "Will be deleted"}
+            "/api/v1/notes/", json={"title": "To Delete", "content": "Will be deleted"}
         )
         note_id = create_response.json()["id"]
-        
+
         # Delete note
         response = client.delete(f"/api/v1/notes/{note_id}")
         assert response.status_code == 204
-        
+
         # Verify deletion
         get_response = client.get(f"/api/v1/notes/{note_id}")
         assert get_response.status_code == 404
 
+    def test_admission_control(self):
+        import asyncio
+
+        import httpx
+
+        from app.middleware.admission import AdmissionMiddleware, RateLimiter
+
+        async def scenario():
+            release = asyncio.Event()
+
+            async def backend(scope, receive, send):
+                if scope["path"] == "/slow":
+                    await release.wait()
+                await send(
+                    {"type": "http.response.start", "status": 200, "headers": []}
+                )
+                await send({"type": "http.response.body", "body": b"ok"})
+
+            middleware = AdmissionMiddleware(
+                backend,
+                limits={"read": 1, "write": 1},
+                queue_sizes={"read": 1},
+                queue_timeout=0.2,
+                rate=0,
+                exempt_paths=["/health"],
+            )
+            transport = httpx.ASGITransport(app=middleware)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as http:
+                # Un lector en curso, otro en cola y el siguiente rechazado al instante
+                slow = asyncio.create_task(http.get("/slow"))
+                await asyncio.sleep(0.01)
+                queued = asyncio.create_task(http.get("/fast"))
+                await asyncio.sleep(0.01)
+                rejected = await http.get("/fast")
+                assert (
+                    rejected.status_code == 503
+                    and rejected.headers["retry-after"] == "1"
+                )
+                assert rejected.json()["error_code"] == "SERVER_BUSY"
+                # Las rutas exentas y la otra clase no comparten los huecos de lectura
+                assert (await http.get("/health")).status_code == 200
+                assert (await http.post("/fast")).status_code == 200
+                release.set()
+                assert (await slow).status_code == 200 and (
+                    await queued
+                ).status_code == 200
+                # Una espera en cola más larga que queue_timeout también termina en 503
+                release.clear()
+                slow = asyncio.create_task(http.get("/slow"))
+                await asyncio.sleep(0.01)
+                assert (await http.get("/fast")).status_code == 503
+                release.set()
+                assert (await slow).status_code == 200
+            assert (
+                middleware.limiters["read"].in_flight == 0
+                and middleware.limiters["read"].queued == 0
+            )
+
+            # Token bucket por IP: ráfaga de 1 y una petición por segundo
+            limited = AdmissionMiddleware(backend, limits={}, rate=1, burst=1)
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=limited), base_url="http://test"
+            ) as http:
+                assert (await http.get("/fast")).status_code == 200
+                response = await http.get("/fast")
+                assert (
+                    response.status_code == 429
+                    and response.headers["retry-after"] == "1"
+                )
+                assert response.json()["error_code"] == "RATE_LIMITED"
+
+        asyncio.run(scenario())
+        buckets = RateLimiter(rate=2, burst=2, max_clients=2)
+        assert [buckets.acquire("a", now=0.0) for _ in range(3)] == [0, 0, 0.5]
+        assert buckets.acquire("b", now=0.0) == 0 and buckets.acquire("a", now=0.5) == 0
+        buckets.acquire("c", now=0.5)
+        assert list(buckets._buckets) == ["a", "c"]
+
+    def test_security_headers_on_all_responses(self):
+        for response in (
+            client.get("/health"),
+            client.get("/api/v1/notes/missing"),
+            client.get("/api/v1/notes/export"),
+        ):
+            assert response.headers["X-Content-Type-Options"] == "nosniff"
+            assert response.headers["X-Frame-Options"] == "DENY"
+            assert (
+                response.headers["Referrer-Policy"] == "strict-origin-when-cross-origin"
+            )
+            assert "server" not in response.headers
+
+    def test_metrics_endpoint(self):
+        note_id = client.post(
+            "/api/v1/notes/", json={"title": "Metrics", "content": "Observed"}
+        ).json()["id"]
+        client.get(f"/api/v1/notes/{note_id}")
+        client.get("/api/v1/notes/not-a-real-id")
+        client.get("/no/such/path")
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        # Etiquetadas por plantilla de ruta, no por URL
+        note_route = 'method="GET",route="/api/v1/notes/{note_id}"'
+        assert f'http_requests_total{{{note_route},status="200"}}' in body
+        assert f'http_requests_total{{{note_route},status="404"}}' in body
+        assert 'route="<unmatched>",status="404"' in body
+        assert note_id not in body
+        assert (
+            'http_request_duration_seconds_bucket{method="POST",route="/api/v1/notes/",'
+            'status="201",le="+Inf"}' in body
+        )
+        assert 'db_queries_total{engine="write"}' in body
+        assert 'db_pool_connections{engine="read",state="size"}' in body
+        assert 'cache_hits_total{cache="note"}' in body
+
+    def test_route_template_labels(self):
+        from fastapi import APIRouter, FastAPI
+        from fastapi.testclient import TestClient
+        from starlette.applications import Starlette
+        from starlette.routing import Mount
+
+        from app.core.metrics import UNMATCHED_ROUTE, route_template
+
+        labels = []
+
+        def record(inner):
+            async def asgi(scope, receive, send):
+                await inner(scope, receive, send)
+                labels.append(route_template(scope))
+
+            return asgi
+
+        router = APIRouter()
+        router.get("/{note_id}")(lambda note_id: {"id": note_id})
+        router.get("/")(lambda: [])
+        api = FastAPI()
+        api.include_router(router, prefix="/api/v1/notes")
+        api.get("/health")(lambda: {})
+
+        TestClient(record(api)).get("/api/v1/notes/abc")
+        TestClient(record(api)).get("/api/v1/notes/")
+        TestClient(record(api)).get("/health")
+        TestClient(record(api)).get("/api/v1/other")
+        # Behind a proxy prefix and inside a mounted application
+        TestClient(record(api), root_path="/proxy").get("/api/v1/notes/abc")
+        TestClient(record(Starlette(routes=[Mount("/sub", app=api)]))).get(
+            "/sub/api/v1/notes/abc"
+        )
+        assert labels == [
+            "/api/v1/notes/{note_id}",
+            "/api/v1/notes/",
+            "/health",
+            UNMATCHED_ROUTE,
+            "/proxy/api/v1/notes/{note_id}",
+            "/sub/api/v1/notes/{note_id}",
+        ]
+
+    def test_json_log_format(self):
+        import json
+        import logging
+
+        from app.core.logging import CustomFormatter
+
+        record = logging.LogRecord(
+            "notes_api", logging.INFO, __file__, 1, "Request completed", None, None
+        )
+        record.request_id, record.status_code = "abc123", 200
+        entry = json.loads(CustomFormatter(json_output=True).format(record))
+        assert entry["message"] == "Request completed"
+        assert entry["request_id"] == "abc123" and entry["status_code"] == 200
+
+    def test_json_log_keeps_exception_through_queue(self, monkeypatch):
+        import io
+        import json
+
+        from app.core import logging as app_logging
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "log_format", "json")
+        monkeypatch.setattr(settings, "log_queue_enabled", True)
+        stream = io.StringIO()
+        try:
+            queued_logger = app_logging.setup_logging(stream)
+            try:
+                raise ValueError("bad value")
+            except ValueError:
+                queued_logger.exception("boom")
+            app_logging._stop_listener()
+            entry = json.loads(stream.getvalue().splitlines()[-1])
+            assert entry["message"] == "boom"
+            assert "ValueError: bad value" in entry["exception"]
+        finally:
+            monkeypatch.undo()
+            app_logging.setup_logging()
+
+    def test_success_logs_sampled_per_route(self, caplog, monkeypatch):
+        import logging
+
+        from app.core.config import settings
+
+        monkeypatch.setattr(
+            settings,
+            "log_sample_rates",
+            {"/health": 0.0, "/api/v1/notes/{note_id}": 0.0},
+        )
+        with caplog.at_level(logging.INFO, logger="notes_api"):
+            client.get("/health")
+            client.get("/api/v1/notes/missing-note")
+            client.get("/api/v1/tags/")
+        routes = [
+            (r.route, r.status_code)
+            for r in caplog.records
+            if hasattr(r, "status_code")
+        ]
+        # /health se descarta, el 404 se registra
+        # siempre y /tags usa la tasa por defecto
+        assert routes == [("/api/v1/notes/{note_id}", 404), ("/api/v1/tags/", 200)]
+
     def test_error_responses_format(self):
         # Test 404 error format
         response = client.get("/api/v1/notes/nonexistent-id")
@@ -151,9 +1805,9 @@ class TestNotesAPI:
     def test_openapi_docs_accessible(self):
         response = client.get("/docs")
         assert response.status_code == 200
-        
+
         response = client.get("/openapi.json")
         assert response.status_code == 200
         openapi_data = response.json()
         assert "openapi" in openapi_data
-        assert "paths" in openapi_data
\ No newline at end of file
+        assert "paths" in openapi_data
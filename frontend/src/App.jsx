@@ -1,7 +1,7 @@
 // Importaciones de React y hooks necesarios
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 // Importación de servicios API para operaciones CRUD de notas
-import { getNotes, createNote, updateNote, deleteNote } from './services/api';
+import { getNotes, createNote, updateNote, deleteNote, subscribeToNoteChanges } from './services/api';
 // Importación de componentes de la interfaz de usuario
 import NoteModal from './components/NoteModal';
 import LoadingSpinner from './components/LoadingSpinner';
@@ -78,7 +78,8 @@ function App() {
     setLoading(true);
     setError(null);
     try {
-      const response = await getNotes({ page, per_page: 10, search });
+      // fuzzy: la búsqueda mientras se escribe tolera erratas ("programing" encuentra "programming")
+      const response = await getNotes({ page, per_page: 10, search, fuzzy: true });
       setNotes(response.items || response.data || response || []);
     } catch (error) {
       console.error('Fetch notes error:', error);
@@ -223,6 +224,22 @@ function App() {
     }
   }, [page, search, activeTab, pokemonSearch, selectedType]);
 
+  // Recargar el listado cuando cambian notas en otros clientes, agrupando ráfagas de eventos
+  const fetchNotesRef = useRef(fetchNotes);
+  fetchNotesRef.current = fetchNotes;
+  useEffect(() => {
+    if (activeTab !== 'notes') return undefined;
+    let timer = null;
+    const unsubscribe = subscribeToNoteChanges(() => {
+      clearTimeout(timer);
+      timer = setTimeout(() => fetchNotesRef.current(), 300);
+    });
+    return () => {
+      clearTimeout(timer);
+      unsubscribe();
+    };
+  }, [activeTab]);
+
   const handleCreate = async (noteData) => {
     try {
       await createNote({ ...noteData, archived: false });
@@ -17,7 +17,7 @@ const API = axios.create({
 export const getNotes = async (params) => {
   try {
     // Realizar petición GET con parámetros de consulta (query parameters)
-    // params puede incluir: page, per_page, search, archived
+    // params puede incluir: page, per_page, search, fuzzy, archived
     const response = await API.get("/notes", { params });
     return response.data; // Retornar solo los datos de la respuesta
   } catch (error) {
@@ -64,6 +64,22 @@ export const updateNote = async (id, data) => {
   }
 };
 
+// Función para suscribirse al feed de cambios de notas (Server-Sent Events en /notes/stream)
+// onChange recibe el tipo de evento (created, updated, deleted o resync) y sus datos
+// Devuelve una función que cierra la conexión
+export const subscribeToNoteChanges = (onChange) => {
+  // Entornos sin EventSource (p. ej. tests con jsdom): sin actualizaciones en vivo
+  if (typeof EventSource === 'undefined') {
+    return () => {};
+  }
+  // EventSource reconecta solo y envía Last-Event-ID para recuperar los eventos perdidos
+  const source = new EventSource(`${API.defaults.baseURL}/notes/stream`);
+  ['created', 'updated', 'deleted', 'resync'].forEach((type) => {
+    source.addEventListener(type, (event) => onChange(type, JSON.parse(event.data)));
+  });
+  return () => source.close();
+};
+
 // Servicio para obtener datos de Pokémon desde la API externa (PokéAPI)
 // Esta función es un ejemplo de integración con APIs externas
 export const getExternalData = async () => {